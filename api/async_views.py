@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .profiling import span
+from .views import SegmentViewSet, BrandViewSet, VehicleViewSet
+
+
+_executor = None
+
+
+def get_executor():
+    # The loop's default executor has min(32, cpu + 4) threads, which caps
+    # concurrent reads far below what an I/O-bound database allows.
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(getattr(settings, 'ASYNC_READ_WORKERS', 32),
+                                       thread_name_prefix='async-read')
+    return _executor
+
+
+def _run(view, request, args, kwargs):
+    # This runs on an executor thread with its own connection, which the
+    # request_started / request_finished handlers never see.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            with span('render'):
+                response = response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(viewset, actions):
+    """
+    Serve the read ``actions`` of a DRF viewset from a coroutine.
+
+    Under ASGI Django runs sync views one at a time on a single shared
+    thread. Here the whole view, authentication, query and rendering
+    included, makes one hop to the executor with thread_sensitive=False,
+    so up to ASYNC_READ_WORKERS reads run in parallel while the event loop
+    stays free.
+    Behaviour (filters, pagination, caching, ETags) is the viewset's own.
+    Under WSGI the coroutine is driven by Django's async_to_sync adapter.
+    """
+    view = viewset.as_view(actions)
+
+    async def async_view(request, *args, **kwargs):
+        run = sync_to_async(_run, thread_sensitive=False, executor=get_executor())
+        return await run(view, request, args, kwargs)
+
+    async_view.csrf_exempt = True
+    return async_view
+
+
+segment_list = async_read_view(SegmentViewSet, {'get': 'list'})
+segment_detail = async_read_view(SegmentViewSet, {'get': 'retrieve'})
+brand_list = async_read_view(BrandViewSet, {'get': 'list'})
+brand_detail = async_read_view(BrandViewSet, {'get': 'retrieve'})
+vehicle_list = async_read_view(VehicleViewSet, {'get': 'list'})
+vehicle_detail = async_read_view(VehicleViewSet, {'get': 'retrieve'})
@@ -0,0 +1,38 @@
+import hashlib
+
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import lazy_cache
+from .profiling import span
+
+get_token_cache = lazy_cache('TOKEN_AUTH_CACHE', 'api:token:')
+
+
+def _cache_key(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def invalidate_token(key):
+    get_token_cache().delete(_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that remembers valid tokens for TOKEN_AUTH_CACHE's
+    TIMEOUT seconds. Entries are dropped by api.signals when a token is
+    deleted or regenerated or its user is saved (e.g. deactivated).
+    """
+
+    def authenticate(self, request):
+        with span('auth'):
+            return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        cache_key = _cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, (user, token))
+        return user, token
@@ -0,0 +1,158 @@
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import CharField, Value
+from rest_framework.exceptions import ValidationError
+
+from .conditional import bump_list_version
+from .models import MAX_INTEGER, Segment, Brand, Vehicle
+from .serializers import VehicleBulkItemSerializer
+from . import stats
+
+MAX_ITEMS = 10000
+BATCH_SIZE = 500
+
+
+def _as_list(data):
+    if not isinstance(data, list):
+        raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+    if len(data) > MAX_ITEMS:
+        raise ValidationError({'non_field_errors': ['At most %d items per request.' % MAX_ITEMS]})
+    return data
+
+
+def _chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _validate_items(data, partial):
+    serializer = VehicleBulkItemSerializer(partial=partial)
+    valid, errors = [], []
+    for index, item in enumerate(_as_list(data)):
+        try:
+            valid.append((index, serializer.run_validation(item)))
+        except ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+    return valid, errors
+
+
+def _existing_references(valid):
+    segment_ids = {item['segment'] for _, item in valid if 'segment' in item}
+    brand_ids = {item['brand'] for _, item in valid if 'brand' in item}
+    if not segment_ids and not brand_ids:
+        return set()
+    segments = Segment.objects.filter(id__in=segment_ids).annotate(
+        kind=Value('segment', output_field=CharField())).values_list('kind', 'id')
+    brands = Brand.objects.filter(id__in=brand_ids).annotate(
+        kind=Value('brand', output_field=CharField())).values_list('kind', 'id')
+    return set(segments.union(brands, all=True))
+
+
+def _check_references(valid, errors):
+    existing = _existing_references(valid)
+    checked = []
+    for index, item in valid:
+        missing = {
+            field: ['Invalid pk "%s" - object does not exist.' % item[field]]
+            for field in ('segment', 'brand')
+            if field in item and (field, item[field]) not in existing
+        }
+        if missing:
+            errors.append({'index': index, 'errors': missing})
+        else:
+            checked.append((index, item))
+    return checked
+
+
+def _vehicle_values(item):
+    values = {key: value for key, value in item.items() if key not in ('id', 'segment', 'brand')}
+    if 'segment' in item:
+        values['segment_id'] = item['segment']
+    if 'brand' in item:
+        values['brand_id'] = item['brand']
+    return values
+
+
+def bulk_create(user, data):
+    valid, errors = _validate_items(data, partial=False)
+    valid = _check_references(valid, errors)
+    vehicles = [Vehicle(user=user, **_vehicle_values(item)) for _, item in valid]
+    with transaction.atomic():
+        Vehicle.objects.bulk_create(vehicles, batch_size=BATCH_SIZE)
+        stats.apply_changes(added=vehicles)
+        bump_list_version('vehicle')
+    return {'created': len(vehicles), 'errors': sorted(errors, key=lambda e: e['index'])}
+
+
+def bulk_update(data):
+    valid, errors = _validate_items(data, partial=True)
+    with_id, seen = [], set()
+    for index, item in valid:
+        if 'id' not in item:
+            errors.append({'index': index, 'errors': {'id': ['This field is required.']}})
+        elif item['id'] in seen:
+            # A second change to the same row would be applied on top of
+            # the first and counted twice in the stats.
+            errors.append({'index': index, 'errors': {'id': ['Duplicate id.']}})
+        else:
+            seen.add(item['id'])
+            with_id.append((index, item))
+    valid = _check_references(with_id, errors)
+
+    fields = {'updated_at'}
+    vehicles = []
+    added, removed = [], []
+    now = timezone.now()
+    with transaction.atomic():
+        existing = Vehicle.objects.select_for_update().in_bulk([item['id'] for _, item in valid])
+        for index, item in valid:
+            vehicle = existing.get(item['id'])
+            if vehicle is None:
+                errors.append({'index': index, 'errors': {'id': ['Not found.']}})
+                continue
+            before = stats.stat_row(vehicle)
+            for name, value in _vehicle_values(item).items():
+                setattr(vehicle, name, value)
+                fields.add(name)
+            # bulk_update() skips auto_now.
+            vehicle.updated_at = now
+            vehicles.append(vehicle)
+            if stats.stat_row(vehicle) != before:
+                removed.append(before)
+                added.append(vehicle)
+        if vehicles:
+            Vehicle.objects.bulk_update(vehicles, sorted(fields), batch_size=BATCH_SIZE)
+            stats.apply_changes(added=added, removed=removed)
+            bump_list_version('vehicle')
+    return {'updated': len(vehicles), 'errors': sorted(errors, key=lambda e: e['index'])}
+
+
+def bulk_delete(data):
+    if isinstance(data, dict):
+        data = data.get('ids')
+    ids, errors = [], []
+    for index, value in enumerate(_as_list(data)):
+        if not isinstance(value, int) or isinstance(value, bool):
+            errors.append({'index': index, 'errors': {'id': ['A valid integer is required.']}})
+        elif not -MAX_INTEGER - 1 <= value <= MAX_INTEGER:
+            # No row has it, and SQLite could not take it as a parameter.
+            errors.append({'index': index, 'errors': {'id': ['Not found.']}})
+        else:
+            ids.append((index, value))
+
+    with transaction.atomic():
+        rows = {}
+        for chunk in _chunks({pk for _, pk in ids}):
+            for values in Vehicle.objects.filter(id__in=chunk).values('id', *stats.STAT_FIELDS):
+                rows[values.pop('id')] = values
+        for index, pk in ids:
+            if pk not in rows:
+                errors.append({'index': index, 'errors': {'id': ['Not found.']}})
+        existing = set(rows)
+        with stats.suspended():
+            for chunk in _chunks(existing):
+                Vehicle.objects.filter(id__in=chunk).delete()
+        stats.apply_changes(removed=rows.values())
+        bump_list_version('vehicle')
+    return {'deleted': len(existing), 'errors': sorted(errors, key=lambda e: e['index'])}
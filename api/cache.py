@@ -0,0 +1,153 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+
+VERSION_TIMEOUT = 365 * 24 * 60 * 60
+
+_missing = object()
+
+
+class LocalCache:
+    """Bounded per-process LRU cache whose entries expire after ``timeout`` seconds."""
+
+    def __init__(self, timeout=60, max_entries=1000):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _missing)
+            if entry is not _missing and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _missing:
+                del self._data[key]
+            self.misses += 1
+        return default
+
+    def set(self, key, value, timeout=None):
+        expires = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._data)}
+
+
+class SharedCache:
+    """The LocalCache interface on top of a Django cache alias shared by all processes."""
+
+    def __init__(self, alias='default', timeout=60, prefix=''):
+        self.cache = caches[alias]
+        self.timeout = timeout
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        value = self.cache.get(self.prefix + key, _missing)
+        if value is _missing:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value, timeout=None):
+        self.cache.set(self.prefix + key, value, self.timeout if timeout is None else timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.prefix + key)
+
+    def clear(self):
+        # Other processes may be using the entries; they are only dropped
+        # by delete() or when they expire.
+        pass
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def build_cache(config, prefix):
+    """
+    Build a cache from a settings dict with keys BACKEND ('local' or
+    'django'), TIMEOUT, MAX_ENTRIES (local) and CACHE_ALIAS (django).
+    """
+    timeout = config.get('TIMEOUT', 60)
+    if config.get('BACKEND', 'local') == 'django':
+        return SharedCache(config.get('CACHE_ALIAS', 'default'), timeout, prefix)
+    return LocalCache(timeout, config.get('MAX_ENTRIES', 1000))
+
+
+def lazy_cache(setting, prefix, factory=build_cache, reset_on=()):
+    """
+    A function returning the cache ``factory`` builds from the settings
+    dict ``setting`` on first use, and again after ``setting`` or one of
+    ``reset_on`` changes (override_settings in tests).
+    """
+    names = {setting, *reset_on}
+    store = None
+
+    def get_cache():
+        nonlocal store
+        if store is None:
+            store = factory(getattr(settings, setting, {}), prefix)
+        return store
+
+    def reset(**kwargs):
+        nonlocal store
+        if kwargs['setting'] in names:
+            store = None
+
+    setting_changed.connect(reset, weak=False)
+    return get_cache
+
+
+class Versions:
+    """
+    Named versions kept in the cache ``get_cache()`` returns, for keys and
+    validators that must change with the data behind the name.
+    """
+
+    def __init__(self, get_cache, prefix='version:'):
+        self.get_cache = get_cache
+        self.prefix = prefix
+
+    def get(self, name):
+        store = self.get_cache()
+        version = store.get(self.prefix + name)
+        if version is None:
+            # Never fall back to a constant: entries stored under it before
+            # the version key was evicted could still be alive.
+            version = uuid.uuid4().hex
+            store.set(self.prefix + name, version, VERSION_TIMEOUT)
+        return version
+
+    def bump(self, name):
+        """A new version for ``name``, now and once the transaction commits."""
+        def set_version():
+            self.get_cache().set(self.prefix + name, uuid.uuid4().hex, VERSION_TIMEOUT)
+        set_version()
+        transaction.on_commit(set_version)
@@ -0,0 +1,149 @@
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .conditional import bump_list_version
+from .models import Segment, Brand, Vehicle, DeletionTask
+from .serializers import DeletionTaskSerializer
+from . import jobs, stats
+
+logger = logging.getLogger(__name__)
+
+# DeletionTask.target -> (model, Vehicle column referencing it)
+TARGETS = {
+    DeletionTask.SEGMENT: (Segment, 'segment_id'),
+    DeletionTask.BRAND: (Brand, 'brand_id'),
+}
+
+
+def dependents(target, object_id):
+    return Vehicle.objects.filter(**{TARGETS[target][1]: object_id})
+
+
+def delete_batch(target, object_id, batch_size):
+    """Delete up to ``batch_size`` vehicles of the object in one short transaction."""
+    with transaction.atomic():
+        rows = {}
+        vehicles = dependents(target, object_id).order_by('id').values('id', *stats.STAT_FIELDS)
+        for values in vehicles[:batch_size]:
+            rows[values.pop('id')] = values
+        if rows:
+            with stats.suspended():
+                Vehicle.objects.filter(id__in=list(rows)).delete()
+            stats.apply_changes(removed=rows.values())
+            bump_list_version('vehicle')
+    return len(rows)
+
+
+def delete(target, object_id, task=None, batch_size=None, heartbeat=None):
+    """
+    Delete a segment or brand and its vehicles. The vehicles go in batches
+    of CASCADE_DELETE_BATCH_SIZE, each in its own transaction, so writers
+    are never locked out for long; ``task`` records the progress and
+    ``heartbeat()`` is called after each batch. The object itself goes
+    last, together with anything created meanwhile.
+    """
+    batch_size = batch_size or getattr(settings, 'CASCADE_DELETE_BATCH_SIZE', 1000)
+    while True:
+        deleted = delete_batch(target, object_id, batch_size)
+        if not deleted:
+            break
+        if task is not None:
+            task.deleted += deleted
+            task.save(update_fields=['deleted'])
+        if heartbeat is not None:
+            heartbeat()
+    model = TARGETS[target][0]
+    for instance in model.objects.filter(pk=object_id):
+        with stats.cascading():
+            instance.delete()
+
+
+def run(task_id, heartbeat=None, final=True):
+    """
+    Carry out a DeletionTask, recording its outcome; returns the task. A
+    failure that is not ``final`` leaves the task pending for a retry.
+    """
+    task = DeletionTask.objects.get(pk=task_id)
+    task.status = DeletionTask.RUNNING
+    task.save(update_fields=['status'])
+    try:
+        delete(task.target, task.object_id, task, heartbeat=heartbeat)
+    except jobs.LockLost:
+        # The worker that took the job over carries on with this task.
+        raise
+    except Exception as exc:
+        logger.exception('Deletion task %s failed', task.pk)
+        task.status, task.error = DeletionTask.FAILED if final else DeletionTask.PENDING, str(exc)
+    else:
+        task.status = DeletionTask.DONE
+    if task.status != DeletionTask.PENDING:
+        task.finished_at = timezone.now()
+    task.save(update_fields=['status', 'error', 'finished_at'])
+    return task
+
+
+@jobs.register('cascade_delete')
+def run_job(job):
+    # Batches already deleted stay deleted, so a retry picks up the rest.
+    task = run(job.payload['task'], heartbeat=lambda: jobs.heartbeat(job),
+               final=job.attempts >= job.max_attempts)
+    if task.status != DeletionTask.DONE:
+        raise RuntimeError(task.error)
+    return {'task': task.pk, 'deleted': task.deleted}
+
+
+def active_tasks(target, object_id):
+    return DeletionTask.objects.filter(target=target, object_id=object_id,
+                                       status__in=[DeletionTask.PENDING, DeletionTask.RUNNING])
+
+
+def submit(user, target, object_id, total):
+    """
+    Queue the deletion for the run_workers processes, or return the task
+    already doing so for this object.
+    """
+    key = 'deletion:%s:%d' % (target, object_id)
+    try:
+        with transaction.atomic():
+            task = active_tasks(target, object_id).first()
+            if task is not None and jobs.active('cascade_delete', key) is None:
+                # Its job ran out of attempts without reaching the handler,
+                # its workers having died.
+                task.status, task.finished_at = DeletionTask.FAILED, timezone.now()
+                task.save(update_fields=['status', 'finished_at'])
+                task = None
+            if task is None:
+                task = DeletionTask.objects.create(user=user, target=target, object_id=object_id, total=total)
+                jobs.enqueue('cascade_delete', {'task': task.pk}, user=user, key=key)
+    except IntegrityError:
+        # Created concurrently since the check; the constraint allows one.
+        task = active_tasks(target, object_id).get()
+    return task
+
+
+class CascadeDestroyMixin:
+    """
+    destroy() through api.cascade.delete(). Objects with more than
+    CASCADE_DELETE_ASYNC_THRESHOLD vehicles are deleted by a background job:
+    the response is a 202 with the DeletionTask, which can be polled at its
+    Location.
+    """
+    cascade_target = None
+
+    def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
+        total = dependents(self.cascade_target, instance.pk).count()
+        if (total <= getattr(settings, 'CASCADE_DELETE_ASYNC_THRESHOLD', 5000)
+                and not active_tasks(self.cascade_target, instance.pk).exists()):
+            delete(self.cascade_target, instance.pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        task = submit(request.user, self.cascade_target, instance.pk, total)
+        location = request.build_absolute_uri(reverse('api:deletiontask-detail', args=[task.pk]))
+        return Response(DeletionTaskSerializer(task).data, status=status.HTTP_202_ACCEPTED,
+                        headers={'Location': location})
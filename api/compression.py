@@ -0,0 +1,96 @@
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _gzip(content):
+    return gzip.compress(content, getattr(settings, 'COMPRESSION_GZIP_LEVEL', 4), mtime=0)
+
+
+def _brotli(content):
+    return brotli.compress(content, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5))
+
+
+# In order of preference when the client accepts several equally.
+ENCODERS = [('gzip', _gzip)]
+if brotli is not None:
+    ENCODERS.insert(0, ('br', _brotli))
+
+
+def accepted_encodings(header):
+    """Accept-Encoding as {coding: q}; q=0 marks a refused coding."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        q = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                q = float(value)
+            except ValueError:
+                continue
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header, available):
+    accepted = accepted_encodings(header)
+    best = None
+    for coding in available:
+        q = accepted.get(coding, accepted.get('*', 0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (coding, q)
+    return best[0] if best else None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses response bodies of at least COMPRESSION_MIN_SIZE bytes with
+    the encoding the client prefers: br when the brotli package is
+    installed, else gzip. Streaming responses (exports) are gzipped as
+    they are sent. As with Django's GZipMiddleware, strong ETags become
+    weak, since the bytes depend on the encoding.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+        if response.streaming:
+            if choose_encoding(header, ['gzip']) is None:
+                return response
+            coding = 'gzip'
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response['Content-Length']
+        else:
+            coding = choose_encoding(header, [name for name, _ in ENCODERS])
+            if coding is None:
+                return response
+            compressed = dict(ENCODERS)[coding](response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
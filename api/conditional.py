@@ -0,0 +1,110 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import Versions
+from . import dimensions
+
+# Kept with the dimension versions, in the cache every process shares.
+_list_versions = Versions(dimensions.get_store, 'list-version:')
+
+
+def get_list_version(name):
+    return _list_versions.get(name)
+
+
+def bump_list_version(name):
+    """Change the validators and cached counts of list ``name``, now and once the transaction commits."""
+    _list_versions.bump(name)
+
+
+def _etag(*parts):
+    return quote_etag(hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest())
+
+
+def _timestamp(value):
+    return int(value.timestamp()) if value is not None else None
+
+
+class ConditionalMixin:
+    """
+    ETag / Last-Modified validators for a model carrying ``modified_field``.
+
+    List validators come from get_list_version(``list_version``), which
+    every write of the model bumps through bump_list_version(), or else
+    from one MAX(modified_field) + COUNT(*) aggregate over the queryset.
+    Detail validators come from the fetched object, so a 304 never
+    serializes or renders anything. Both ETags also cover the full URL
+    (e.g. ?fields=) and the versions of ``etag_dimensions``, whose names
+    the body carries. Lists send no Last-Modified: a delete plus an insert
+    can leave MAX(modified_field) unchanged. PUT, PATCH and DELETE honour
+    If-Match and If-Unmodified-Since with a 412.
+    """
+    modified_field = 'updated_at'
+    etag_dimensions = ()
+    list_version = None
+
+    def get_object(self):
+        # update() and destroy() fetch the object again after the
+        # precondition check; reuse it.
+        if not hasattr(self, '_conditional_object'):
+            self._conditional_object = super().get_object()
+        return self._conditional_object
+
+    def representation_parts(self):
+        return [self.request.accepted_media_type, self.request.build_absolute_uri()] + [
+            dimensions.get_version(dimension) for dimension in self.etag_dimensions]
+
+    def object_validators(self, instance):
+        modified = getattr(instance, self.modified_field)
+        return _etag(instance.pk, modified.isoformat(), *self.representation_parts()), modified
+
+    def conditional_response(self, request, etag, modified):
+        response = get_conditional_response(request, etag=etag, last_modified=_timestamp(modified))
+        if response is not None and response.status_code == 304:
+            self.set_validators(response, etag, modified)
+        return response
+
+    def set_validators(self, response, etag, modified):
+        response['ETag'] = etag
+        if modified is not None:
+            response['Last-Modified'] = http_date(_timestamp(modified))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if self.list_version is not None:
+            etag = _etag(get_list_version(self.list_version), *self.representation_parts())
+        else:
+            state = self.filter_queryset(self.get_queryset()).aggregate(
+                modified=Max(self.modified_field), count=Count('pk'))
+            modified = state['modified']
+            etag = _etag(state['count'], modified.isoformat() if modified else '', *self.representation_parts())
+        response = self.conditional_response(request, etag, None)
+        if response is not None:
+            return response
+        return self.set_validators(super().list(request, *args, **kwargs), etag, None)
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, modified = self.object_validators(self.get_object())
+        response = self.conditional_response(request, etag, modified)
+        if response is not None:
+            return response
+        return self.set_validators(super().retrieve(request, *args, **kwargs), etag, modified)
+
+    def check_preconditions(self, request):
+        etag, modified = self.object_validators(self.get_object())
+        return self.conditional_response(request, etag, modified)
+
+    def update(self, request, *args, **kwargs):
+        response = self.check_preconditions(request)
+        if response is not None:
+            return response
+        return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        response = self.check_preconditions(request)
+        if response is not None:
+            return response
+        return super().destroy(request, *args, **kwargs)
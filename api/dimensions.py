@@ -0,0 +1,72 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import SharedCache, Versions, lazy_cache
+from .models import Segment, Brand
+
+get_store = lazy_cache('DIMENSION_CACHE', 'api:dimension:')
+
+_versions = Versions(get_store)
+
+
+def is_shared():
+    """Whether versions bumped in one process reach the others."""
+    store = get_store()
+    return isinstance(store, SharedCache) and not isinstance(store.cache, LocMemCache)
+
+
+def get_version(dimension):
+    return _versions.get(dimension)
+
+
+def bump(dimension):
+    """Make every process reload ``dimension``, now and once the transaction commits."""
+    _versions.bump(dimension)
+
+
+class DimensionMap:
+    """
+    id -> name of a small table, held in this process and reloaded in one
+    query when the dimension's version in DIMENSION_CACHE changes. An id
+    that is missing (a row inserted without signals, e.g. by raw SQL)
+    reloads it as well.
+    """
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        self.names = {}
+        self.version = None
+
+    def load(self, version):
+        # Replace, never mutate: readers holding the old dict keep a
+        # consistent snapshot. From the primary: names read from a lagging
+        # replica would be kept under the version of a newer rename.
+        queryset = self.model._default_manager.using(DEFAULT_DB_ALIAS)
+        self.names = dict(queryset.values_list('pk', self.field))
+        self.version = version
+
+    def lookup(self):
+        """A name(id) function over the current map; the version is checked once, here."""
+        version = get_version(self.model._meta.model_name)
+        if version != self.version:
+            self.load(version)
+        names, reloaded = self.names, False
+
+        def name(key):
+            nonlocal names, reloaded
+            if key not in names and key is not None and not reloaded:
+                self.load(version)
+                names, reloaded = self.names, True
+            return names.get(key)
+        return name
+
+
+_maps = {
+    'segment': DimensionMap(Segment, 'segment_name'),
+    'brand': DimensionMap(Brand, 'brand_name'),
+}
+
+
+def lookup(dimension):
+    return _maps[dimension].lookup()
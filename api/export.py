@@ -0,0 +1,63 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+from . import dimensions
+
+EXPORT_FIELDS = ('id', 'vehicle_name', 'release_year', 'price', 'segment', 'brand', 'segment_name', 'brand_name')
+EXPORT_COLUMNS = ('id', 'vehicle_name', 'release_year', 'price', 'segment_id', 'brand_id')
+CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    # iterator() streams rows from the cursor instead of caching the whole
+    # result; the names come from api.dimensions instead of joins.
+    segment_name = dimensions.lookup('segment')
+    brand_name = dimensions.lookup('brand')
+    rows = queryset.order_by('id').values_list(*EXPORT_COLUMNS).iterator(chunk_size=chunk_size)
+    return (row + (segment_name(row[4]), brand_name(row[5])) for row in rows)
+
+
+def _batched(lines, chunk_size):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= chunk_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str)
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+
+def streaming_export(queryset, export_format, chunk_size=CHUNK_SIZE):
+    lines = csv_lines if export_format == 'csv' else ndjson_lines
+    response = StreamingHttpResponse(
+        _batched(lines(export_rows(queryset, chunk_size)), chunk_size),
+        content_type=CONTENT_TYPES[export_format],
+    )
+    response['Content-Disposition'] = 'attachment; filename="vehicles.%s"' % export_format
+    return response
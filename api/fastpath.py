@@ -0,0 +1,145 @@
+import copy
+import decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from . import dimensions
+from .profiling import span
+from .serializers import DimensionNameField, VehicleSerializer
+
+# Field types whose to_representation() is the identity for values coming
+# straight out of the database.
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.ReadOnlyField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+def _decimal_converter(field):
+    if field.localize or field.normalize_output or field.decimal_places is None:
+        return field.to_representation
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        value = value.quantize(quantum, rounding=rounding, context=context)
+        return format(value, 'f') if coerce_to_string else value
+    return convert
+
+
+class RowSerializer:
+    """
+    Read-only equivalent of ``serializer_class`` working on values_list()
+    rows instead of model instances.
+
+    The column, output name and converter of every field are worked out
+    once from the serializer's own fields, so each row only costs a zip
+    and the non-trivial conversions (decimals, dimension names).
+    """
+    serializer_class = None
+
+    def __init__(self):
+        self.names = []
+        self.columns = []
+        self.converters = []
+        self.dimensions = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, DimensionNameField):
+                self.dimensions.append((len(self.names), field.dimension))
+            elif isinstance(field, serializers.DecimalField):
+                self.converters.append((len(self.names), _decimal_converter(field)))
+            elif not isinstance(field, PASSTHROUGH_FIELDS):
+                raise ImproperlyConfigured('%s cannot serialize %s field "%s".'
+                                           % (type(self).__name__, type(field).__name__, name))
+            self.names.append(name)
+            self.columns.append('__'.join(field.source_attrs))
+
+    def narrow(self, fields):
+        """A copy serializing only ``fields``, in the serializer's order."""
+        narrowed = copy.copy(self)
+        kept = [index for index, name in enumerate(self.names) if name in fields]
+        narrowed.names = [self.names[index] for index in kept]
+        narrowed.columns = [self.columns[index] for index in kept]
+        narrowed.converters = [(kept.index(index), convert) for index, convert in self.converters
+                               if index in kept]
+        narrowed.dimensions = [(kept.index(index), dimension) for index, dimension in self.dimensions
+                               if index in kept]
+        return narrowed
+
+    def get_rows(self, queryset, keys=()):
+        # Named rows so the paginator can read key columns as attributes;
+        # keys and annotations (e.g. the search rank) trail the serialized
+        # columns.
+        trailing = []
+        for name in (*keys, *queryset.query.annotations):
+            if name not in self.columns and name not in trailing:
+                trailing.append(name)
+        return queryset.values_list(*self.columns, *trailing, named=True)
+
+    def to_representation(self, rows):
+        names = self.names
+        # Dimension names are looked up once per call.
+        converters = self.converters + [(index, dimensions.lookup(dimension))
+                                        for index, dimension in self.dimensions]
+        data = []
+        for row in rows:
+            if converters:
+                row = list(row)
+                for index, convert in converters:
+                    row[index] = convert(row[index])
+            data.append(dict(zip(names, row)))
+        return data
+
+
+class VehicleRowSerializer(RowSerializer):
+    serializer_class = VehicleSerializer
+
+
+_row_serializers = {}
+
+
+class FastListMixin:
+    """Serve list() through ``row_serializer_class`` when FAST_READS is on."""
+    row_serializer_class = None
+
+    def get_row_serializer(self, fields=None):
+        key = (self.row_serializer_class, fields)
+        row_serializer = _row_serializers.get(key)
+        if row_serializer is None:
+            row_serializer = self.row_serializer_class()
+            if fields is not None:
+                row_serializer = row_serializer.narrow(fields)
+            _row_serializers[key] = row_serializer
+        return row_serializer
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, 'FAST_READS', False):
+            return super().list(request, *args, **kwargs)
+        # Rows carry no related objects to expand; those lists take the
+        # serializer path.
+        fieldset = self.get_fieldset() if hasattr(self, 'get_fieldset') else None
+        if fieldset is not None and fieldset.expand:
+            return super().list(request, *args, **kwargs)
+        row_serializer = self.get_row_serializer(fieldset.fields if fieldset is not None else None)
+        keys = self.get_fieldset_keys() if fieldset is not None else ()
+        rows = row_serializer.get_rows(self.filter_queryset(self.get_queryset()), keys)
+        page = self.paginate_queryset(rows)
+        with span('serialize'):
+            data = row_serializer.to_representation(page if page is not None else rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+_sources = {}
+
+
+def get_field_sources(serializer_class):
+    """Readable field name -> source attributes, worked out once per serializer."""
+    sources = _sources.get(serializer_class)
+    if sources is None:
+        sources = _sources[serializer_class] = OrderedDict(
+            (name, field.source_attrs) for name, field in serializer_class().fields.items()
+            if not field.write_only)
+    return sources
+
+
+class Fieldset:
+    """The fields a client asked for (``None`` for all) and the ones to expand."""
+
+    def __init__(self, fields, expand):
+        self.fields = fields
+        self.expand = expand
+
+    def restrict(self, queryset, serializer_class, keys=()):
+        """
+        Load only the columns behind the selected fields plus ``keys``,
+        joining a related table only for a name or an expansion that
+        reads from it.
+        """
+        columns, related = set(keys), set()
+        for name, attrs in get_field_sources(serializer_class).items():
+            if self.fields is not None and name not in self.fields:
+                continue
+            if name in self.expand or len(attrs) > 1:
+                related.add(attrs[0])
+            columns.add('__'.join(attrs))
+        queryset = queryset.select_related(None)
+        if related:
+            # select_related() without names would follow every foreign key.
+            queryset = queryset.select_related(*sorted(related))
+        return queryset.only(*sorted(columns))
+
+
+def _names(params, param):
+    value = params.get(param)
+    if value is None:
+        return None
+    # An empty value (?fields=) counts as no parameter, not as no fields.
+    return [name.strip() for name in value.split(',') if name.strip()] or None
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=id,price`` narrows read responses, and the columns loaded for
+    them, to the named serializer fields. ``?expand=segment`` inlines the
+    related object in place of its id, for the serializer's
+    ``expandable_fields``. Without either parameter, or with empty ones,
+    nothing changes.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def get_fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = self.parse_fieldset()
+        return self._fieldset
+
+    def parse_fieldset(self):
+        params = self.request.query_params
+        fields = _names(params, self.fields_query_param)
+        expand = _names(params, self.expand_query_param)
+        if self.request.method not in SAFE_METHODS or (fields is None and expand is None):
+            return None
+        serializer_class = self.get_serializer_class()
+        available = get_field_sources(serializer_class)
+        expandable = getattr(serializer_class, 'expandable_fields', {})
+        errors = {}
+        unknown = [name for name in fields or () if name not in available]
+        if unknown:
+            errors[self.fields_query_param] = ['Unknown field(s): %s.' % ', '.join(unknown)]
+        unknown = [name for name in expand or () if name not in expandable]
+        if unknown:
+            errors[self.expand_query_param] = ['Cannot expand: %s.' % ', '.join(unknown)]
+        if errors:
+            raise ValidationError(errors)
+        expand = frozenset(expand or ())
+        # Expanding a field also selects it.
+        return Fieldset(None if fields is None else frozenset(fields) | expand, expand)
+
+    def get_fieldset_keys(self):
+        """Columns the view reads itself: the pk, the ordering column and ``modified_field``."""
+        keys = [self.queryset.model._meta.pk.name]
+        ordering = self.request.query_params.get('ordering', '').lstrip('-')
+        if ordering in {name.lstrip('-') for name in getattr(self, 'keyset_orderings', ())}:
+            keys.append(ordering)
+        modified_field = getattr(self, 'modified_field', None)
+        if modified_field:
+            keys.append(modified_field)
+        return keys
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+        return fieldset.restrict(queryset, self.get_serializer_class(), self.get_fieldset_keys())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fieldset'] = self.get_fieldset()
+        return context
+
+
+class FieldsetSerializerMixin:
+    """Applies the view's Fieldset (``context['fieldset']``) to the serialized fields."""
+    expandable_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if fieldset is None:
+            return fields
+        for name in fieldset.expand:
+            fields[name] = self.expandable_fields[name](read_only=True)
+        if fieldset.fields is not None:
+            fields = OrderedDict((name, field) for name, field in fields.items() if name in fieldset.fields)
+        return fields
@@ -0,0 +1,84 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import MAX_INTEGER
+from . import search
+
+
+def _parse_int(value):
+    result = int(value)
+    if not -MAX_INTEGER - 1 <= result <= MAX_INTEGER:
+        raise ValueError(value)
+    return result
+
+
+def _parse_decimal(value):
+    try:
+        result = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(value)
+    if not result.is_finite():
+        raise ValueError(value)
+    return result
+
+
+class VehicleFilterBackend(BaseFilterBackend):
+    """
+    Server-side filters for VehicleViewSet.
+
+    ``release_year_min``/``release_year_max`` and ``price_min``/``price_max``
+    are inclusive ranges. ``brand``, ``segment`` and ``user`` take one id or
+    a comma separated list of ids. Each filter is covered by an index on
+    Vehicle, alone or combined with the keyset orderings. ``search`` matches
+    vehicle names through the full-text index and annotates ``rank``.
+    """
+    range_filters = (
+        ('release_year', _parse_int),
+        ('price', _parse_decimal),
+    )
+    id_filters = ('brand', 'segment', 'user')
+
+    def filter_queryset(self, request, queryset, view):
+        lookups, text = self.get_lookups(request.query_params)
+        queryset = queryset.filter(**lookups)
+        if text:
+            queryset = search.search(queryset, text)
+        return queryset
+
+    def get_lookups(self, params):
+        """The filter() lookups and the search text ``params`` ask for."""
+        lookups = {}
+        errors = {}
+
+        for field, parse in self.range_filters:
+            for suffix, op in (('_min', 'gte'), ('_max', 'lte')):
+                name = field + suffix
+                if name not in params:
+                    continue
+                try:
+                    lookups['%s__%s' % (field, op)] = parse(params[name])
+                except ValueError:
+                    errors[name] = ['A valid number is required.']
+
+        for field in self.id_filters:
+            if field not in params:
+                continue
+            try:
+                ids = [_parse_int(value) for value in params[field].split(',')]
+            except ValueError:
+                errors[field] = ['A comma separated list of ids is required.']
+                continue
+            if len(ids) == 1:
+                lookups['%s_id' % field] = ids[0]
+            else:
+                lookups['%s_id__in' % field] = ids
+
+        text = params.get('search')
+        if text is not None and len(text) > search.MAX_LENGTH:
+            errors['search'] = ['Ensure this field has no more than %d characters.' % search.MAX_LENGTH]
+
+        if errors:
+            raise ValidationError(errors)
+        return lookups, text
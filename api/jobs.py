@@ -0,0 +1,199 @@
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Due jobs a worker tries to lock per claim() before giving up the round.
+CLAIM_CANDIDATES = 10
+# Seconds between a worker's sweeps of expired files in JOB_OUTPUT_DIR.
+CLEANUP_INTERVAL = 60
+
+JobKind = namedtuple('JobKind', 'handler serializer_class staff_only max_attempts')
+
+_kinds = {}
+
+
+class LockLost(Exception):
+    """The job's visibility timeout expired and another worker took it over."""
+
+
+def register(kind, serializer_class=None, staff_only=False, max_attempts=None):
+    """
+    Register ``handler(job)`` for ``kind``; its return value is stored as
+    the job's result. Only kinds with a ``serializer_class`` validating the
+    payload can be submitted through the API.
+    """
+    def decorator(handler):
+        _kinds[kind] = JobKind(handler, serializer_class, staff_only, max_attempts)
+        return handler
+    return decorator
+
+
+def get_kind(kind):
+    return _kinds.get(kind)
+
+
+def submittable_kinds():
+    return sorted(kind for kind, options in _kinds.items() if options.serializer_class is not None)
+
+
+def get_output_dir():
+    return str(getattr(settings, 'JOB_OUTPUT_DIR', 'job_output'))
+
+
+def remove_expired_output():
+    """Delete the files in JOB_OUTPUT_DIR older than JOB_OUTPUT_MAX_AGE seconds; returns how many."""
+    cutoff = time.time() - getattr(settings, 'JOB_OUTPUT_MAX_AGE', 86400)
+    removed = 0
+    try:
+        entries = list(os.scandir(get_output_dir()))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Removed by another worker meanwhile.
+            pass
+    return removed
+
+
+def _visibility_timeout():
+    return timedelta(seconds=getattr(settings, 'JOB_VISIBILITY_TIMEOUT', 300))
+
+
+def active(kind, key):
+    """The queued or running job of ``kind`` with ``key``, or None."""
+    return Job.objects.filter(kind=kind, key=key, status__in=[Job.QUEUED, Job.RUNNING]).first()
+
+
+def enqueue(kind, payload=None, user=None, key='', max_attempts=None):
+    """Queue a job, or return the queued or running one of ``kind`` with the same ``key``."""
+    if key:
+        job = active(kind, key)
+        if job is not None:
+            return job
+    max_attempts = max_attempts or _kinds[kind].max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+    return Job.objects.create(kind=kind, key=key, payload=payload or {}, user=user, max_attempts=max_attempts)
+
+
+def claim(worker):
+    """
+    Lock the next due job for ``worker``: a queued one whose run_after has
+    passed, or a running one whose worker let its lock expire. Returns
+    None when there is none.
+    """
+    now = timezone.now()
+    due = Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now)
+    candidates = Job.objects.filter(due).order_by('run_after', 'id').values_list('id', 'attempts')
+    for pk, attempts in candidates[:CLAIM_CANDIDATES]:
+        # Every claim bumps attempts, so only one of the workers racing for
+        # a job matches.
+        claimed = Job.objects.filter(due, pk=pk, attempts=attempts).update(
+            status=Job.RUNNING, locked_by=worker, locked_until=now + _visibility_timeout(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def _owned(job):
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by, attempts=job.attempts)
+
+
+def heartbeat(job, progress=None):
+    """
+    Extend the lock of a running job by JOB_VISIBILITY_TIMEOUT, recording
+    ``progress``. Long handlers call this between steps; it raises LockLost
+    when the job has been taken over.
+    """
+    values = {'locked_until': timezone.now() + _visibility_timeout()}
+    if progress is not None:
+        values['progress'] = job.progress = progress
+    if not _owned(job).update(**values):
+        raise LockLost(job.pk)
+
+
+def execute(job):
+    """Run a claimed job and record its outcome, queuing a retry on failure."""
+    kind = _kinds.get(job.kind)
+    now = timezone.now()
+    if kind is None:
+        outcome = {'status': Job.FAILED, 'error': 'Unknown job kind "%s".' % job.kind}
+    elif job.attempts > job.max_attempts:
+        outcome = {'status': Job.FAILED, 'error': 'Timed out after %d attempts.' % job.max_attempts}
+    else:
+        try:
+            outcome = {'status': Job.DONE, 'result': kind.handler(job), 'error': ''}
+        except LockLost:
+            logger.warning('Job %s was taken over by another worker', job.pk)
+            return
+        except Exception as exc:
+            logger.exception('Job %s (%s) failed, attempt %d of %d', job.pk, job.kind, job.attempts,
+                             job.max_attempts)
+            outcome = {'status': Job.FAILED, 'error': str(exc)}
+            if job.attempts < job.max_attempts:
+                delay = getattr(settings, 'JOB_RETRY_DELAY', 10) * 2 ** (job.attempts - 1)
+                outcome.update(status=Job.QUEUED, run_after=now + timedelta(seconds=delay))
+    if outcome['status'] != Job.QUEUED:
+        outcome['finished_at'] = timezone.now()
+    # A worker that lost its lock must not overwrite the new owner's outcome.
+    _owned(job).update(locked_until=None, **outcome)
+
+
+class Worker:
+    """Claims and runs jobs one at a time; run_workers starts one per process."""
+
+    def __init__(self, name=None):
+        self.name = name or '%s:%d:%s' % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self.stopping = False
+
+    def stop(self):
+        """Finish the current job, then return from run()."""
+        self.stopping = True
+
+    def run_once(self):
+        """Run one due job; False when there was none."""
+        job = claim(self.name)
+        if job is None:
+            return False
+        execute(job)
+        return True
+
+    def run(self, burst=False, poll_interval=None):
+        """
+        Run jobs until stop() is called, or in ``burst`` mode until none is
+        due. Returns the number of jobs run.
+        """
+        if poll_interval is None:
+            poll_interval = getattr(settings, 'JOB_POLL_INTERVAL', 1)
+        done = 0
+        cleaned_at = None
+        while not self.stopping:
+            if cleaned_at is None or time.monotonic() - cleaned_at >= CLEANUP_INTERVAL:
+                remove_expired_output()
+                cleaned_at = time.monotonic()
+            close_old_connections()
+            if self.run_once():
+                done += 1
+            elif burst:
+                break
+            else:
+                time.sleep(poll_interval)
+        close_old_connections()
+        return done
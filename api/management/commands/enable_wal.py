@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Switch an SQLite database to WAL journal mode, so readers run alongside the writer. '
+            'The mode is stored in the database file: run it once when deploying.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='database alias; defaults to "default"')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('enable_wal only applies to SQLite databases.')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode = WAL')
+            mode = cursor.fetchone()[0]
+        if mode != 'wal':
+            raise CommandError('The database stayed in %s journal mode.' % mode)
+        self.stdout.write(self.style.SUCCESS('%s is in WAL mode.' % connection.settings_dict['NAME']))
@@ -0,0 +1,174 @@
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.conditional import bump_list_version
+from api.filters import _parse_int
+from api.models import Segment, Brand, Vehicle
+from api import stats
+
+REQUIRED_COLUMNS = ('vehicle_name', 'release_year', 'price', 'segment_name', 'brand_name')
+
+
+class NameMap:
+    """name -> id map for a dimension table, creating missing rows on demand."""
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        self.ids = {}
+        for pk, name in model.objects.order_by('-id').values_list('id', field):
+            self.ids[name] = pk
+
+    def resolve(self, names):
+        for name in sorted(set(names) - set(self.ids)):
+            self.ids[name] = self.model.objects.create(**{self.field: name}).id
+        return self.ids
+
+
+def read_csv(stream):
+    return csv.DictReader(stream)
+
+
+def read_ndjson(stream):
+    # Decoded in Command.parse so a malformed line is skipped, not fatal.
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+class Command(BaseCommand):
+    help = 'Import vehicles from a CSV or NDJSON file, creating missing segments and brands.'
+
+    readers = {'csv': read_csv, 'ndjson': read_ndjson}
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Username owning the imported vehicles.')
+        parser.add_argument('--format', choices=sorted(self.readers),
+                            help='Input format, guessed from the file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per INSERT statement.')
+        parser.add_argument('--chunk-size', type=int, default=20000,
+                            help='Rows per transaction; progress is checkpointed after each one.')
+        parser.add_argument('--resume', action='store_true',
+                            help='Skip the rows committed by a previous run of the same file.')
+        parser.add_argument('--checkpoint', help='Checkpoint file, defaults to PATH.checkpoint.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if input_format not in self.readers:
+            raise CommandError('Unknown input format "%s", use --format.' % input_format)
+        if options['batch_size'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--batch-size and --chunk-size must be positive.')
+        try:
+            self.user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('User "%s" does not exist.' % options['user'])
+
+        self.batch_size = options['batch_size']
+        self.checkpoint = options['checkpoint'] or path + '.checkpoint'
+        skip = self.read_checkpoint() if options['resume'] else 0
+        self.segments = NameMap(Segment, 'segment_name')
+        self.brands = NameMap(Brand, 'brand_name')
+        self.price_field = Vehicle._meta.get_field('price')
+        self.name_length = Vehicle._meta.get_field('vehicle_name').max_length
+
+        started = time.monotonic()
+        imported = errors = 0
+        record = skip
+        chunk = []
+        with open(path, newline='', encoding='utf-8') as stream:
+            for record, row in enumerate(self.readers[input_format](stream), start=1):
+                if record <= skip:
+                    continue
+                try:
+                    chunk.append(self.parse(row))
+                except (ValueError, TypeError, KeyError, ValidationError) as exc:
+                    errors += 1
+                    self.stderr.write('Record %d skipped: %s' % (record, exc))
+                if len(chunk) >= options['chunk_size']:
+                    imported += self.write_chunk(chunk, record)
+                    chunk = []
+                    self.report(imported, started)
+        if chunk:
+            imported += self.write_chunk(chunk, record)
+        elif record > skip:
+            self.write_checkpoint(record)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            'Imported %d vehicles in %.1fs (%.0f rows/s), %d rows skipped.'
+            % (imported, elapsed, imported / elapsed if elapsed else 0, errors)
+        ))
+
+    def parse(self, row):
+        if isinstance(row, str):
+            row = json.loads(row)
+        if not isinstance(row, dict):
+            raise ValueError('expected an object')
+        # csv.DictReader fills the columns a short row lacks with None.
+        missing = [column for column in REQUIRED_COLUMNS if row.get(column) is None]
+        if missing:
+            raise ValueError('missing %s' % ', '.join(missing))
+        name = str(row['vehicle_name'])
+        if not name or len(name) > self.name_length:
+            raise ValueError('invalid vehicle_name')
+        try:
+            price = Decimal(str(row['price']))
+        except InvalidOperation:
+            raise ValueError('invalid price')
+        self.price_field.run_validators(price)
+        year = row['release_year']
+        try:
+            # int() would truncate 2020.9 from NDJSON.
+            if isinstance(year, float) and not year.is_integer():
+                raise ValueError(year)
+            year = _parse_int(year)
+        except ValueError:
+            raise ValueError('invalid release_year')
+        segment_name, brand_name = str(row['segment_name']), str(row['brand_name'])
+        if not segment_name or not brand_name:
+            raise ValueError('segment_name and brand_name are required')
+        return name, year, price, segment_name, brand_name
+
+    def write_chunk(self, chunk, record):
+        with transaction.atomic():
+            segment_ids = self.segments.resolve(row[3] for row in chunk)
+            brand_ids = self.brands.resolve(row[4] for row in chunk)
+            vehicles = [
+                Vehicle(user=self.user, vehicle_name=name, release_year=year, price=price,
+                        segment_id=segment_ids[segment], brand_id=brand_ids[brand])
+                for name, year, price, segment, brand in chunk
+            ]
+            Vehicle.objects.bulk_create(vehicles, batch_size=self.batch_size)
+            stats.apply_changes(added=vehicles)
+            bump_list_version('vehicle')
+        self.write_checkpoint(record)
+        return len(chunk)
+
+    def report(self, imported, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write('%d rows imported (%.0f rows/s)' % (imported, imported / elapsed if elapsed else 0))
+
+    def read_checkpoint(self):
+        try:
+            with open(self.checkpoint) as stream:
+                return int(stream.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, record):
+        temporary = self.checkpoint + '.tmp'
+        with open(temporary, 'w') as stream:
+            stream.write(str(record))
+        os.replace(temporary, self.checkpoint)
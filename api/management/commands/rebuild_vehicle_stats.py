@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the vehicle price statistics summary table from scratch.'
+
+    def handle(self, *args, **options):
+        groups = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS('Rebuilt %d statistics groups.' % groups))
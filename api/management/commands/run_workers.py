@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api import dimensions, jobs
+
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+def work(burst, poll_interval):
+    """Run a jobs.Worker until it is out of jobs (burst) or SIGINT/SIGTERM."""
+    worker = jobs.Worker()
+    handlers = {number: signal.signal(number, lambda *args: worker.stop()) for number in STOP_SIGNALS}
+    try:
+        return worker.run(burst=burst, poll_interval=poll_interval)
+    finally:
+        for number, handler in handlers.items():
+            signal.signal(number, handler)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs (api.jobs) in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes, one per CPU by default.')
+        parser.add_argument('--poll-interval', type=float,
+                            default=getattr(settings, 'JOB_POLL_INTERVAL', 1),
+                            help='Seconds an idle worker waits before looking for jobs again.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is due instead of waiting for more.')
+
+    def handle(self, *args, **options):
+        processes, burst, poll_interval = options['processes'], options['burst'], options['poll_interval']
+        if processes < 1:
+            raise CommandError('--processes must be positive.')
+        if processes > 1 and not dimensions.is_shared():
+            raise CommandError('Several workers need a DIMENSION_CACHE shared between processes, '
+                               'or they keep serving renamed segments and brands under their old names.')
+        if processes == 1:
+            done = work(burst, poll_interval)
+            self.stdout.write(self.style.SUCCESS('Ran %d jobs.' % done))
+            return
+
+        # Children must not share the parent's database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        self.stopping = False
+
+        def start():
+            child = context.Process(target=work, args=(burst, poll_interval), daemon=True)
+            child.start()
+            return child
+
+        def stop(*args):
+            self.stopping = True
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        children = [start() for _ in range(processes)]
+        handlers = {number: signal.signal(number, stop) for number in STOP_SIGNALS}
+        self.stdout.write('Started %d workers.' % processes)
+        try:
+            while children:
+                for child in list(children):
+                    child.join(poll_interval)
+                    if child.is_alive():
+                        continue
+                    children.remove(child)
+                    if child.exitcode and not self.stopping and not burst:
+                        self.stderr.write('Worker %d exited with %d, restarting it.' % (child.pid, child.exitcode))
+                        children.append(start())
+        finally:
+            for number, handler in handlers.items():
+                signal.signal(number, handler)
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Copy the primary SQLite database onto the replica with the online backup API. '
+            'A local stand-in for replication.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', help='replica file; defaults to the REPLICA_DATABASE NAME')
+        parser.add_argument('--interval', type=float,
+                            help='keep copying every INTERVAL seconds instead of once')
+        parser.add_argument('--pages', type=int, default=1024,
+                            help='pages copied per step; the primary is only locked during a step')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('sync_replica only copies SQLite databases.')
+        target = options['target']
+        if target is None:
+            alias = getattr(settings, 'REPLICA_DATABASE', None)
+            if not alias:
+                raise CommandError('No replica configured; set DATABASE_REPLICA or pass --target.')
+            target = connections[alias].settings_dict['NAME']
+
+        while True:
+            started = time.monotonic()
+            primary.ensure_connection()
+            replica = sqlite3.connect(str(target))
+            try:
+                primary.connection.backup(replica, pages=options['pages'])
+            finally:
+                replica.close()
+            self.stdout.write('Synced %s in %.2fs.' % (target, time.monotonic() - started))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,295 @@
+import contextvars
+import ipaddress
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.permissions import BasePermission
+from rest_framework.renderers import BaseRenderer
+
+from . import response_cache
+from .authentication import get_token_cache
+from .middleware import ContextMiddleware
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'api_requests_total': (
+        'counter', 'Requests handled, by route, method and status.', None),
+    'api_request_duration_seconds': (
+        'histogram', 'Time from the first middleware to the response.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)),
+    'api_response_size_bytes': (
+        'histogram', 'Response body size; streaming responses are not observed.',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)),
+    'api_db_queries': (
+        'histogram', 'SQL statements executed per request.',
+        (0, 1, 2, 3, 5, 10, 20, 50, 100)),
+    'api_cache_hits_total': ('counter', 'Cache lookups answered from the cache.', None),
+    'api_cache_misses_total': ('counter', 'Cache lookups that missed.', None),
+}
+
+_queries = contextvars.ContextVar('api_metrics_queries', default=None)
+
+
+class _QueryCount:
+    __slots__ = ('count', 'started')
+
+    def __init__(self):
+        self.count = 0
+        self.started = time.perf_counter()
+
+
+def count_query(execute, sql, params, many, context):
+    counter = _queries.get()
+    if counter is not None:
+        counter.count += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(connection):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class Registry:
+    """
+    Counters and histograms of one process.
+
+    Each thread records into its own shard, so recording never takes a
+    lock; shards are only merged when collected. Histograms are stored as
+    per-bucket counts (the last one is +Inf) followed by the sum.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._next_flush = 0
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, labels, value=1):
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        histograms = self._shard()[1]
+        key = (name, labels)
+        buckets = METRICS[name][2]
+        state = histograms.get(key)
+        if state is None:
+            state = histograms[key] = [0] * (len(buckets) + 2)
+        index = 0
+        while index < len(buckets) and value > buckets[index]:
+            index += 1
+        state[index] += 1
+        state[-1] += value
+
+    def snapshot(self):
+        """This process's metrics, including the current cache statistics."""
+        counters, histograms = {}, {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard_counters, shard_histograms in shards:
+            _merge(counters, histograms, dict(shard_counters).items(),
+                   ((key, list(state)) for key, state in dict(shard_histograms).items()))
+        for cache, stats in _cache_stats():
+            counters[('api_cache_hits_total', (('cache', cache),))] = stats['hits']
+            counters[('api_cache_misses_total', (('cache', cache),))] = stats['misses']
+        return counters, histograms
+
+    def flush(self, directory):
+        """Write this process's snapshot to ``directory`` for the other processes to read."""
+        counters, histograms = self.snapshot()
+        data = {
+            'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+            'histograms': [[name, labels, state] for (name, labels), state in histograms.items()],
+        }
+        path = os.path.join(directory, 'metrics-%d.json' % os.getpid())
+        with open(path + '.tmp', 'w') as output:
+            json.dump(data, output)
+        os.replace(path + '.tmp', path)
+
+    def maybe_flush(self, directory, interval):
+        now = time.monotonic()
+        if now >= self._next_flush:
+            self._next_flush = now + interval
+            self.flush(directory)
+
+
+registry = Registry()
+
+
+def _merge(counters, histograms, counter_items, histogram_items):
+    for key, value in counter_items:
+        counters[key] = counters.get(key, 0) + value
+    for key, state in histogram_items:
+        current = histograms.get(key)
+        if current is None:
+            histograms[key] = state
+        else:
+            for index, value in enumerate(state):
+                current[index] += value
+
+
+def _cache_stats():
+    yield 'token', get_token_cache().stats()
+    for namespace, stats in sorted(response_cache.stats().items()):
+        yield 'response:' + namespace, stats
+
+
+def collect():
+    """Metrics of this process, or of every process writing to METRICS_MULTIPROCESS_DIR."""
+    directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+    if not directory:
+        return registry.snapshot()
+    registry.flush(directory)
+    counters, histograms = {}, {}
+    for filename in sorted(os.listdir(directory)):
+        if not (filename.startswith('metrics-') and filename.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as source:
+                data = json.load(source)
+        except (OSError, ValueError):
+            continue
+        _merge(counters, histograms,
+               (((name, _labels(labels)), value) for name, labels, value in data['counters']),
+               (((name, _labels(labels)), state) for name, labels, state in data['histograms']))
+    return counters, histograms
+
+
+def _labels(pairs):
+    return tuple(tuple(pair) for pair in pairs)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape(value)) for name, value in pairs)
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def exposition(counters, histograms):
+    """Prometheus text format (version 0.0.4) of collected metrics."""
+    lines = []
+    hit_ratios = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s %s' % (name, kind))
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append('%s%s %s' % (name, _format_labels(labels), _format_value(value)))
+            continue
+        for (metric, labels), state in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(tuple(buckets) + ('+Inf',), state):
+                cumulative += count
+                lines.append('%s_bucket%s %d' % (name, _format_labels(labels, (('le', bound),)), cumulative))
+            lines.append('%s_sum%s %s' % (name, _format_labels(labels), _format_value(state[-1])))
+            lines.append('%s_count%s %d' % (name, _format_labels(labels), cumulative))
+
+    for (metric, labels), hits in sorted(counters.items()):
+        if metric == 'api_cache_hits_total':
+            lookups = hits + counters.get(('api_cache_misses_total', labels), 0)
+            if lookups:
+                hit_ratios.append((labels, float(hits) / lookups))
+    lines.append('# HELP api_cache_hit_ratio Share of cache lookups answered from the cache.')
+    lines.append('# TYPE api_cache_hit_ratio gauge')
+    for labels, ratio in hit_ratios:
+        lines.append('api_cache_hit_ratio%s %s' % (_format_labels(labels), _format_value(ratio)))
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware(ContextMiddleware):
+    """
+    Records requests, latency, response size and query count of every
+    request resolved to a route of the ``api`` namespace. With
+    METRICS_MULTIPROCESS_DIR set, each process writes its totals there at
+    most every METRICS_FLUSH_INTERVAL seconds and the endpoint sums the
+    files; empty the directory when the server starts.
+    """
+
+    context_var = _queries
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+        self.flush_interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+
+    def start(self, request):
+        # Sync views under ASGI run in a copy of this context, so they count
+        # into the same _QueryCount.
+        return _QueryCount()
+
+    def finish(self, request, response, counter):
+        match = request.resolver_match
+        if match is None or not match.view_name.startswith('api:') or match.view_name == 'api:metrics':
+            return response
+        labels = (('route', match.view_name), ('method', request.method))
+        registry.inc('api_requests_total', labels + (('status', str(response.status_code)),))
+        registry.observe('api_request_duration_seconds', labels, time.perf_counter() - counter.started)
+        registry.observe('api_db_queries', labels, counter.count)
+        if not response.streaming:
+            registry.observe('api_response_size_bytes', labels, len(response.content))
+        if self.directory:
+            registry.maybe_flush(self.directory, self.flush_interval)
+        return response
+
+
+class MetricsAllowList(BasePermission):
+    """Only lets clients whose address is in METRICS_ALLOWED_IPS (addresses or networks) through."""
+
+    def has_permission(self, request, view):
+        try:
+            address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+        except ValueError:
+            return False
+        for allowed in getattr(settings, 'METRICS_ALLOWED_IPS', ()):
+            if address in ipaddress.ip_network(allowed, strict=False):
+                return True
+        return False
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain; version=0.0.4'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = '%s\n' % data.get('detail', '')
+        return data.encode(self.charset)
+
+
+class FirstRendererNegotiation(BaseContentNegotiation):
+    """Scrapers send a variety of Accept headers; always answer in the text format."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0] if parsers else None
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
@@ -0,0 +1,50 @@
+import asyncio
+
+
+class ContextMiddleware:
+    """
+    Runs the rest of the request with ``context_var`` set to the state
+    ``start(request)`` returns, then hands the response to
+    ``finish(request, response, state)``. A None state skips both. Under
+    ASGI it stays async, as Django's MiddlewareMixin does, without moving
+    the request to the handler's one sync thread.
+    """
+    sync_capable = True
+    async_capable = True
+    context_var = None
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # As in MiddlewareMixin, so the handler awaits us.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        state = self.start(request)
+        if state is None:
+            return self.get_response(request)
+        token = self.context_var.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.context_var.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        if state is None:
+            return await self.get_response(request)
+        token = self.context_var.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.context_var.reset(token)
+        return self.finish(request, response, state)
+
+    def start(self, request):
+        raise NotImplementedError
+
+    def finish(self, request, response, state):
+        return response
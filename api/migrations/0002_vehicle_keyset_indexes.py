@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['release_year', 'id'], name='vehicle_year_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['price', 'id'], name='vehicle_price_id_idx'),
+        ),
+    ]
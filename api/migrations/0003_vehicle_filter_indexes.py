@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_vehicle_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['brand', 'release_year', 'id'], name='vehicle_brand_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['brand', 'price', 'id'], name='vehicle_brand_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['segment', 'release_year', 'id'], name='vehicle_segment_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['segment', 'price', 'id'], name='vehicle_segment_price_idx'),
+        ),
+    ]
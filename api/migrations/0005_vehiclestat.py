@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_vehicle_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('segment', 'Segment'), ('brand', 'Brand'), ('release_year', 'Release year')], max_length=20)),
+                ('key', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('price_min', models.DecimalField(decimal_places=2, max_digits=6, null=True)),
+                ('price_max', models.DecimalField(decimal_places=2, max_digits=6, null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='vehiclestat',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key'), name='vehiclestat_dimension_key_uniq'),
+        ),
+    ]
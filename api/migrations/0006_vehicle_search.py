@@ -0,0 +1,55 @@
+from django.db import migrations
+
+# Full-text indexes over api_vehicle.vehicle_name, kept in sync by triggers
+# so bulk and raw writes are covered too. SQLite only; other databases
+# fall back to icontains in api.search.
+INDEXES = (
+    ('api_vehicle_search', "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'", (3, 27, 0)),
+    ('api_vehicle_trigram', "tokenize = 'trigram'", (3, 34, 0)),
+)
+
+
+def _index_sql(table, options):
+    return [
+        "CREATE VIRTUAL TABLE %s USING fts5(vehicle_name, content = 'api_vehicle', content_rowid = 'id', %s)"
+        % (table, options),
+        'CREATE TRIGGER %(t)s_insert AFTER INSERT ON api_vehicle BEGIN '
+        'INSERT INTO %(t)s (rowid, vehicle_name) VALUES (new.id, new.vehicle_name); END' % {'t': table},
+        'CREATE TRIGGER %(t)s_delete AFTER DELETE ON api_vehicle BEGIN '
+        "INSERT INTO %(t)s (%(t)s, rowid, vehicle_name) VALUES ('delete', old.id, old.vehicle_name); END"
+        % {'t': table},
+        'CREATE TRIGGER %(t)s_update AFTER UPDATE OF vehicle_name ON api_vehicle BEGIN '
+        "INSERT INTO %(t)s (%(t)s, rowid, vehicle_name) VALUES ('delete', old.id, old.vehicle_name); "
+        'INSERT INTO %(t)s (rowid, vehicle_name) VALUES (new.id, new.vehicle_name); END' % {'t': table},
+        "INSERT INTO %(t)s (%(t)s) VALUES ('rebuild')" % {'t': table},
+    ]
+
+
+def create_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    for table, options, version in INDEXES:
+        if connection.Database.sqlite_version_info >= version:
+            for sql in _index_sql(table, options):
+                schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, options, version in INDEXES:
+        for suffix in ('insert', 'delete', 'update'):
+            schema_editor.execute('DROP TRIGGER IF EXISTS %s_%s' % (table, suffix))
+        schema_editor.execute('DROP TABLE IF EXISTS %s' % table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_vehiclestat'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
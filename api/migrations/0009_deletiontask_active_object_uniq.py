@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_job'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='deletiontask',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('target', 'object_id'), name='deletiontask_active_object_uniq'),
+        ),
+    ]
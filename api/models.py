@@ -1,6 +1,10 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+# SQLite integers are signed 64-bit; larger ones overflow in a query.
+MAX_INTEGER = 2 ** 63 - 1
+
 
 class Segment(models.Model):
     segment_name = models.CharField(max_length=100)
@@ -32,7 +36,140 @@ class Vehicle(models.Model):
         Brand,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['release_year', 'id'], name='vehicle_year_id_idx'),
+            models.Index(fields=['price', 'id'], name='vehicle_price_id_idx'),
+            models.Index(fields=['brand', 'release_year', 'id'], name='vehicle_brand_year_idx'),
+            models.Index(fields=['brand', 'price', 'id'], name='vehicle_brand_price_idx'),
+            models.Index(fields=['segment', 'release_year', 'id'], name='vehicle_segment_year_idx'),
+            models.Index(fields=['segment', 'price', 'id'], name='vehicle_segment_price_idx'),
+        ]
 
     def __str__(self):
         return self.vehicle_name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets api.stats see what a save() changes without re-reading the row.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class VehicleStat(models.Model):
+    SEGMENT = 'segment'
+    BRAND = 'brand'
+    RELEASE_YEAR = 'release_year'
+    DIMENSION_CHOICES = [
+        (SEGMENT, 'Segment'),
+        (BRAND, 'Brand'),
+        (RELEASE_YEAR, 'Release year'),
+    ]
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.IntegerField()
+    count = models.IntegerField(default=0)
+    price_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    price_min = models.DecimalField(max_digits=6, decimal_places=2, null=True)
+    price_max = models.DecimalField(max_digits=6, decimal_places=2, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='vehiclestat_dimension_key_uniq'),
+        ]
+
+    def __str__(self):
+        return '%s=%s' % (self.dimension, self.key)
+
+    @property
+    def price_avg(self):
+        return self.price_sum / self.count if self.count else None
+
+
+class DeletionTask(models.Model):
+    SEGMENT = 'segment'
+    BRAND = 'brand'
+    TARGET_CHOICES = [
+        (SEGMENT, 'Segment'),
+        (BRAND, 'Brand'),
+    ]
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE
+    )
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    object_id = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    total = models.IntegerField(default=0)
+    deleted = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        constraints = [
+            # One deletion at a time per object.
+            models.UniqueConstraint(fields=['target', 'object_id'],
+                                    condition=models.Q(status__in=['pending', 'running']),
+                                    name='deletiontask_active_object_uniq'),
+        ]
+
+    def __str__(self):
+        return '%s=%s (%s)' % (self.target, self.object_id, self.status)
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True
+    )
+    kind = models.CharField(max_length=50)
+    # Jobs of one kind with the same non-empty key are not queued twice.
+    key = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=1)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True)
+    progress = models.IntegerField(default=0)
+    result = models.JSONField(null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['kind', 'key'], name='job_kind_key_idx'),
+        ]
+
+    def __str__(self):
+        return '%s #%s (%s)' % (self.kind, self.pk, self.status)
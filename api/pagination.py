@@ -0,0 +1,268 @@
+import hashlib
+import json
+import math
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .cache import lazy_cache
+from .conditional import get_list_version
+from .models import MAX_INTEGER
+from .routers import use_primary
+
+get_count_store = lazy_cache('PAGINATION_COUNT', 'api:count:')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a unique key tuple, e.g. (release_year, id).
+
+    Each page is fetched with a range condition on the key of the last row
+    seen, so the cost of a page does not grow with its depth. Views choose
+    the orderings clients may ask for with ``keyset_orderings`` (or
+    ``get_keyset_orderings()``); every ordering is made unique by appending
+    ``id``.
+    """
+    page_size = api_settings.PAGE_SIZE or 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    default_orderings = ('id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, view)
+        self.key = self.get_key(self.ordering)
+        self.reverse, position = self.decode_cursor(request, queryset)
+
+        order_by = list(self.key)
+        if self.reverse:
+            order_by = [self._flip(term) for term in order_by]
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            queryset = queryset.filter(self.after_condition(position, self.reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+
+        self.has_next = self.has_more if not self.reverse else True
+        self.has_previous = position is not None if not self.reverse else self.has_more
+        if not self.page:
+            self.has_next = self.has_previous = False
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_orderings(self, view):
+        if hasattr(view, 'get_keyset_orderings'):
+            return view.get_keyset_orderings()
+        return getattr(view, 'keyset_orderings', self.default_orderings)
+
+    def get_ordering(self, request, view):
+        orderings = self.get_orderings(view)
+        ordering = request.query_params.get(self.ordering_query_param)
+        if not ordering:
+            return orderings[0]
+        if ordering not in orderings:
+            raise ValidationError({
+                self.ordering_query_param: ['Ordering must be one of: %s.' % ', '.join(orderings)]
+            })
+        return ordering
+
+    def get_key(self, ordering):
+        descending = ordering.startswith('-')
+        field = ordering.lstrip('-')
+        key = [field] if field == 'id' else [field, 'id']
+        return [('-' + name) if descending else name for name in key]
+
+    def after_condition(self, position, reverse):
+        # (a, b) > (x, y) spelled as a >= x AND (a > x OR b > y) so the
+        # leading column stays usable as an index range.
+        condition = None
+        for index in reversed(range(len(self.key))):
+            field, value = self._lookup(self.key[index], position[index], reverse, strict=True)
+            strict = Q(**{field: value})
+            if condition is None:
+                condition = strict
+            else:
+                loose_field, _ = self._lookup(self.key[index], position[index], reverse, strict=False)
+                condition = Q(**{loose_field: value}) & (strict | condition)
+        return condition
+
+    def decode_cursor(self, request, queryset=None):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            reverse = bool(data['r'])
+            position = list(data['p'])
+            if data['o'] != self.ordering or len(position) != len(self.key):
+                raise ValueError
+            if queryset is not None:
+                position = [self._coerce(queryset, term.lstrip('-'), value)
+                            for term, value in zip(self.key, position)]
+        except (TypeError, ValueError, KeyError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def _coerce(self, queryset, name, value):
+        # Cursors come from clients: a value must be one the key column
+        # could hold before it reaches a query.
+        if value is None or isinstance(value, (bool, list, dict)):
+            raise ValueError(value)
+        annotation = queryset.query.annotations.get(name)
+        field = annotation.output_field if annotation is not None else queryset.model._meta.get_field(name)
+        value = field.to_python(value)
+        if isinstance(value, (float, Decimal)) and not math.isfinite(value):
+            raise ValueError(value)
+        if isinstance(value, int) and not -MAX_INTEGER - 1 <= value <= MAX_INTEGER:
+            raise ValueError(value)
+        field.run_validators(value)
+        return value
+
+    def encode_cursor(self, row, reverse):
+        position = [self._key_value(row, field.lstrip('-')) for field in self.key]
+        data = json.dumps({'o': self.ordering, 'r': int(reverse), 'p': position},
+                          separators=(',', ':'), default=str)
+        encoded = urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def _key_value(self, row, field):
+        value = row[field] if isinstance(row, dict) else getattr(row, field)
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def _flip(self, term):
+        return term[1:] if term.startswith('-') else '-' + term
+
+    def _lookup(self, term, value, reverse, strict):
+        descending = term.startswith('-') != reverse
+        op = 'lt' if descending else 'gt'
+        if not strict:
+            op += 'e'
+        return '%s__%s' % (term.lstrip('-'), op), value
+
+
+class CountingKeysetPagination(KeysetPagination):
+    """
+    KeysetPagination whose pages also carry the ``count`` of the whole list.
+
+    A list of up to PAGINATION_COUNT['EXACT_THRESHOLD'] rows is counted
+    exactly by a query that stops after that many rows. A larger one is
+    counted by the view's ``get_summary_count()``, if it returns a number,
+    else by one COUNT(*) on the primary, cached until the view's
+    ``list_version`` changes or for PAGINATION_COUNT['TIMEOUT'] seconds;
+    the latter sets ``count_approximate``.
+    """
+
+    def __init__(self):
+        self.counted = None
+
+    def get_exact_count_threshold(self):
+        return getattr(settings, 'PAGINATION_COUNT', {}).get('EXACT_THRESHOLD', 10000)
+
+    def count_queryset(self, queryset, view=None):
+        """{'count', 'approximate'} for the list, kept for paginate_queryset()."""
+        threshold = self.get_exact_count_threshold()
+        # values('pk') drops annotations such as the search rank.
+        state = queryset.order_by().values('pk')[:threshold + 1].aggregate(count=Count('pk'))
+        state['approximate'] = False
+        if state['count'] > threshold:
+            state['count'], state['approximate'] = self.count_large(queryset, view)
+        self.counted = state
+        return state
+
+    def count_large(self, queryset, view):
+        count = view.get_summary_count() if hasattr(view, 'get_summary_count') else None
+        if count is not None:
+            return count, False
+        rows = queryset.order_by().values('pk')
+        sql, params = rows.query.sql_with_params()
+        version = getattr(view, 'list_version', None)
+        variant = '%s|%s|%r' % (get_list_version(version) if version else '', sql, params)
+        key = hashlib.sha1(variant.encode('utf-8')).hexdigest()
+        store = get_count_store()
+        count = store.get(key)
+        if count is None:
+            # A lagging replica would store an old count under the new version.
+            use_primary()
+            count = rows.count()
+            store.set(key, count)
+        return count, True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.counted is None:
+            self.count_queryset(queryset, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.counted['count']),
+            ('count_approximate', self.counted['approximate']),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties'] = OrderedDict([
+            ('count', {'type': 'integer'}),
+            ('count_approximate', {'type': 'boolean'}),
+        ], **schema['properties'])
+        return schema
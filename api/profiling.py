@@ -0,0 +1,160 @@
+import asyncio
+import contextvars
+import logging
+import random
+import time
+import types
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.serializers import ListSerializer
+
+from .middleware import ContextMiddleware
+
+logger = logging.getLogger(__name__)
+
+_profile = contextvars.ContextVar('api_profile', default=None)
+
+SPANS = ('auth', 'view', 'serialize', 'render')
+
+
+class Profile:
+    """Timings of one sampled request, in seconds."""
+    __slots__ = ('started', 'spans', 'queries', 'db_time', 'view_started', 'render_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_started = None
+        self.render_started = None
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def metrics(self, total):
+        metrics = [('db', self.db_time, '%d queries' % self.queries)]
+        metrics.extend((name, self.spans[name], None) for name in SPANS if name in self.spans)
+        metrics.append(('total', total, None))
+        return metrics
+
+
+@contextmanager
+def span(name):
+    """Add the time spent in the block to ``name`` of the request being profiled, if any."""
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.db_time += time.perf_counter() - started
+
+
+def install_query_timer(connection):
+    # connection_created fires on every reconnect of the same wrapper.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class SerializeSpanMixin:
+    """
+    Times the top-level objects a serializer turns into primitives as the
+    'serialize' span; nested fields and list items of a list serializer
+    are counted inside their parent.
+    """
+
+    def to_representation(self, instance):
+        parent = self.parent
+        if parent is None or (isinstance(parent, ListSerializer) and parent.parent is None):
+            with span('serialize'):
+                return super().to_representation(instance)
+        return super().to_representation(instance)
+
+
+class ProfilingMiddleware(ContextMiddleware):
+    """
+    Profiles a ``PROFILING_SAMPLE_RATE`` share of requests: query count and
+    DB time, plus the auth, view, serialize and render spans. Spans overlap
+    (auth and serialize happen inside the view). Results go to the
+    api.profiling logger, with the numbers in the record's ``profile``, and
+    to a Server-Timing header when PROFILING_SERVER_TIMING is on.
+    """
+    context_var = _profile
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        self.server_timing = getattr(settings, 'PROFILING_SERVER_TIMING', False)
+        super().__init__(get_response)
+        if asyncio.iscoroutinefunction(get_response):
+            # The hooks must not send async requests to the sync thread either.
+            self.process_view = _coroutine(self.process_view)
+            self.process_template_response = _coroutine(self.process_template_response)
+
+    def start(self, request):
+        if self.sample_rate >= 1 or random.random() < self.sample_rate:
+            return Profile()
+        return None
+
+    def finish(self, request, response, profile):
+        total = time.perf_counter() - profile.started
+        if 'view' not in profile.spans and profile.view_started is not None:
+            profile.add('view', time.perf_counter() - profile.view_started)
+        metrics = profile.metrics(total)
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join(_server_timing(*metric) for metric in metrics)
+        logger.info('%s %s %d %s', request.method, request.path, response.status_code,
+                    ' '.join('%s=%.2fms' % (name, seconds * 1000) for name, seconds, _ in metrics),
+                    extra={'profile': dict({name: round(seconds * 1000, 3) for name, seconds, _ in metrics},
+                                           queries=profile.queries, method=request.method,
+                                           path=request.path, status=response.status_code)})
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = _profile.get()
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        profile = _profile.get()
+        if profile is None or profile.view_started is None:
+            return response
+        now = time.perf_counter()
+        profile.add('view', now - profile.view_started)
+        if not response.is_rendered:
+            profile.render_started = now
+            response.add_post_render_callback(
+                lambda rendered: profile.add('render', time.perf_counter() - profile.render_started))
+        return response
+
+
+def _coroutine(hook):
+    # Bound like the hook itself; the handler names it after __self__.
+    async def wrapper(self, *args):
+        return hook(*args)
+    return types.MethodType(wrapper, hook.__self__)
+
+
+def _server_timing(name, seconds, description):
+    metric = '%s;dur=%.2f' % (name, seconds * 1000)
+    if description:
+        metric += ';desc="%s"' % description
+    return metric
@@ -0,0 +1,96 @@
+from contextlib import ContextDecorator, ExitStack
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """Counts the SQL statements executed on the given database aliases."""
+
+    def __init__(self, using=None):
+        if using is None:
+            using = [DEFAULT_DB_ALIAS]
+        elif isinstance(using, str):
+            using = [using]
+        self.using = using
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def __enter__(self):
+        self.queries = []
+        self._stack = ExitStack()
+        for alias in self.using:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stack.close()
+        self._stack = None
+
+
+def _budget_message(limit, queries):
+    lines = ['%d queries executed, budget is %d:' % (len(queries), limit)]
+    lines.extend('%d. %s' % (i, sql) for i, sql in enumerate(queries, start=1))
+    return '\n'.join(lines)
+
+
+class query_budget(ContextDecorator):
+    """
+    Fails with QueryBudgetExceeded when the wrapped block runs more than
+    ``max_queries`` statements. Usable as a decorator or context manager.
+    """
+
+    def __init__(self, max_queries, using=None):
+        self.max_queries = max_queries
+        self.using = using
+        self.counter = None
+
+    def __enter__(self):
+        self.counter = QueryCounter(self.using).__enter__()
+        return self.counter
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.counter.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and self.counter.count > self.max_queries:
+            raise QueryBudgetExceeded(_budget_message(self.max_queries, self.counter.queries))
+
+
+class QueryBudgetMiddleware:
+    """
+    Development aid enforcing ``QUERY_BUDGET`` queries per request.
+    ``QUERY_BUDGET_MODE`` is either 'warn' (log) or 'raise'.
+    """
+
+    def __init__(self, get_response):
+        self.budget = getattr(settings, 'QUERY_BUDGET', None)
+        if self.budget is None or not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.mode = getattr(settings, 'QUERY_BUDGET_MODE', 'warn')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryCounter(list(connections)) as counter:
+            response = self.get_response(request)
+        if counter.count > self.budget:
+            message = '%s %s: %s' % (request.method, request.path,
+                                     _budget_message(self.budget, counter.queries))
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,79 @@
+import hashlib
+from collections import defaultdict
+
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+from .cache import Versions, lazy_cache
+from .profiling import span
+from .routers import use_primary
+
+get_store = lazy_cache('RESPONSE_CACHE', 'api:response:')
+
+_versions = Versions(get_store)
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+
+def get_version(namespace):
+    return _versions.get(namespace)
+
+
+def invalidate(namespace):
+    """Orphan every cached response of ``namespace``, now and once the transaction commits."""
+    _versions.bump(namespace)
+
+
+def stats():
+    return {namespace: dict(counters) for namespace, counters in _stats.items()}
+
+
+class CachedResponseMixin:
+    """
+    Serve list and retrieve from RESPONSE_CACHE as rendered bytes.
+
+    Only JSON responses are cached. A hit returns before the queryset is
+    touched or anything is rendered; authentication and permissions still
+    run. Writes to the model invalidate the namespace through api.signals.
+    A miss reads from the primary: a lagging replica would store data
+    older than the version it is cached under.
+    """
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def get_cache_key(self, request):
+        if request.accepted_renderer.format != 'json':
+            return None
+        variant = '%s|%s' % (request.accepted_media_type, request.build_absolute_uri())
+        digest = hashlib.sha1(variant.encode('utf-8')).hexdigest()
+        return '%s:%s:%s' % (self.cache_namespace, get_version(self.cache_namespace), digest)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        key = self.get_cache_key(request)
+        if key is None:
+            return handler(request, *args, **kwargs)
+        entry = get_store().get(key)
+        if entry is not None:
+            _stats[self.cache_namespace]['hits'] += 1
+            content, content_type = entry
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+        _stats[self.cache_namespace]['misses'] += 1
+        self._response_cache_key = key
+        use_primary()
+        return handler(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, '_response_cache_key', None)
+        if key is not None and isinstance(response, Response) and response.status_code == 200:
+            with span('render'):
+                response.render()
+            get_store().set(key, (response.content, response['Content-Type']))
+            response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,100 @@
+import contextvars
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import lazy_cache
+from .middleware import ContextMiddleware
+
+REPLICATED_MODELS = {'segment', 'brand', 'vehicle'}
+
+_state = contextvars.ContextVar('api_replica_state', default=None)
+get_pin_cache = lazy_cache('REPLICA_PIN_CACHE', 'api:replica-pin:')
+
+
+class _RoutingState:
+    __slots__ = ('key', 'pinned', 'wrote')
+
+    def __init__(self, key, pinned):
+        self.key = key
+        self.pinned = pinned
+        self.wrote = False
+
+
+def client_key(request):
+    """Who read-your-writes is tracked for: the Authorization header or the session cookie."""
+    credentials = request.META.get('HTTP_AUTHORIZATION')
+    if not credentials:
+        credentials = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not credentials:
+            return None
+        credentials = 'session:' + credentials
+    return hashlib.sha256(credentials.encode('utf-8')).hexdigest()
+
+
+def use_primary():
+    """Send the rest of the current request's reads to the primary."""
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+class ReplicaRouter:
+    """
+    Sends Segment, Brand and Vehicle reads made while serving a safe
+    request to REPLICA_DATABASE; everything else uses the primary.
+
+    A request is pinned to the primary when its method is unsafe, inside
+    a transaction, or when the same client wrote within the last
+    REPLICA_PIN_CACHE TIMEOUT seconds. Reads outside requests (commands,
+    signals of writes) never see the replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = getattr(settings, 'REPLICA_DATABASE', None)
+        state = _state.get()
+        if (not alias or state is None or state.pinned or model._meta.model_name not in REPLICATED_MODELS
+                or model._meta.app_label != 'api' or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, getattr(settings, 'REPLICA_DATABASE', None)}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, schema included.
+        if db == getattr(settings, 'REPLICA_DATABASE', None):
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware(ContextMiddleware):
+    """Scopes ReplicaRouter decisions to the request and records the clients that wrote."""
+    context_var = _state
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REPLICA_DATABASE', None):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def start(self, request):
+        key = client_key(request)
+        pinned = request.method not in SAFE_METHODS or (key is not None and get_pin_cache().get(key) is not None)
+        return _RoutingState(key, pinned)
+
+    def finish(self, request, response, state):
+        if state.wrote and state.key is not None:
+            get_pin_cache().set(state.key, True)
+        return response
@@ -0,0 +1,73 @@
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'api_vehicle_search'
+TRIGRAM_TABLE = 'api_vehicle_trigram'
+MAX_LENGTH = 200
+
+_tables = {}
+
+
+def available_tables(alias):
+    """The full-text tables migration 0006 could create on this database."""
+    if alias not in _tables:
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            _tables[alias] = frozenset()
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (%s, %s)",
+                               [SEARCH_TABLE, TRIGRAM_TABLE])
+                _tables[alias] = frozenset(row[0] for row in cursor.fetchall())
+    return _tables[alias]
+
+
+def words(text):
+    return re.findall(r'\w+', text)
+
+
+def match_expression(terms):
+    # Every term must prefix a token of the name; \w+ terms need no escaping
+    # inside the quotes.
+    return ' AND '.join('"%s"*' % term for term in terms)
+
+
+def trigram_expression(terms):
+    # Any shared trigram matches; bm25 ranks names sharing more of them first.
+    trigrams = sorted({term.lower()[i:i + 3] for term in terms for i in range(len(term) - 2)})
+    return ' OR '.join('"%s"' % trigram for trigram in trigrams)
+
+
+def _ranked(queryset, table, expression):
+    # Joined rather than looked up per row, so one MATCH scan yields both
+    # the matches and their bm25().
+    column = '%s.%s' % (queryset.model._meta.db_table, queryset.model._meta.pk.column)
+    joined = queryset.extra(tables=[table], where=['%s.rowid = %s' % (table, column), '%s MATCH %%s' % table],
+                            params=[expression])
+    return joined.annotate(rank=RawSQL('bm25(%s)' % table, [], output_field=FloatField()))
+
+
+def search(queryset, text):
+    """
+    Vehicles whose name has a token starting with every word of ``text``,
+    annotated with ``rank`` (bm25, lower is better). When nothing matches
+    and the trigram index exists, names sharing trigrams with the words
+    are returned instead, which tolerates typos.
+    """
+    terms = words(text)
+    if not terms:
+        return queryset.annotate(rank=Value(0.0, output_field=FloatField())).none()
+    tables = available_tables(queryset.db)
+    if SEARCH_TABLE not in tables:
+        for term in terms:
+            queryset = queryset.filter(vehicle_name__icontains=term)
+        return queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+    matches = _ranked(queryset, SEARCH_TABLE, match_expression(terms))
+    if TRIGRAM_TABLE in tables and not matches.exists():
+        expression = trigram_expression(terms)
+        if expression:
+            return _ranked(queryset, TRIGRAM_TABLE, expression)
+    return matches
@@ -1,6 +1,13 @@
 from rest_framework import serializers
-from .models import Segment, Brand, Vehicle
+from rest_framework.exceptions import PermissionDenied
+from .models import MAX_INTEGER, Segment, Brand, Vehicle, VehicleStat, DeletionTask, Job
 from django.contrib.auth.models import User
+from .profiling import SerializeSpanMixin
+from .fieldsets import FieldsetSerializerMixin
+from . import dimensions, jobs
+
+# Integers a SQLite column can hold; larger ones fail in the query.
+INTEGER_RANGE = {'min_value': -MAX_INTEGER - 1, 'max_value': MAX_INTEGER}
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -14,23 +21,99 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class SegmentSerializer(serializers.ModelSerializer):
+class DimensionNameField(serializers.Field):
+    """Name of a segment or brand id, from the process-local api.dimensions map."""
+
+    def __init__(self, dimension, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.dimension = dimension
+        self._name = None
+
+    def to_representation(self, value):
+        # List children share their fields, so a page checks the version once.
+        if self._name is None:
+            self._name = dimensions.lookup(self.dimension)
+        return self._name(value)
+
+
+class SegmentSerializer(SerializeSpanMixin, serializers.ModelSerializer):
     class Meta:
         model = Segment
         fields = ['id', 'segment_name']
 
 
-class BrandSerializer(serializers.ModelSerializer):
+class BrandSerializer(SerializeSpanMixin, serializers.ModelSerializer):
     class Meta:
         model = Brand
         fields = ['id', 'brand_name']
 
 
-class VehicleSerializer(serializers.ModelSerializer):
-    segment_name = serializers.ReadOnlyField(source='segment.segment_name', read_only=True)
-    brand_name = serializers.ReadOnlyField(source='brand.brand_name', read_only=True)
+class VehicleSerializer(SerializeSpanMixin, FieldsetSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {'segment': SegmentSerializer, 'brand': BrandSerializer}
+    segment_name = DimensionNameField('segment', source='segment_id')
+    brand_name = DimensionNameField('brand', source='brand_id')
 
     class Meta:
         model = Vehicle
         fields = ['id', 'vehicle_name', 'release_year', 'price', 'segment', 'brand', 'segment_name', 'brand_name']
-        extra_kwargs = {'user': {'read_only': True}}
\ No newline at end of file
+        extra_kwargs = {'user': {'read_only': True}, 'release_year': INTEGER_RANGE}
+
+
+class VehicleBulkItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False, **INTEGER_RANGE)
+    segment = serializers.IntegerField(**INTEGER_RANGE)
+    brand = serializers.IntegerField(**INTEGER_RANGE)
+
+    class Meta:
+        model = Vehicle
+        fields = ['id', 'vehicle_name', 'release_year', 'price', 'segment', 'brand']
+        extra_kwargs = {'release_year': INTEGER_RANGE}
+
+
+class VehicleStatSerializer(SerializeSpanMixin, serializers.ModelSerializer):
+    name = serializers.SerializerMethodField()
+    price_avg = serializers.DecimalField(max_digits=20, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = VehicleStat
+        fields = ['key', 'name', 'count', 'price_avg', 'price_min', 'price_max']
+
+    def get_name(self, obj):
+        return self.context.get('names', {}).get(obj.key)
+
+
+class DeletionTaskSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DeletionTask
+        fields = ['id', 'target', 'object_id', 'status', 'total', 'deleted', 'error', 'created_at', 'finished_at']
+        read_only_fields = fields
+
+
+class JobSerializer(serializers.ModelSerializer):
+    kind = serializers.CharField()
+    payload = serializers.JSONField(required=False, default=dict)
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'payload', 'status', 'attempts', 'max_attempts', 'progress', 'result', 'error',
+                  'created_at', 'finished_at']
+        read_only_fields = ['status', 'attempts', 'max_attempts', 'progress', 'result', 'error', 'created_at',
+                            'finished_at']
+
+    def validate_kind(self, value):
+        if value not in jobs.submittable_kinds():
+            raise serializers.ValidationError('"%s" is not a valid choice.' % value)
+        if jobs.get_kind(value).staff_only and not self.context['request'].user.is_staff:
+            raise PermissionDenied('Only staff can submit "%s" jobs.' % value)
+        return value
+
+    def validate(self, attrs):
+        payload = jobs.get_kind(attrs['kind']).serializer_class(data=attrs['payload'], context=self.context)
+        if not payload.is_valid():
+            raise serializers.ValidationError({'payload': payload.errors})
+        attrs['payload'] = payload.validated_data
+        return attrs
+
+    def create(self, validated_data):
+        return jobs.enqueue(validated_data['kind'], validated_data['payload'], user=self.context['request'].user)
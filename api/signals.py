@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token
+from .conditional import bump_list_version
+from .models import Segment, Brand, Vehicle
+from . import dimensions, metrics, profiling, response_cache, sqlite, stats
+
+
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_cached_user_tokens(sender, instance, created, **kwargs):
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+@receiver([post_save, post_delete], sender=Segment)
+def invalidate_segment_responses(sender, **kwargs):
+    response_cache.invalidate('segment')
+    dimensions.bump('segment')
+
+
+@receiver([post_save, post_delete], sender=Brand)
+def invalidate_brand_responses(sender, **kwargs):
+    response_cache.invalidate('brand')
+    dimensions.bump('brand')
+
+
+def _loaded_stat_row(instance):
+    loaded = getattr(instance, '_loaded_values', {})
+    if all(field in loaded for field in stats.STAT_FIELDS):
+        return stats.stat_row(loaded)
+    return None
+
+
+@receiver(pre_save, sender=Vehicle)
+def remember_vehicle_stat_row(sender, instance, raw, **kwargs):
+    if raw or stats.is_suspended() or instance._state.adding:
+        return
+    old = _loaded_stat_row(instance)
+    if old is None:
+        values = Vehicle.objects.filter(pk=instance.pk).values(*stats.STAT_FIELDS).first()
+        old = stats.stat_row(values) if values else None
+    instance._stat_row_before_save = old
+
+
+@receiver(post_save, sender=Vehicle)
+def update_vehicle_stats_on_save(sender, instance, created, raw, **kwargs):
+    if raw or stats.is_suspended():
+        return
+    new = stats.stat_row(instance)
+    if created:
+        stats.apply_changes(added=[new])
+    else:
+        old = getattr(instance, '_stat_row_before_save', None)
+        if old != new:
+            stats.apply_changes(added=[new], removed=[old] if old else [])
+    instance._loaded_values = dict(getattr(instance, '_loaded_values', {}), **new._asdict())
+
+
+@receiver([post_save, post_delete], sender=Vehicle)
+def bump_vehicle_version(sender, **kwargs):
+    # Bulk writes send no signals or suspend stats, and bump once themselves.
+    if not stats.is_suspended():
+        bump_list_version('vehicle')
+
+
+@receiver(post_delete, sender=Vehicle)
+def update_vehicle_stats_on_delete(sender, instance, **kwargs):
+    if stats.is_suspended():
+        return
+    stats.record_removal(_loaded_stat_row(instance) or stats.stat_row(instance))
+
+
+@receiver(pre_delete, sender=Segment)
+@receiver(pre_delete, sender=Brand)
+@receiver(pre_delete, sender=get_user_model())
+def begin_vehicle_cascade(sender, **kwargs):
+    stats.begin_cascade()
+
+
+@receiver(post_delete, sender=Segment)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=get_user_model())
+def end_vehicle_cascade(sender, **kwargs):
+    stats.end_cascade()
+
+
+@receiver(request_finished)
+def reset_vehicle_cascade(sender, **kwargs):
+    # Deletions outside stats.cascading(), e.g. in the admin.
+    stats.reset_cascade()
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    sqlite.apply_pragmas(connection)
+    sqlite.install_begin_immediate(connection)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    metrics.install_query_counter(connection)
+    profiling.install_query_timer(connection)
@@ -0,0 +1,35 @@
+from django.conf import settings
+
+
+def apply_pragmas(connection):
+    """Run SQLITE_PRAGMAS on a new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    # On the raw connection: these are not the request's queries.
+    for name, value in pragmas.items():
+        connection.connection.execute('PRAGMA %s = %s' % (name, value))
+
+
+def begin_immediate(execute, sql, params, many, context):
+    """
+    Open transactions with BEGIN IMMEDIATE, which takes the write lock at
+    once. A deferred transaction that reads first fails with 'database is
+    locked' when it upgrades to a write while another connection holds
+    the lock, whatever the timeout; an immediate one waits in the busy
+    handler (the connection's 'timeout') before it starts. Every
+    transaction.atomic() block in this project writes.
+    """
+    if sql == 'BEGIN':
+        sql = 'BEGIN IMMEDIATE'
+    return execute(sql, params, many, context)
+
+
+def install_begin_immediate(connection):
+    if connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_BEGIN_IMMEDIATE', False):
+        return
+    # connection_created fires on every reconnect of the same wrapper.
+    if begin_immediate not in connection.execute_wrappers:
+        connection.execute_wrappers.append(begin_immediate)
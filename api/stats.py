@@ -0,0 +1,212 @@
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Cast, Greatest, Least
+
+from .models import Vehicle, VehicleStat
+
+# dimension -> Vehicle column grouping it
+DIMENSIONS = {
+    VehicleStat.SEGMENT: 'segment_id',
+    VehicleStat.BRAND: 'brand_id',
+    VehicleStat.RELEASE_YEAR: 'release_year',
+}
+STAT_FIELDS = tuple(DIMENSIONS.values()) + ('price',)
+
+StatRow = namedtuple('StatRow', STAT_FIELDS)
+
+_state = threading.local()
+
+
+@contextmanager
+def suspended():
+    """Stop the signal receivers from updating stats; the caller applies the changes."""
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def is_suspended():
+    return getattr(_state, 'suspended', False)
+
+
+def begin_cascade():
+    """
+    Called when a model vehicles cascade from starts deleting. Until the
+    matching end_cascade(), vehicle deletions are buffered and applied in
+    one go, because every per-row post_delete arrives after the whole
+    cascade has already left the vehicles table.
+    """
+    if not getattr(_state, 'cascades', 0):
+        _state.removed = []
+    _state.cascades = getattr(_state, 'cascades', 0) + 1
+
+
+def end_cascade():
+    _state.cascades = max(getattr(_state, 'cascades', 0) - 1, 0)
+    if not _state.cascades:
+        removed, _state.removed = getattr(_state, 'removed', []), []
+        if removed:
+            apply_changes(removed=removed)
+
+
+def reset_cascade(depth=0):
+    """Drop the cascades begun after ``depth``, whose deletion was rolled back."""
+    _state.cascades = depth
+    if not depth:
+        _state.removed = []
+
+
+@contextmanager
+def cascading():
+    """
+    Wrap deletions that may cascade to vehicles: if one raises between
+    its begin_cascade() and end_cascade(), the thread stops buffering.
+    """
+    depth = getattr(_state, 'cascades', 0)
+    try:
+        yield
+    except BaseException:
+        reset_cascade(depth)
+        raise
+
+
+def record_removal(row):
+    if getattr(_state, 'cascades', 0):
+        _state.removed.append(row)
+    else:
+        apply_changes(removed=[row])
+
+
+def stat_row(vehicle):
+    if isinstance(vehicle, dict):
+        return StatRow(*(vehicle[field] for field in STAT_FIELDS))
+    return StatRow(*(getattr(vehicle, field) for field in STAT_FIELDS))
+
+
+class _Delta:
+    __slots__ = ('count', 'total', 'added_min', 'added_max', 'removed_min', 'removed_max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = Decimal(0)
+        self.added_min = self.added_max = self.removed_min = self.removed_max = None
+
+    def add(self, price):
+        self.count += 1
+        self.total += price
+        self.added_min = price if self.added_min is None else min(self.added_min, price)
+        self.added_max = price if self.added_max is None else max(self.added_max, price)
+
+    def remove(self, price):
+        self.count -= 1
+        self.total -= price
+        self.removed_min = price if self.removed_min is None else min(self.removed_min, price)
+        self.removed_max = price if self.removed_max is None else max(self.removed_max, price)
+
+
+def _deltas(added, removed):
+    deltas = {}
+    for rows, method in ((removed, _Delta.remove), (added, _Delta.add)):
+        for row in rows:
+            row = stat_row(row)
+            price = Decimal(row.price)
+            for dimension, column in DIMENSIONS.items():
+                key = (dimension, getattr(row, column))
+                method(deltas.setdefault(key, _Delta()), price)
+    return deltas
+
+
+def _decimal(value):
+    # SQLite receives Decimal parameters as text, and MIN()/MAX() rank any
+    # text above any number; cast so they compare numerically.
+    output_field = DecimalField(max_digits=20, decimal_places=2)
+    return Cast(Value(value, output_field=output_field), output_field)
+
+
+def recompute(dimension, key):
+    """Rebuild one group from the vehicles table."""
+    state = Vehicle.objects.filter(**{DIMENSIONS[dimension]: key}).aggregate(
+        count=Count('id'), price_sum=Sum('price'), price_min=Min('price'), price_max=Max('price'))
+    if not state['count']:
+        VehicleStat.objects.filter(dimension=dimension, key=key).delete()
+        return
+    VehicleStat.objects.update_or_create(dimension=dimension, key=key, defaults=state)
+
+
+def _increment(dimension, key, delta):
+    updates = {'count': F('count') + delta.count, 'price_sum': F('price_sum') + _decimal(delta.total)}
+    if delta.added_min is not None:
+        updates['price_min'] = Least(F('price_min'), _decimal(delta.added_min))
+        updates['price_max'] = Greatest(F('price_max'), _decimal(delta.added_max))
+    if VehicleStat.objects.filter(dimension=dimension, key=key).update(**updates):
+        return
+    if delta.count <= 0:
+        recompute(dimension, key)
+        return
+    try:
+        with transaction.atomic():
+            VehicleStat.objects.create(dimension=dimension, key=key, count=delta.count, price_sum=delta.total,
+                                       price_min=delta.added_min, price_max=delta.added_max)
+    except IntegrityError:
+        # Created concurrently since the UPDATE above.
+        _increment(dimension, key, delta)
+
+
+def apply_changes(added=(), removed=()):
+    """
+    Fold vehicle changes into the summary table. Must run after the
+    vehicles table already holds the result of the change: groups that lose
+    their minimum or maximum price (or every row) are recomputed from it.
+    """
+    deltas = _deltas(added, removed)
+    removals = [key for key, delta in deltas.items() if delta.removed_min is not None]
+    current = {}
+    if removals:
+        condition = Q()
+        for dimension, key in removals:
+            condition |= Q(dimension=dimension, key=key)
+        current = {(stat.dimension, stat.key): stat for stat in VehicleStat.objects.filter(condition)}
+
+    for (dimension, key), delta in deltas.items():
+        if delta.removed_min is not None:
+            stat = current.get((dimension, key))
+            if (stat is None or stat.count + delta.count <= 0 or stat.price_min is None
+                    or delta.removed_min <= stat.price_min or delta.removed_max >= stat.price_max):
+                recompute(dimension, key)
+                continue
+        if delta.count or delta.total or delta.added_min is not None:
+            _increment(dimension, key, delta)
+
+
+def count(lookups):
+    """
+    Number of vehicles matching the filter() ``lookups`` from the summary
+    table, or None unless they all filter on the column of one dimension.
+    """
+    for dimension, column in DIMENSIONS.items():
+        if all(name.split('__')[0] == column for name in lookups):
+            condition = {'key' + name[len(column):]: value for name, value in lookups.items()}
+            state = VehicleStat.objects.filter(dimension=dimension, **condition).aggregate(count=Sum('count'))
+            return state['count'] or 0
+    return None
+
+
+def rebuild():
+    """Recreate the whole summary table from the vehicles table."""
+    with transaction.atomic():
+        VehicleStat.objects.all().delete()
+        stats = []
+        for dimension, column in DIMENSIONS.items():
+            groups = Vehicle.objects.order_by().values(column).annotate(
+                count=Count('id'), price_sum=Sum('price'), price_min=Min('price'), price_max=Max('price'))
+            stats.extend(VehicleStat(dimension=dimension, key=group.pop(column), **group) for group in groups)
+        VehicleStat.objects.bulk_create(stats, batch_size=500)
+    return len(stats)
@@ -0,0 +1,74 @@
+import os
+from types import SimpleNamespace
+
+from rest_framework import serializers
+
+from .filters import VehicleFilterBackend
+from .models import Vehicle
+from . import bulk, export, jobs, stats
+from . import cascade  # noqa: F401 (registers cascade_delete)
+
+IMPORT_MAX_ITEMS = 100000
+
+
+def filter_vehicles(params):
+    """Vehicle.objects filtered like the vehicle list with query parameters ``params``."""
+    request = SimpleNamespace(query_params=params)
+    return VehicleFilterBackend().filter_queryset(request, Vehicle.objects.all(), None)
+
+
+class ExportPayloadSerializer(serializers.Serializer):
+    format = serializers.ChoiceField(choices=sorted(export.CONTENT_TYPES))
+    filters = serializers.DictField(child=serializers.CharField(), required=False)
+
+    def validate_filters(self, filters):
+        filter_vehicles(filters)
+        return filters
+
+
+class ImportPayloadSerializer(serializers.Serializer):
+    items = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=IMPORT_MAX_ITEMS)
+
+
+@jobs.register('export', ExportPayloadSerializer)
+def export_vehicles(job):
+    """Write the vehicles to JOB_OUTPUT_DIR; GET /api/jobs/<id>/download/ serves the file."""
+    export_format = job.payload['format']
+    queryset = filter_vehicles(job.payload.get('filters', {}))
+    lines = export.csv_lines if export_format == 'csv' else export.ndjson_lines
+    directory = jobs.get_output_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = 'vehicles-%d.%s' % (job.pk, export_format)
+    temporary = os.path.join(directory, name + '.tmp')
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for count, row in enumerate(rows, start=1):
+            if count % export.CHUNK_SIZE == 0:
+                jobs.heartbeat(job, count)
+            yield row
+
+    with open(temporary, 'w', encoding='utf-8', newline='') as stream:
+        stream.writelines(lines(counted(export.export_rows(queryset))))
+    os.replace(temporary, os.path.join(directory, name))
+    return {'file': name, 'rows': count}
+
+
+# Not retried: a failure after some batches committed would insert those twice.
+@jobs.register('bulk_import', ImportPayloadSerializer, max_attempts=1)
+def import_vehicles(job):
+    """bulk.bulk_create() for the job's user, bulk.MAX_ITEMS items per transaction."""
+    items = job.payload['items']
+    created, errors = 0, []
+    for start in range(0, len(items), bulk.MAX_ITEMS):
+        result = bulk.bulk_create(job.user, items[start:start + bulk.MAX_ITEMS])
+        created += result['created']
+        errors.extend(dict(error, index=error['index'] + start) for error in result['errors'])
+        jobs.heartbeat(job, min(start + bulk.MAX_ITEMS, len(items)))
+    return {'created': created, 'errors': errors}
+
+
+@jobs.register('rebuild_stats', serializers.Serializer, staff_only=True)
+def rebuild_stats(job):
+    return {'groups': stats.rebuild()}
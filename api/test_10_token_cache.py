@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from .authentication import get_token_cache
+from .querybudget import query_budget
+
+PROFILE_URL = '/api/profile/'
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_10_1_should_authenticate_without_queries_once_cached(self):
+        with query_budget(1):
+            res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with query_budget(0):
+            res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.data['username'], 'dummy')
+
+    def test_10_2_should_reject_deleted_token(self):
+        self.client.get(PROFILE_URL)
+        self.token.delete()
+        res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_10_3_should_reject_regenerated_token(self):
+        self.client.get(PROFILE_URL)
+        Token.objects.filter(user=self.user).delete()
+        new_token = Token.objects.create(user=self.user)
+        res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + new_token.key)
+        res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_10_4_should_reject_deactivated_user(self):
+        self.client.get(PROFILE_URL)
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_10_5_should_not_cache_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        self.client.get(PROFILE_URL)
+        with query_budget(1):
+            res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE={'BACKEND': 'django', 'TIMEOUT': 60})
+    def test_10_6_should_use_shared_cache_backend(self):
+        self.client.get(PROFILE_URL)
+        with query_budget(0):
+            res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.token.delete()
+        res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
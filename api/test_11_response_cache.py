@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Segment, Brand
+from .querybudget import query_budget
+from . import response_cache
+
+SEGMENTS_URL = '/api/segments/'
+BRANDS_URL = '/api/brands/'
+
+
+class ResponseCacheApiTests(TestCase):
+
+    def setUp(self):
+        response_cache.get_store().clear()
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_11_1_should_serve_segment_list_from_cache(self):
+        Segment.objects.create(segment_name='SUV')
+        first = self.client.get(SEGMENTS_URL)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        hits = response_cache.stats()['segment']['hits']
+        with query_budget(0):
+            second = self.client.get(SEGMENTS_URL)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(response_cache.stats()['segment']['hits'], hits + 1)
+
+    def test_11_2_should_invalidate_on_create_update_and_delete(self):
+        segment = Segment.objects.create(segment_name='SUV')
+        self.client.get(SEGMENTS_URL)
+        self.client.post(SEGMENTS_URL, {'segment_name': 'Sedan'})
+        res = self.client.get(SEGMENTS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual([row['segment_name'] for row in res.json()['results']], ['SUV', 'Sedan'])
+
+        url = reverse('api:segment-detail', args=[segment.id])
+        self.assertEqual(self.client.get(url).json()['segment_name'], 'SUV')
+        self.client.patch(url, {'segment_name': 'Compact SUV'})
+        self.assertEqual(self.client.get(url).json()['segment_name'], 'Compact SUV')
+
+        self.client.delete(url)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_11_3_should_cache_brand_detail_per_url(self):
+        toyota = Brand.objects.create(brand_name='Toyota')
+        tesla = Brand.objects.create(brand_name='Tesla')
+        for brand in (toyota, tesla):
+            self.client.get(reverse('api:brand-detail', args=[brand.id]))
+        res = self.client.get(reverse('api:brand-detail', args=[tesla.id]))
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res.json(), {'id': tesla.id, 'brand_name': 'Tesla'})
+
+    def test_11_4_should_not_cache_browsable_api(self):
+        Brand.objects.create(brand_name='Toyota')
+        self.client.get(BRANDS_URL, HTTP_ACCEPT='text/html')
+        res = self.client.get(BRANDS_URL, HTTP_ACCEPT='text/html')
+        self.assertNotIn('X-Cache', res)
+
+    def test_11_5_should_still_require_authentication_on_hit(self):
+        self.client.get(BRANDS_URL)
+        res = APIClient().get(BRANDS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(RESPONSE_CACHE={'BACKEND': 'django', 'TIMEOUT': 60})
+    def test_11_6_should_support_shared_backend(self):
+        Brand.objects.create(brand_name='Toyota')
+        self.client.get(BRANDS_URL)
+        self.assertEqual(self.client.get(BRANDS_URL)['X-Cache'], 'HIT')
+        Brand.objects.create(brand_name='Tesla')
+        res = self.client.get(BRANDS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.json()['results']), 2)
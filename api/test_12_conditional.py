@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Vehicle, Brand, Segment
+from .querybudget import query_budget
+
+VEHICLES_URL = '/api/vehicles/'
+
+
+def detail_vehicle_url(vehicle_id):
+    return reverse('api:vehicle-detail', args=[vehicle_id])
+
+
+class ConditionalVehicleApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.segment = Segment.objects.create(segment_name='Sedan')
+        self.brand = Brand.objects.create(brand_name='Tesla')
+        self.vehicle = self.create_vehicle()
+
+    def create_vehicle(self):
+        return Vehicle.objects.create(user=self.user, vehicle_name='MODEL S', release_year=2019,
+                                      price=500, segment=self.segment, brand=self.brand)
+
+    def test_12_1_should_return_not_modified_for_unchanged_list(self):
+        res = self.client.get(VEHICLES_URL)
+        self.assertIn('ETag', res)
+        # MAX(updated_at) misses a delete plus an insert; lists rely on the ETag.
+        self.assertNotIn('Last-Modified', res)
+        with query_budget(1):
+            res = self.client.get(VEHICLES_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertIn('ETag', res)
+
+    def test_12_2_should_change_list_etag_on_create_update_and_delete(self):
+        etags = [self.client.get(VEHICLES_URL)['ETag']]
+        other = self.create_vehicle()
+        etags.append(self.client.get(VEHICLES_URL)['ETag'])
+        self.client.patch(detail_vehicle_url(other.id), {'price': 700})
+        etags.append(self.client.get(VEHICLES_URL)['ETag'])
+        other.delete()
+        res = self.client.get(VEHICLES_URL, HTTP_IF_NONE_MATCH=etags[2])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        etags.append(res['ETag'])
+        # Every write is a new version, even one back to the original rows.
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_12_3_should_vary_list_etag_with_query(self):
+        first = self.client.get(VEHICLES_URL)['ETag']
+        filtered = self.client.get(VEHICLES_URL, {'release_year_min': 2020})['ETag']
+        self.assertNotEqual(first, filtered)
+
+    def test_12_4_should_return_not_modified_for_unchanged_detail(self):
+        url = detail_vehicle_url(self.vehicle.id)
+        res = self.client.get(url)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=res['Last-Modified'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_12_5_should_honor_if_match_on_update(self):
+        url = detail_vehicle_url(self.vehicle.id)
+        etag = self.client.get(url)['ETag']
+        res = self.client.patch(url, {'vehicle_name': 'MODEL X'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.patch(url, {'vehicle_name': 'MODEL Y'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.vehicle_name, 'MODEL X')
+
+    def test_12_6_should_honor_if_match_on_delete(self):
+        url = detail_vehicle_url(self.vehicle.id)
+        res = self.client.delete(url, HTTP_IF_MATCH='"stale"')
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        etag = self.client.get(url)['ETag']
+        res = self.client.delete(url, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Vehicle.objects.exists())
+
+    def test_12_7_should_change_etags_on_dimension_rename(self):
+        url = detail_vehicle_url(self.vehicle.id)
+        etags = [self.client.get(VEHICLES_URL)['ETag'], self.client.get(url)['ETag']]
+        self.client.patch('/api/brands/%d/' % self.brand.id, {'brand_name': 'Tesla Motors'})
+        res = self.client.get(VEHICLES_URL, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['brand_name'], 'Tesla Motors')
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etags[1])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_12_8_should_vary_detail_etag_with_query(self):
+        url = detail_vehicle_url(self.vehicle.id)
+        etag = self.client.get(url)['ETag']
+        res = self.client.get(url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'id': self.vehicle.id})
@@ -0,0 +1,48 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from .fastpath import VehicleRowSerializer
+from .models import Vehicle, Brand, Segment
+from .serializers import VehicleSerializer
+
+VEHICLES_URL = '/api/vehicles/'
+
+
+class FastVehicleReadTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        segments = [Segment.objects.create(segment_name=name) for name in ('Sedan', 'SUV', 'Kei カー')]
+        brands = [Brand.objects.create(brand_name=name) for name in ('Tesla', 'Toyota "T"')]
+        prices = [Decimal('0'), Decimal('0.5'), Decimal('500.125'), Decimal('9999.99'), 12, 99.9]
+        for i, price in enumerate(prices * 3):
+            Vehicle.objects.create(user=self.user, vehicle_name='MODEL %d, ñ' % i, release_year=1990 + i,
+                                   price=price, segment=segments[i % 3], brand=brands[i % 2])
+
+    def test_13_1_should_match_vehicle_serializer_output(self):
+        queryset = Vehicle.objects.select_related('segment', 'brand').order_by('id')
+        row_serializer = VehicleRowSerializer()
+        fast = row_serializer.to_representation(row_serializer.get_rows(queryset))
+        self.assertEqual(fast, VehicleSerializer(queryset, many=True).data)
+
+    def test_13_2_should_render_identical_api_responses(self):
+        for params in ({}, {'ordering': '-price', 'page_size': 4}, {'brand': Brand.objects.first().id}):
+            slow = self.client.get(VEHICLES_URL, params)
+            with override_settings(FAST_READS=True):
+                fast = self.client.get(VEHICLES_URL, params)
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, slow.content)
+
+    @override_settings(FAST_READS=True)
+    def test_13_3_should_paginate_fast_rows(self):
+        res = self.client.get(VEHICLES_URL, {'ordering': 'price', 'page_size': 5})
+        ids = [row['id'] for row in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(row['id'] for row in res.data['results'])
+        expected = Vehicle.objects.order_by('price', 'id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
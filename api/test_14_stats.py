@@ -0,0 +1,136 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Vehicle, VehicleStat, Brand, Segment, DeletionTask
+from . import cascade, stats
+
+STATS_URL = '/api/stats/%s/'
+
+
+def snapshot():
+    return sorted(VehicleStat.objects.values_list('dimension', 'key', 'count', 'price_sum', 'price_min', 'price_max'))
+
+
+class VehicleStatsTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.sedan = Segment.objects.create(segment_name='Sedan')
+        self.suv = Segment.objects.create(segment_name='SUV')
+        self.tesla = Brand.objects.create(brand_name='Tesla')
+        self.audi = Brand.objects.create(brand_name='Audi')
+
+    def create_vehicle(self, price, year=2019, segment=None, brand=None):
+        return Vehicle.objects.create(user=self.user, vehicle_name='CAR', release_year=year, price=price,
+                                      segment=segment or self.sedan, brand=brand or self.tesla)
+
+    def assert_consistent(self):
+        incremental = snapshot()
+        stats.rebuild()
+        self.assertEqual(incremental, snapshot())
+
+    def test_14_1_should_track_creates(self):
+        self.create_vehicle(300.5, year=2020)
+        self.create_vehicle(99.5)
+        self.create_vehicle(1000)
+        self.create_vehicle(200, segment=self.suv, brand=self.audi)
+        stat = VehicleStat.objects.get(dimension='segment', key=self.sedan.id)
+        self.assertEqual((stat.count, stat.price_sum, stat.price_min, stat.price_max),
+                         (3, Decimal('1400.00'), Decimal('99.50'), Decimal('1000.00')))
+        self.assert_consistent()
+
+    def test_14_2_should_track_updates(self):
+        cheap = self.create_vehicle(100)
+        self.create_vehicle(300)
+        cheap.price = 500
+        cheap.save()
+        stat = VehicleStat.objects.get(dimension='brand', key=self.tesla.id)
+        self.assertEqual((stat.price_min, stat.price_max), (Decimal('300.00'), Decimal('500.00')))
+        vehicle = Vehicle.objects.get(id=cheap.id)
+        vehicle.segment = self.suv
+        vehicle.release_year = 2000
+        vehicle.save()
+        self.assert_consistent()
+
+    def test_14_3_should_track_deletes(self):
+        first = self.create_vehicle(100)
+        second = self.create_vehicle(300)
+        self.create_vehicle(200, segment=self.suv)
+        second.delete()
+        stat = VehicleStat.objects.get(dimension='segment', key=self.sedan.id)
+        self.assertEqual((stat.count, stat.price_max), (1, Decimal('100.00')))
+        first.delete()
+        self.assertFalse(VehicleStat.objects.filter(dimension='segment', key=self.sedan.id).exists())
+        self.assert_consistent()
+
+    def test_14_4_should_track_bulk_endpoint_and_cascades(self):
+        payload = [{'vehicle_name': 'CAR', 'release_year': 2000 + i % 3, 'price': str(100 + i),
+                    'segment': (self.sedan if i % 2 else self.suv).id, 'brand': self.tesla.id} for i in range(10)]
+        self.client.post('/api/vehicles/bulk/', payload, format='json')
+        self.assert_consistent()
+        ids = list(Vehicle.objects.order_by('price').values_list('id', flat=True))
+        self.client.patch('/api/vehicles/bulk/', [{'id': ids[0], 'price': '999.00', 'brand': self.audi.id}],
+                          format='json')
+        self.assert_consistent()
+        self.client.delete('/api/vehicles/bulk/', {'ids': ids[-3:]}, format='json')
+        self.assert_consistent()
+        self.suv.delete()
+        self.assert_consistent()
+
+    def test_14_5_should_list_stats_by_dimension(self):
+        self.create_vehicle(100)
+        self.create_vehicle(201, brand=self.audi)
+        res = self.client.get(STATS_URL % 'brand')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'key': self.tesla.id, 'name': 'Tesla', 'count': 1, 'price_avg': '100.00',
+             'price_min': '100.00', 'price_max': '100.00'},
+            {'key': self.audi.id, 'name': 'Audi', 'count': 1, 'price_avg': '201.00',
+             'price_min': '201.00', 'price_max': '201.00'},
+        ])
+        res = self.client.get(STATS_URL % 'release_year')
+        self.assertEqual(res.data[0]['key'], 2019)
+        self.assertEqual(res.data[0]['count'], 2)
+        self.assertEqual(res.data[0]['price_avg'], '150.50')
+        self.assertIsNone(res.data[0]['name'])
+
+    def test_14_6_should_not_find_unknown_dimension(self):
+        res = self.client.get(STATS_URL % 'color')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_14_7_should_rebuild_with_command(self):
+        self.create_vehicle(100)
+        VehicleStat.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_vehicle_stats', stdout=out)
+        self.assertIn('Rebuilt 3 statistics groups', out.getvalue())
+        self.assertEqual(VehicleStat.objects.count(), 3)
+
+    def test_14_8_should_stop_buffering_after_failed_cascade(self):
+        self.create_vehicle(100, segment=self.suv)
+        vehicle = self.create_vehicle(200)
+        with mock.patch('api.dimensions.bump', side_effect=RuntimeError('cache down')), \
+                self.assertRaises(RuntimeError), transaction.atomic():
+            cascade.delete(DeletionTask.SEGMENT, self.suv.id)
+        vehicle.delete()
+        self.assertFalse(VehicleStat.objects.filter(dimension='segment', key=self.sedan.id).exists())
+        self.assert_consistent()
+
+    def test_14_9_should_reject_duplicate_ids_in_bulk_update(self):
+        vehicles = [self.create_vehicle(price) for price in (5, 10, 50)]
+        res = self.client.patch('/api/vehicles/bulk/', [{'id': vehicles[0].id, 'price': '20.00'},
+                                                        {'id': vehicles[0].id, 'price': '30.00'}], format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], 1)
+        self.assertEqual(res.data['errors'], [{'index': 1, 'errors': {'id': ['Duplicate id.']}}])
+        stat = VehicleStat.objects.get(dimension='brand', key=self.tesla.id)
+        self.assertEqual(stat.price_sum, Decimal('80.00'))
+        self.assert_consistent()
@@ -0,0 +1,67 @@
+import json
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from asgiref.sync import async_to_sync
+from .models import Vehicle, Brand, Segment
+
+ASYNC_VEHICLES_URL = '/api/async/vehicles/'
+
+
+# The async views query from executor threads, which cannot see the
+# uncommitted data of a TestCase transaction.
+class AsyncReadApiTests(TransactionTestCase):
+    # Reads go to the replica alias when one is configured.
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.token = Token.objects.create(user=self.user)
+        self.segment = Segment.objects.create(segment_name='Sedan')
+        self.brand = Brand.objects.create(brand_name='Tesla')
+        self.vehicles = [
+            Vehicle.objects.create(user=self.user, vehicle_name='MODEL %d' % i, release_year=2018 + i,
+                                   price=500 + i, segment=self.segment, brand=self.brand)
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def async_get(self, url):
+        # AsyncClient sends extra keywords as raw header names, not HTTP_* keys.
+        return async_to_sync(AsyncClient().get)(url, authorization='Token ' + self.token.key)
+
+    def test_15_1_should_match_sync_vehicle_list(self):
+        sync = self.client.get('/api/vehicles/', {'page_size': 2, 'ordering': '-price'})
+        res = self.async_get(ASYNC_VEHICLES_URL + '?page_size=2&ordering=-price')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content)['results'], json.loads(sync.content)['results'])
+
+    def test_15_2_should_retrieve_vehicle_segment_and_brand(self):
+        res = self.async_get('/api/async/vehicles/%d/' % self.vehicles[1].id)
+        self.assertEqual(json.loads(res.content)['vehicle_name'], 'MODEL 1')
+        res = self.async_get('/api/async/segments/%d/' % self.segment.id)
+        self.assertEqual(json.loads(res.content)['segment_name'], 'Sedan')
+        res = self.async_get('/api/async/brands/')
+        self.assertEqual([row['brand_name'] for row in json.loads(res.content)['results']], ['Tesla'])
+
+    def test_15_3_should_require_authentication(self):
+        res = async_to_sync(AsyncClient().get)(ASYNC_VEHICLES_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_15_4_should_return_not_found_and_validation_errors(self):
+        res = self.async_get('/api/async/vehicles/%d/' % (self.vehicles[-1].id + 100))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        res = self.async_get(ASYNC_VEHICLES_URL + '?price_min=cheap')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_15_5_should_reject_writes(self):
+        res = self.client.post(ASYNC_VEHICLES_URL, {'vehicle_name': 'MODEL X'})
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_15_6_should_serve_async_views_through_wsgi_client(self):
+        res = self.client.get(ASYNC_VEHICLES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()['results']), 3)
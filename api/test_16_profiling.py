@@ -0,0 +1,79 @@
+import asyncio
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from .models import Vehicle, Brand, Segment
+from .profiling import ProfilingMiddleware
+
+VEHICLES_URL = '/api/vehicles/'
+
+
+def timing_names(header):
+    return [metric.split(';')[0] for metric in header.split(', ')]
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1.0)
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+        segment = Segment.objects.create(segment_name='Sedan')
+        brand = Brand.objects.create(brand_name='Tesla')
+        Vehicle.objects.create(user=user, vehicle_name='MODEL S', release_year=2019,
+                               price=500, segment=segment, brand=brand)
+
+    def test_16_1_should_emit_server_timing_for_every_span(self):
+        res = self.client.get(VEHICLES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(timing_names(res['Server-Timing']),
+                         ['db', 'auth', 'view', 'serialize', 'render', 'total'])
+
+    def test_16_2_should_count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(VEHICLES_URL)
+        self.assertIn('db;dur=', res['Server-Timing'])
+        self.assertIn('desc="%d queries"' % len(queries), res['Server-Timing'])
+
+    def test_16_3_should_log_structured_profile(self):
+        with self.assertLogs('api.profiling', 'INFO') as logs:
+            self.client.get(VEHICLES_URL)
+        record = logs.records[0]
+        self.assertEqual((record.profile['method'], record.profile['status']), ('GET', 200))
+        self.assertEqual(record.profile['path'], VEHICLES_URL)
+        self.assertGreater(record.profile['queries'], 0)
+        self.assertGreaterEqual(record.profile['total'], record.profile['render'])
+
+    @override_settings(PROFILING_SERVER_TIMING=False)
+    def test_16_4_should_only_log_when_header_disabled(self):
+        with self.assertLogs('api.profiling', 'INFO'):
+            res = self.client.get(VEHICLES_URL)
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_16_5_should_not_profile_when_sampling_disabled(self):
+        res = self.client.get(VEHICLES_URL)
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(FAST_READS=True)
+    def test_16_6_should_time_serialization_on_fast_path(self):
+        res = self.client.get(VEHICLES_URL)
+        self.assertIn('serialize', timing_names(res['Server-Timing']))
+
+    def test_16_7_should_stay_async_under_asgi(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = ProfilingMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        self.assertTrue(asyncio.iscoroutinefunction(middleware.process_view))
+        self.assertIs(middleware.process_template_response.__self__, middleware)
+        res = async_to_sync(middleware)(RequestFactory().get(VEHICLES_URL))
+        self.assertEqual(timing_names(res['Server-Timing']), ['db', 'total'])
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from .metrics import MetricsMiddleware, Registry, exposition
+from .models import Vehicle, Brand, Segment
+
+METRICS_URL = '/api/metrics/'
+
+
+def sample(text, line_start):
+    for line in text.splitlines():
+        if line.startswith(line_start + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+class MetricsApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        segment = Segment.objects.create(segment_name='Sedan')
+        brand = Brand.objects.create(brand_name='Tesla')
+        Vehicle.objects.create(user=self.user, vehicle_name='MODEL S', release_year=2019,
+                               price=500, segment=segment, brand=brand)
+
+    def scrape(self):
+        res = self.client.get(METRICS_URL, HTTP_ACCEPT='application/openmetrics-text; version=0.0.1,*/*;q=0.1')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return res.content.decode('utf-8')
+
+    def test_17_1_should_count_requests_per_route_method_and_status(self):
+        line = 'api_requests_total{route="api:vehicle-list",method="GET",status="200"}'
+        before = sample(self.scrape(), line)
+        self.client.get('/api/vehicles/')
+        self.client.get('/api/vehicles/')
+        self.assertEqual(sample(self.scrape(), line), before + 2)
+
+    def test_17_2_should_record_latency_size_and_query_histograms(self):
+        labels = '{route="api:vehicle-list",method="GET"'
+        before = sample(self.scrape(), 'api_db_queries_count' + labels + '}')
+        self.client.get('/api/vehicles/')
+        text = self.scrape()
+        self.assertEqual(sample(text, 'api_db_queries_count' + labels + '}'), before + 1)
+        self.assertEqual(sample(text, 'api_request_duration_seconds_bucket' + labels + ',le="+Inf"}'),
+                         sample(text, 'api_request_duration_seconds_count' + labels + '}'))
+        self.assertGreater(sample(text, 'api_response_size_bytes_sum' + labels + '}'), 0)
+
+    def test_17_3_should_include_auth_token_route_and_cache_ratios(self):
+        self.client.post('/api/auth/', {'username': 'dummy', 'password': 'dummy_pw'})
+        self.client.get('/api/segments/')
+        self.client.get('/api/segments/')
+        text = self.scrape()
+        self.assertGreater(sample(text, 'api_requests_total{route="api:auth",method="POST",status="200"}'), 0)
+        self.assertIn('api_cache_hit_ratio{cache="response:segment"}', text)
+        self.assertIn('api_cache_hits_total{cache="token"}', text)
+
+    def test_17_4_should_not_record_the_metrics_route_or_unknown_urls(self):
+        self.client.get('/nowhere/')
+        text = self.scrape()
+        self.assertNotIn('route="api:metrics"', text)
+        self.assertNotIn('/nowhere/', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'])
+    def test_17_5_should_reject_addresses_outside_allow_list(self):
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_17_6_should_sum_processes_in_multiprocess_mode(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other = Registry()
+        other.inc('api_requests_total', (('route', 'api:vehicle-list'), ('method', 'GET'), ('status', '200')), 5)
+        other.observe('api_db_queries', (('route', 'api:vehicle-list'), ('method', 'GET')), 3)
+        other.flush(directory)
+        os.rename(os.path.join(directory, 'metrics-%d.json' % os.getpid()),
+                  os.path.join(directory, 'metrics-999999.json'))
+        line = 'api_requests_total{route="api:vehicle-list",method="GET",status="200"}'
+        local = sample(self.scrape(), line)
+        with override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            self.assertEqual(sample(self.scrape(), line), local + 5)
+        with open(os.path.join(directory, 'metrics-%d.json' % os.getpid())) as source:
+            self.assertIn('counters', json.load(source))
+
+    def test_17_8_should_stay_async_under_asgi(self):
+        async def get_response(request):
+            await sync_to_async(list)(Vehicle.objects.all())
+            await sync_to_async(list)(Brand.objects.all())
+            return HttpResponse()
+
+        middleware = MetricsMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        request = RequestFactory().get('/api/vehicles/')
+        request.resolver_match = resolve('/api/vehicles/')
+        line = 'api_db_queries_sum{route="api:vehicle-list",method="GET"}'
+        before = sample(self.scrape(), line)
+        async_to_sync(middleware)(request)
+        self.assertEqual(sample(self.scrape(), line), before + 2)
+
+
+class ExpositionTests(TestCase):
+
+    def test_17_7_should_format_cumulative_buckets_and_escape_labels(self):
+        registry = Registry()
+        labels = (('route', 'a"b'), ('method', 'GET'))
+        for value in (0, 2, 2, 500):
+            registry.observe('api_db_queries', labels, value)
+        text = exposition(*registry.snapshot())
+        self.assertIn('api_db_queries_bucket{route="a\\"b",method="GET",le="0"} 1', text)
+        self.assertIn('api_db_queries_bucket{route="a\\"b",method="GET",le="2"} 3', text)
+        self.assertIn('api_db_queries_bucket{route="a\\"b",method="GET",le="+Inf"} 4', text)
+        self.assertIn('api_db_queries_sum{route="a\\"b",method="GET"} 504', text)
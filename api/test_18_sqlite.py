@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+
+
+class SQLitePragmaTests(TestCase):
+
+    def test_18_1_should_apply_pragmas_to_test_connection(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -20000)
+
+    def file_databases(self, *timeouts):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        wrappers = []
+        for timeout in timeouts:
+            wrapper = DatabaseWrapper(dict(connection.settings_dict, NAME=os.path.join(directory, 'db.sqlite3'),
+                                           OPTIONS={'timeout': timeout}))
+            self.addCleanup(wrapper.close)
+            wrappers.append(wrapper)
+        return wrappers
+
+    def assert_write_while_reading(self, allowed):
+        first, second = self.file_databases(1, 0.05)
+        with first.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode = WAL')
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        # What transaction.atomic() does on SQLite.
+        first.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        try:
+            with first.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM item')
+            with second.cursor() as cursor:
+                if allowed:
+                    cursor.execute('INSERT INTO item DEFAULT VALUES')
+                else:
+                    with self.assertRaisesMessage(OperationalError, 'database is locked'):
+                        cursor.execute('INSERT INTO item DEFAULT VALUES')
+        finally:
+            first.rollback()
+            first.set_autocommit(True)
+
+    def test_18_2_should_only_switch_to_wal_on_command(self):
+        wrapper, = self.file_databases(1)
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'delete')
+        out = StringIO()
+        with mock.patch.dict(connections._connections.__dict__, {'default': wrapper}):
+            call_command('enable_wal', stdout=out)
+        self.assertIn('is in WAL mode', out.getvalue())
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_18_3_should_take_write_lock_when_transaction_begins(self):
+        self.assert_write_while_reading(allowed=False)
+
+    @override_settings(SQLITE_BEGIN_IMMEDIATE=False)
+    def test_18_4_should_keep_deferred_transactions_when_disabled(self):
+        self.assert_write_while_reading(allowed=True)
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from asgiref.sync import async_to_sync
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from .models import Vehicle, Brand, Segment, VehicleStat
+from .routers import ReplicaRoutingMiddleware, use_primary
+from . import response_cache
+
+
+@override_settings(REPLICA_DATABASE='replica', REPLICA_PIN_CACHE={'BACKEND': 'local', 'TIMEOUT': 60})
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = {}
+
+    def view(self, request):
+        for model in (Vehicle, Segment, Brand, VehicleStat, Token):
+            self.seen[model.__name__] = router.db_for_read(model)
+        if request.GET.get('write'):
+            router.db_for_write(Vehicle)
+        if request.GET.get('primary'):
+            use_primary()
+            self.seen['Vehicle'] = router.db_for_read(Vehicle)
+        return HttpResponse()
+
+    def request(self, method='get', path='/api/vehicles/', token='abc', **params):
+        extra = {'HTTP_AUTHORIZATION': 'Token ' + token} if token else {}
+        request = getattr(self.factory, method)(path, **extra)
+        request.GET = request.GET.copy()
+        request.GET.update(params)
+        ReplicaRoutingMiddleware(self.view)(request)
+        return dict(self.seen)
+
+    def test_19_1_should_read_replicated_models_from_replica(self):
+        seen = self.request()
+        self.assertEqual((seen['Vehicle'], seen['Segment'], seen['Brand']), ('replica',) * 3)
+        self.assertEqual((seen['VehicleStat'], seen['Token']), ('default', 'default'))
+
+    def test_19_2_should_use_primary_outside_requests(self):
+        self.assertEqual(router.db_for_read(Vehicle), 'default')
+        self.assertEqual(router.db_for_write(Vehicle), 'default')
+
+    def test_19_3_should_pin_unsafe_requests_to_primary(self):
+        self.assertEqual(self.request('post', token='writer')['Vehicle'], 'default')
+
+    def test_19_4_should_read_own_writes_within_window(self):
+        self.request(token='writer', write='1')
+        self.assertEqual(self.request(token='writer')['Vehicle'], 'default')
+        self.assertEqual(self.request(token='reader')['Vehicle'], 'replica')
+        self.assertEqual(self.request(token=None)['Vehicle'], 'replica')
+
+    @override_settings(REPLICA_PIN_CACHE={'BACKEND': 'local', 'TIMEOUT': 0})
+    def test_19_5_should_return_to_replica_after_window(self):
+        self.request(token='writer', write='1')
+        self.assertEqual(self.request(token='writer')['Vehicle'], 'replica')
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_19_6_should_use_primary_without_replica(self):
+        self.assertEqual(router.db_for_read(Vehicle), 'default')
+
+    def test_19_8_should_pin_rest_of_request_on_demand(self):
+        self.assertEqual(self.request(primary='1')['Vehicle'], 'default')
+        self.assertEqual(self.request()['Vehicle'], 'replica')
+
+    def test_19_9_should_stay_async_under_asgi(self):
+        async def get_response(request):
+            self.seen['Vehicle'] = router.db_for_read(Vehicle)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        async_to_sync(middleware)(self.factory.get('/api/vehicles/'))
+        self.assertEqual(self.seen['Vehicle'], 'replica')
+
+
+# 'replica' is not a configured database here: a read routed to it fails.
+@override_settings(REPLICA_DATABASE='replica', REPLICA_PIN_CACHE={'BACKEND': 'local', 'TIMEOUT': 60})
+class ReplicaResponseCacheTests(TransactionTestCase):
+
+    def test_19_10_should_fill_response_cache_from_primary(self):
+        response_cache.get_store().clear()
+        Segment.objects.create(segment_name='Sedan')
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(username='dummy', password='dummy_pw'))
+        res = client.get('/api/segments/')
+        self.assertEqual((res['X-Cache'], res.json()['results'][0]['segment_name']), ('MISS', 'Sedan'))
+        self.assertEqual(client.get('/api/segments/')['X-Cache'], 'HIT')
+
+
+class SyncReplicaCommandTests(TransactionTestCase):
+
+    def test_19_7_should_copy_primary_into_replica_file(self):
+        user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        Vehicle.objects.create(user=user, vehicle_name='MODEL S', release_year=2019, price=500,
+                               segment=Segment.objects.create(segment_name='Sedan'),
+                               brand=Brand.objects.create(brand_name='Tesla'))
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        target = os.path.join(directory, 'replica.sqlite3')
+        out = StringIO()
+        call_command('sync_replica', target=target, stdout=out)
+        self.assertIn('Synced', out.getvalue())
+        replica = sqlite3.connect(target)
+        self.addCleanup(replica.close)
+        self.assertEqual(replica.execute('SELECT vehicle_name FROM api_vehicle').fetchall(), [('MODEL S',)])
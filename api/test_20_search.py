@@ -0,0 +1,100 @@
+import sqlite3
+from unittest import skipUnless
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Vehicle, Brand, Segment
+
+VEHICLES_URL = '/api/vehicles/'
+
+
+class VehicleSearchApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.segment = Segment.objects.create(segment_name='Sedan')
+        self.brands = [Brand.objects.create(brand_name=name) for name in ('Tesla', 'Renault')]
+        self.vehicles = {
+            name: Vehicle.objects.create(user=self.user, vehicle_name=name, release_year=2019, price=500,
+                                         segment=self.segment, brand=self.brands[i % 2])
+            for i, name in enumerate(('Model S', 'Model X', 'Roadster', 'Model 3 Performance',
+                                      'Mégane E-Tech', 'Model Model Y'))
+        }
+
+    def names(self, **params):
+        res = self.client.get(VEHICLES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row['vehicle_name'] for row in res.data['results']]
+
+    def test_20_1_should_match_token_prefixes(self):
+        self.assertEqual(set(self.names(search='mod')),
+                         {'Model S', 'Model X', 'Model 3 Performance', 'Model Model Y'})
+        self.assertEqual(self.names(search='model s'), ['Model S'])
+        self.assertEqual(self.names(search='perf 3'), ['Model 3 Performance'])
+
+    def test_20_2_should_ignore_case_and_diacritics(self):
+        self.assertEqual(self.names(search='MEGANE tech'), ['Mégane E-Tech'])
+
+    def test_20_3_should_order_by_rank_by_default(self):
+        names = self.names(search='model')
+        self.assertEqual(names[0], 'Model Model Y')
+        self.assertEqual(names[-1], 'Model 3 Performance')
+
+    def test_20_4_should_paginate_ranked_results(self):
+        expected = self.names(search='model')
+        url, walked = VEHICLES_URL + '?search=model&page_size=1', []
+        while url:
+            res = self.client.get(url)
+            walked.extend(row['vehicle_name'] for row in res.data['results'])
+            url = res.data['next']
+        self.assertEqual(walked, expected)
+
+    def test_20_5_should_compose_with_filters_and_orderings(self):
+        self.assertEqual(self.names(search='model', brand=self.brands[1].id, ordering='id'),
+                         ['Model X', 'Model 3 Performance', 'Model Model Y'])
+
+    def test_20_6_should_follow_renames_and_deletes(self):
+        vehicle = self.vehicles['Roadster']
+        vehicle.vehicle_name = 'Cybertruck'
+        vehicle.save()
+        self.vehicles['Model X'].delete()
+        self.assertEqual(self.names(search='cyber'), ['Cybertruck'])
+        self.assertEqual(self.names(search='roadster'), [])
+        self.assertNotIn('Model X', self.names(search='model'))
+
+    def test_20_7_should_reject_rank_ordering_without_search(self):
+        res = self.client.get(VEHICLES_URL, {'ordering': 'rank'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(VEHICLES_URL, {'search': 'x' * 201})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(sqlite3.sqlite_version_info >= (3, 34, 0), 'trigram tokenizer needs SQLite 3.34')
+    def test_20_8_should_fall_back_to_trigrams_for_typos(self):
+        self.assertEqual(self.names(search='roadstre')[0], 'Roadster')
+        self.assertEqual(self.names(search='@@'), [])
+
+    @override_settings(FAST_READS=True)
+    def test_20_9_should_search_on_fast_path(self):
+        with override_settings(FAST_READS=False):
+            expected = self.client.get(VEHICLES_URL, {'search': 'model', 'page_size': 2}).content
+        self.assertEqual(self.client.get(VEHICLES_URL, {'search': 'model', 'page_size': 2}).content, expected)
+
+    def test_20_10_should_rank_many_matches_in_one_scan(self):
+        Vehicle.objects.bulk_create(
+            Vehicle(user=self.user, vehicle_name='Model %d' % number, release_year=2019, price=500,
+                    segment=self.segment, brand=self.brands[0])
+            for number in range(100)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(VEHICLES_URL, {'search': 'model', 'page_size': 10})
+        self.assertEqual((res.data['count'], len(res.data['results'])), (104, 10))
+        searches = [query['sql'] for query in queries if 'MATCH' in query['sql']]
+        self.assertTrue(searches)
+        # Joined to the index, not matched again for every candidate row.
+        for sql in searches:
+            self.assertEqual(sql.count('MATCH'), 1)
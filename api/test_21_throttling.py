@@ -0,0 +1,95 @@
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Segment
+from .throttling import get_bucket_store
+
+TOKEN_URL = '/api/auth/'
+CREATE_USER_URL = '/api/create/'
+SEGMENTS_URL = '/api/segments/'
+
+
+def rates(**scopes):
+    return dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=dict(
+        {'auth': '3/min', 'write': '2/min', 'read': '2/min'}, **scopes))
+
+
+@override_settings(REST_FRAMEWORK=rates())
+class ThrottlingApiTests(TestCase):
+
+    def setUp(self):
+        get_bucket_store().clear()
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.other = get_user_model().objects.create_user(username='other', password='other_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Segment.objects.create(segment_name='Sedan')
+
+    def login(self, address='10.0.0.1', **extra):
+        return APIClient().post(TOKEN_URL, {'username': 'dummy', 'password': 'dummy_pw'}, REMOTE_ADDR=address,
+                                **extra)
+
+    def test_21_1_should_limit_logins_per_ip(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        res = self.login()
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '20')
+        self.assertEqual(self.login('10.0.0.2').status_code, status.HTTP_200_OK)
+
+    def test_21_2_should_share_auth_budget_with_signup(self):
+        payload = {'email': 'new@test.com', 'username': 'new', 'password': 'new_pw_123'}
+        res = APIClient().post(CREATE_USER_URL, payload, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.login()
+        self.login()
+        self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_21_3_should_limit_reads_per_user(self):
+        self.client.get(SEGMENTS_URL)
+        self.client.get(SEGMENTS_URL)
+        self.assertEqual(self.client.get(SEGMENTS_URL).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        other = APIClient()
+        other.force_authenticate(self.other)
+        self.assertEqual(other.get(SEGMENTS_URL).status_code, status.HTTP_200_OK)
+
+    def test_21_4_should_budget_writes_separately(self):
+        self.client.get(SEGMENTS_URL)
+        self.client.get(SEGMENTS_URL)
+        res = self.client.post(SEGMENTS_URL, {'segment_name': 'SUV'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.client.post(SEGMENTS_URL, {'segment_name': 'Van'})
+        res = self.client.post(SEGMENTS_URL, {'segment_name': 'Coupe'})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_21_5_should_refill_over_time(self):
+        with mock.patch('api.throttling.time.time', return_value=1000.0) as now:
+            self.client.get(SEGMENTS_URL)
+            self.client.get(SEGMENTS_URL)
+            self.assertEqual(self.client.get(SEGMENTS_URL).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            now.return_value = 1030.0
+            self.assertEqual(self.client.get(SEGMENTS_URL).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get(SEGMENTS_URL).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_FRAMEWORK=rates(read=None))
+    def test_21_6_should_not_limit_disabled_scope(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(SEGMENTS_URL).status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_STORE={'BACKEND': 'django'})
+    def test_21_7_should_use_shared_store(self):
+        cache.clear()
+        self.client.get(SEGMENTS_URL)
+        self.client.get(SEGMENTS_URL)
+        self.assertEqual(self.client.get(SEGMENTS_URL).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIsNotNone(cache.get('api:throttle:read:user:%s' % self.user.pk))
+
+    def test_21_8_should_ignore_forwarded_for_from_clients(self):
+        for number in range(3):
+            self.login(HTTP_X_FORWARDED_FOR='192.0.2.%d' % number)
+        res = self.login(HTTP_X_FORWARDED_FOR='192.0.2.99')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Vehicle, Brand, Segment
+
+VEHICLES_URL = '/api/vehicles/'
+
+
+def detail_url(vehicle_id):
+    return '%s%d/' % (VEHICLES_URL, vehicle_id)
+
+
+class SparseFieldsApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.segment = Segment.objects.create(segment_name='Sedan')
+        self.brand = Brand.objects.create(brand_name='Tesla')
+        self.vehicles = [
+            Vehicle.objects.create(user=self.user, vehicle_name=name, release_year=year, price=price,
+                                   segment=self.segment, brand=self.brand)
+            for name, year, price in (('MODEL S', 2019, 500), ('MODEL X', 2018, 700), ('MODEL 3', 2020, 300))
+        ]
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, queries[-1]['sql']
+
+    def test_22_1_should_narrow_list_output_and_columns(self):
+        res, sql = self.get(VEHICLES_URL, fields='id,vehicle_name,price')
+        self.assertEqual(res.data['results'][0], {'id': self.vehicles[0].id, 'vehicle_name': 'MODEL S',
+                                                  'price': '500.00'})
+        self.assertNotIn('release_year', sql)
+        self.assertNotIn('api_segment', sql)
+        self.assertNotIn('api_brand', sql)
+
+    def test_22_2_should_join_only_for_expansions(self):
+        self.get(VEHICLES_URL)
+        res, sql = self.get(VEHICLES_URL, fields='id,brand_name')
+        self.assertEqual(res.data['results'][0], {'id': self.vehicles[0].id, 'brand_name': 'Tesla'})
+        self.assertNotIn('JOIN', sql)
+        res, sql = self.get(VEHICLES_URL, fields='id', expand='brand')
+        self.assertIn('JOIN "api_brand"', sql)
+        self.assertNotIn('api_segment', sql)
+
+    def test_22_3_should_expand_related_objects(self):
+        res, _ = self.get(detail_url(self.vehicles[0].id), fields='id', expand='segment,brand')
+        self.assertEqual(res.data, {'id': self.vehicles[0].id,
+                                    'segment': {'id': self.segment.id, 'segment_name': 'Sedan'},
+                                    'brand': {'id': self.brand.id, 'brand_name': 'Tesla'}})
+        res, _ = self.get(VEHICLES_URL, expand='brand')
+        self.assertEqual(res.data['results'][0]['brand'], {'id': self.brand.id, 'brand_name': 'Tesla'})
+        self.assertEqual(res.data['results'][0]['segment'], self.segment.id)
+        self.assertEqual(len(res.data['results'][0]), 8)
+
+    def test_22_4_should_paginate_on_unselected_ordering(self):
+        res, _ = self.get(VEHICLES_URL, fields='vehicle_name', ordering='-price', page_size=2)
+        self.assertEqual(res.data['results'], [{'vehicle_name': 'MODEL X'}, {'vehicle_name': 'MODEL S'}])
+        res, _ = self.get(res.data['next'])
+        self.assertEqual(res.data['results'], [{'vehicle_name': 'MODEL 3'}])
+
+    def test_22_5_should_not_query_deferred_fields(self):
+        with self.assertNumQueries(2):
+            self.client.get(VEHICLES_URL, {'fields': 'id', 'ordering': 'release_year'})
+        with self.assertNumQueries(1):
+            self.client.get(detail_url(self.vehicles[0].id), {'fields': 'vehicle_name'})
+
+    def test_22_6_should_reject_unknown_fields(self):
+        res = self.client.get(VEHICLES_URL, {'fields': 'id,user', 'expand': 'price'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'fields', 'expand'})
+
+    def test_22_7_should_ignore_fieldset_on_writes(self):
+        payload = {'vehicle_name': 'ROADSTER', 'release_year': 2008, 'price': 100,
+                   'segment': self.segment.id, 'brand': self.brand.id}
+        res = self.client.post(VEHICLES_URL + '?fields=id', payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['vehicle_name'], 'ROADSTER')
+
+    @override_settings(FAST_READS=True)
+    def test_22_8_should_narrow_fast_path(self):
+        params = {'fields': 'price,id', 'ordering': 'release_year', 'page_size': 2}
+        res, sql = self.get(VEHICLES_URL, **params)
+        with override_settings(FAST_READS=False):
+            expected = self.client.get(VEHICLES_URL, params)
+        self.assertEqual(res.content, expected.content)
+        self.assertNotIn('vehicle_name', sql)
+        res, _ = self.get(VEHICLES_URL, fields='id', expand='segment')
+        self.assertEqual(res.data['results'][0]['segment']['segment_name'], 'Sedan')
+
+    def test_22_9_should_ignore_empty_fieldset(self):
+        expected, _ = self.get(VEHICLES_URL)
+        for fields in ('', ','):
+            res, _ = self.get(VEHICLES_URL, fields=fields, expand='')
+            self.assertEqual(res.data, expected.data)
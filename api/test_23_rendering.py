@@ -0,0 +1,100 @@
+import asyncio
+import datetime
+import gzip
+from asgiref.sync import async_to_sync
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from .compression import CompressionMiddleware, choose_encoding
+from .models import Vehicle, Brand, Segment
+from .renderers import FastJSONRenderer
+
+VEHICLES_URL = '/api/vehicles/'
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_23_1_should_render_like_json_renderer(self):
+        data = {
+            'price': '500.00', 'bare': Decimal('1.10'), 'name': 'Mégane "E"\n', 'lazy': gettext_lazy('Not found.'),
+            'at': datetime.datetime(2020, 1, 2, 3, 4, 5, 6, tzinfo=datetime.timezone.utc),
+            'on': datetime.date(2020, 1, 2), 'ids': (1, 2), 'keys': {1: None}, 'flags': [True, False, 0.5],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_23_2_should_fall_back_for_indent_and_big_numbers(self):
+        data = {'big': 2 ** 70, 'list': [1]}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json; indent=2'),
+                         JSONRenderer().render(data, 'application/json; indent=2'))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_23_3_should_negotiate_encoding(self):
+        self.assertEqual(choose_encoding('gzip, deflate, br', ['br', 'gzip']), 'br')
+        self.assertEqual(choose_encoding('br;q=0.5, gzip', ['br', 'gzip']), 'gzip')
+        self.assertEqual(choose_encoding('gzip;q=0, *', ['gzip']), None)
+        self.assertEqual(choose_encoding('*;q=0.1', ['gzip']), 'gzip')
+        self.assertEqual(choose_encoding('identity', ['br', 'gzip']), None)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        segment = Segment.objects.create(segment_name='Sedan')
+        brand = Brand.objects.create(brand_name='Tesla')
+        Vehicle.objects.bulk_create([
+            Vehicle(user=self.user, vehicle_name='MODEL %d' % index, release_year=2019, price=500,
+                    segment=segment, brand=brand)
+            for index in range(30)
+        ])
+
+    def test_23_4_should_gzip_large_responses(self):
+        plain = self.client.get(VEHICLES_URL)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        res = self.client.get(VEHICLES_URL, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertLess(len(res.content), len(plain.content))
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+
+    def test_23_5_should_skip_small_responses(self):
+        res = self.client.get(VEHICLES_URL, {'page_size': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_23_6_should_keep_conditional_requests_working(self):
+        res = self.client.get(VEHICLES_URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(res['ETag'].startswith('W/"'))
+        res = self.client.get(VEHICLES_URL, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_23_7_should_gzip_streaming_exports(self):
+        res = self.client.get(VEHICLES_URL + 'export/csv/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(res.streaming_content)).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 31)
+
+    @override_settings(FAST_READS=True)
+    def test_23_8_should_render_fast_path_identically(self):
+        res = self.client.get(VEHICLES_URL)
+        self.assertEqual(res.content, JSONRenderer().render(res.data))
+
+    def test_23_9_should_stay_async_under_asgi(self):
+        async def get_response(request):
+            return HttpResponse(b'x' * 2048)
+
+        middleware = CompressionMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        res = async_to_sync(middleware)(RequestFactory().get(VEHICLES_URL, HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), b'x' * 2048)
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from . import dimensions, routers
+from .models import Vehicle, Brand, Segment
+
+VEHICLES_URL = '/api/vehicles/'
+
+
+class DimensionMapApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.segment = Segment.objects.create(segment_name='Sedan')
+        self.brand = Brand.objects.create(brand_name='Tesla')
+        self.vehicle = Vehicle.objects.create(user=self.user, vehicle_name='MODEL S', release_year=2019,
+                                              price=500, segment=self.segment, brand=self.brand)
+
+    def names(self):
+        row = self.client.get(VEHICLES_URL).data['results'][0]
+        return row['segment_name'], row['brand_name']
+
+    def test_24_1_should_list_from_one_table(self):
+        self.client.get(VEHICLES_URL)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.names(), ('Sedan', 'Tesla'))
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('JOIN', queries[-1]['sql'])
+
+    def test_24_2_should_follow_writes(self):
+        self.names()
+        self.brand.brand_name = 'Tesla Motors'
+        self.brand.save()
+        self.assertEqual(self.names(), ('Sedan', 'Tesla Motors'))
+        self.vehicle.segment = Segment.objects.create(segment_name='Roadster')
+        self.vehicle.save()
+        self.assertEqual(self.names(), ('Roadster', 'Tesla Motors'))
+
+    def test_24_3_should_follow_version_bumped_elsewhere(self):
+        self.names()
+        # Another process renames and bumps the shared version.
+        Segment.objects.filter(pk=self.segment.pk).update(segment_name='Saloon')
+        self.assertEqual(self.names(), ('Sedan', 'Tesla'))
+        dimensions.get_store().set('version:segment', 'other-process')
+        self.assertEqual(self.names(), ('Saloon', 'Tesla'))
+
+    def test_24_4_should_reload_for_rows_written_without_signals(self):
+        self.names()
+        Brand.objects.bulk_create([Brand(brand_name='Rivian')])
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(brand=Brand.objects.get(brand_name='Rivian'))
+        self.assertEqual(self.names(), ('Sedan', 'Rivian'))
+
+    @override_settings(DIMENSION_CACHE={'BACKEND': 'django'})
+    def test_24_5_should_share_versions_through_cache(self):
+        self.names()
+        version = cache.get('api:dimension:version:brand')
+        self.assertIsNotNone(version)
+        Brand.objects.filter(pk=self.brand.pk).update(brand_name='Tesla Motors')
+        cache.set('api:dimension:version:brand', 'other-process')
+        self.assertEqual(self.names(), ('Sedan', 'Tesla Motors'))
+
+    @override_settings(FAST_READS=True)
+    def test_24_6_should_fill_names_on_fast_path(self):
+        self.assertEqual(self.names(), ('Sedan', 'Tesla'))
+        res = self.client.get(VEHICLES_URL + 'export/ndjson/')
+        self.assertIn(b'"segment_name":"Sedan","brand_name":"Tesla"', b''.join(res.streaming_content))
+
+
+class DimensionMapReplicaTests(TransactionTestCase):
+
+    # 'replica' is not a configured database here: a read routed to it fails.
+    @override_settings(REPLICA_DATABASE='replica')
+    def test_24_7_should_load_names_from_primary(self):
+        segment = Segment.objects.create(segment_name='Sedan')
+        token = routers._state.set(routers._RoutingState(None, pinned=False))
+        try:
+            self.assertEqual(dimensions.lookup('segment')(segment.pk), 'Sedan')
+        finally:
+            routers._state.reset(token)
+        self.assertTrue(dimensions.is_shared())
+        with override_settings(DIMENSION_CACHE={'BACKEND': 'django', 'CACHE_ALIAS': 'default'}):
+            self.assertFalse(dimensions.is_shared())
@@ -0,0 +1,135 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Vehicle, VehicleStat, Brand, Segment, DeletionTask, Job
+from . import cascade, jobs, stats
+
+BRANDS_URL = '/api/brands/'
+SEGMENTS_URL = '/api/segments/'
+
+
+def snapshot():
+    return sorted(VehicleStat.objects.values_list('dimension', 'key', 'count', 'price_sum', 'price_min', 'price_max'))
+
+
+class CascadeSetUpMixin:
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.segment = Segment.objects.create(segment_name='Sedan')
+        self.tesla = Brand.objects.create(brand_name='Tesla')
+        self.audi = Brand.objects.create(brand_name='Audi')
+        for index in range(5):
+            self.create_vehicle(self.tesla, 100 + index)
+        self.create_vehicle(self.audi, 900)
+
+    def create_vehicle(self, brand, price):
+        return Vehicle.objects.create(user=self.user, vehicle_name='CAR', release_year=2019, price=price,
+                                      segment=self.segment, brand=brand)
+
+
+@override_settings(CASCADE_DELETE_BATCH_SIZE=2, CASCADE_DELETE_ASYNC_THRESHOLD=5)
+class CascadeDeleteApiTests(CascadeSetUpMixin, TestCase):
+
+    def assert_deleted(self):
+        self.assertFalse(Brand.objects.filter(pk=self.tesla.pk).exists())
+        self.assertEqual(list(Vehicle.objects.values_list('brand_id', flat=True)), [self.audi.pk])
+        incremental = snapshot()
+        stats.rebuild()
+        self.assertEqual(incremental, snapshot())
+
+    def test_25_1_should_delete_dependents_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.delete('%s%d/' % (BRANDS_URL, self.tesla.pk))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        deletes = [query for query in queries if query['sql'].startswith('DELETE FROM "api_vehicle"')]
+        self.assertEqual(len(deletes), 3)
+        self.assert_deleted()
+
+    @override_settings(CASCADE_DELETE_ASYNC_THRESHOLD=4)
+    def test_25_2_should_accept_large_deletes_with_status_resource(self):
+        res = self.client.delete('%s%d/' % (BRANDS_URL, self.tesla.pk))
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual((res.data['status'], res.data['total'], res.data['deleted']), ('pending', 5, 0))
+        location = res['Location']
+        self.assertTrue(location.endswith('/api/deletions/%d/' % res.data['id']))
+        again = self.client.delete('%s%d/' % (BRANDS_URL, self.tesla.pk))
+        self.assertEqual(again.data['id'], res.data['id'])
+
+        self.assertEqual(Job.objects.get().kind, 'cascade_delete')
+        self.assertTrue(jobs.Worker().run_once())
+        res = self.client.get(location)
+        self.assertEqual((res.data['status'], res.data['deleted']), ('done', 5))
+        self.assertIsNotNone(res.data['finished_at'])
+        self.assert_deleted()
+
+    @override_settings(CASCADE_DELETE_ASYNC_THRESHOLD=0)
+    def test_25_3_should_record_failures(self):
+        res = self.client.delete('%s%d/' % (SEGMENTS_URL, self.segment.pk))
+        with mock.patch('api.cascade.delete_batch', side_effect=RuntimeError('disk full')), \
+                self.assertLogs('api.cascade', 'ERROR'):
+            cascade.run(res.data['id'])
+        task = DeletionTask.objects.get(pk=res.data['id'])
+        self.assertEqual((task.status, task.error), (DeletionTask.FAILED, 'disk full'))
+        self.assertTrue(Segment.objects.filter(pk=self.segment.pk).exists())
+
+    def test_25_4_should_show_tasks_to_their_user_only(self):
+        task = DeletionTask.objects.create(user=self.user, target=DeletionTask.BRAND, object_id=self.tesla.pk)
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user(username='other', password='other_pw'))
+        self.assertEqual(other.get('/api/deletions/%d/' % task.pk).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(self.client.get('/api/deletions/').data['results']), 1)
+
+    def test_25_6_should_keep_one_active_task_per_object(self):
+        running = DeletionTask.objects.create(user=self.user, target=DeletionTask.BRAND, object_id=self.tesla.pk,
+                                              status=DeletionTask.RUNNING)
+        job = jobs.enqueue('cascade_delete', {'task': running.pk}, key='deletion:brand:%d' % self.tesla.pk)
+        # Both requests passed the check before either created its task.
+        checks = [DeletionTask.objects.none(), cascade.active_tasks(DeletionTask.BRAND, self.tesla.pk)]
+        with mock.patch('api.cascade.active_tasks', side_effect=checks):
+            task = cascade.submit(self.user, DeletionTask.BRAND, self.tesla.pk, 5)
+        self.assertEqual(task, running)
+        self.assertEqual(DeletionTask.objects.count(), 1)
+        self.assertEqual(list(Job.objects.all()), [job])
+        # Below the threshold, but the running task still owns the deletion.
+        res = self.client.delete('%s%d/' % (BRANDS_URL, self.audi.pk))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self.client.delete('%s%d/' % (BRANDS_URL, self.tesla.pk))
+        self.assertEqual((res.status_code, res.data['id']), (status.HTTP_202_ACCEPTED, running.pk))
+
+    @override_settings(CASCADE_DELETE_ASYNC_THRESHOLD=4)
+    def test_25_7_should_keep_task_pending_until_last_attempt(self):
+        url = '%s%d/' % (BRANDS_URL, self.tesla.pk)
+        task_id = self.client.delete(url).data['id']
+        Job.objects.update(max_attempts=2)
+        with mock.patch('api.cascade.delete_batch', side_effect=RuntimeError('disk full')), \
+                self.assertLogs('api.cascade', 'ERROR'), self.assertLogs('api.jobs', 'ERROR'):
+            jobs.Worker().run_once()
+            task = DeletionTask.objects.get(pk=task_id)
+            self.assertEqual((task.status, task.error, task.finished_at), (DeletionTask.PENDING, 'disk full', None))
+            self.assertEqual(self.client.delete(url).data['id'], task_id)
+            self.assertEqual(Job.objects.get().status, Job.QUEUED)
+
+            Job.objects.update(run_after=timezone.now())
+            jobs.Worker().run_once()
+        self.assertEqual(DeletionTask.objects.get(pk=task_id).status, DeletionTask.FAILED)
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+
+@override_settings(CASCADE_DELETE_BATCH_SIZE=2, CASCADE_DELETE_ASYNC_THRESHOLD=1)
+class BackgroundCascadeDeleteTests(CascadeSetUpMixin, TransactionTestCase):
+
+    def test_25_5_should_delete_in_background(self):
+        res = self.client.delete('%s%d/' % (BRANDS_URL, self.tesla.pk))
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(jobs.Worker().run(burst=True), 1)
+        self.assertEqual(self.client.get(res['Location']).data['status'], 'done')
+        self.assertFalse(Brand.objects.filter(pk=self.tesla.pk).exists())
+        self.assertEqual(Vehicle.objects.count(), 1)
@@ -0,0 +1,164 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Job, Vehicle, Brand, Segment
+from . import jobs
+
+JOBS_URL = '/api/jobs/'
+
+
+def detail_url(job_id):
+    return '%s%d/' % (JOBS_URL, job_id)
+
+
+class JobSetUpMixin:
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.segment = Segment.objects.create(segment_name='Sedan')
+        self.brand = Brand.objects.create(brand_name='Tesla')
+        for year in (2018, 2019, 2020):
+            Vehicle.objects.create(user=self.user, vehicle_name='MODEL %d' % year, release_year=year, price=500,
+                                   segment=self.segment, brand=self.brand)
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+        settings = override_settings(JOB_OUTPUT_DIR=self.output_dir, JOB_RETRY_DELAY=10)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class JobApiTests(JobSetUpMixin, TestCase):
+
+    def submit(self, kind, **payload):
+        return self.client.post(JOBS_URL, {'kind': kind, 'payload': payload}, format='json')
+
+    def test_26_1_should_run_export_job_and_serve_file(self):
+        res = self.submit('export', format='csv', filters={'release_year_min': '2019'})
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual((res.data['status'], res.data['attempts']), ('queued', 0))
+        self.assertTrue(res['Location'].endswith(detail_url(res.data['id'])))
+
+        self.assertTrue(jobs.Worker().run_once())
+        self.assertFalse(jobs.Worker().run_once())
+        job = self.client.get(res['Location']).data
+        self.assertEqual((job['status'], job['attempts'], job['result']['rows']), ('done', 1, 2))
+        self.assertIsNotNone(job['finished_at'])
+
+        res = self.client.get(detail_url(job['id']) + 'download/')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Disposition'], 'attachment; filename="vehicles.csv"')
+        lines = b''.join(res.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith('MODEL 2019,2019,500.00,%d,%d,Sedan,Tesla'
+                                          % (self.segment.id, self.brand.id)))
+
+    def test_26_2_should_validate_submissions(self):
+        for kind in ('unknown', 'cascade_delete'):
+            res = self.submit(kind)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('kind', res.data)
+        res = self.submit('export', format='xml', filters={'price_min': 'abc'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data['payload']), {'format', 'filters'})
+        self.assertFalse(Job.objects.exists())
+
+    def test_26_3_should_restrict_staff_only_kinds(self):
+        self.assertEqual(self.submit('rebuild_stats').status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        res = self.submit('rebuild_stats')
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        jobs.Worker().run_once()
+        self.assertEqual(Job.objects.get().result, {'groups': 5})
+
+    def test_26_4_should_retry_with_backoff_then_fail(self):
+        handler = mock.Mock(side_effect=RuntimeError('disk full'))
+        with mock.patch.dict(jobs._kinds, flaky=jobs.JobKind(handler, None, False, 2)), \
+                self.assertLogs('api.jobs', 'ERROR'):
+            job = jobs.enqueue('flaky')
+            before = timezone.now()
+            jobs.Worker().run_once()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.error), (Job.QUEUED, 1, 'disk full'))
+            self.assertGreaterEqual(job.run_after, before + timedelta(seconds=10))
+            self.assertFalse(jobs.Worker().run_once())
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            jobs.Worker().run_once()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+            self.assertIsNotNone(job.finished_at)
+        self.assertEqual(handler.call_count, 2)
+
+    def test_26_5_should_hand_expired_jobs_to_another_worker(self):
+        job = jobs.enqueue('rebuild_stats')
+        stale = jobs.claim('worker-a')
+        self.assertIsNone(jobs.claim('worker-b'))
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        taken = jobs.claim('worker-b')
+        self.assertEqual((taken.pk, taken.attempts), (job.pk, 2))
+        with self.assertRaises(jobs.LockLost):
+            jobs.heartbeat(stale)
+        jobs.execute(stale)
+        self.assertEqual(Job.objects.get().status, Job.RUNNING)
+        jobs.execute(taken)
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    @mock.patch('api.bulk.MAX_ITEMS', 2)
+    def test_26_6_should_import_in_batches(self):
+        items = [{'vehicle_name': 'ROADSTER', 'release_year': 2008, 'price': 100,
+                  'segment': self.segment.id, 'brand': self.brand.id} for _ in range(4)]
+        items[2]['price'] = 'abc'
+        res = self.submit('bulk_import', items=items)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        jobs.Worker().run_once()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.progress, job.result['created']), (Job.DONE, 4, 3))
+        self.assertEqual([error['index'] for error in job.result['errors']], [2])
+        self.assertEqual(Vehicle.objects.filter(vehicle_name='ROADSTER', user=self.user).count(), 3)
+
+    def test_26_7_should_show_jobs_to_their_user_only(self):
+        job = self.submit('export', format='ndjson').data
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user(username='other', password='other_pw'))
+        self.assertEqual(other.get(detail_url(job['id'])).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(self.client.get(JOBS_URL).data['results']), 1)
+        self.assertEqual(self.client.get(detail_url(job['id']) + 'download/').status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    @override_settings(JOB_OUTPUT_MAX_AGE=3600)
+    def test_26_10_should_remove_expired_output(self):
+        paths = [os.path.join(self.output_dir, name) for name in ('old.csv', 'old.csv.tmp', 'new.csv')]
+        for path in paths:
+            open(path, 'w').close()
+        for path in paths[:2]:
+            os.utime(path, (0, 0))
+        self.assertEqual(jobs.remove_expired_output(), 2)
+        self.assertEqual(os.listdir(self.output_dir), ['new.csv'])
+
+
+class RunWorkersCommandTests(JobSetUpMixin, TransactionTestCase):
+
+    def test_26_8_should_run_due_jobs_in_burst_mode(self):
+        for export_format in ('csv', 'ndjson'):
+            jobs.enqueue('export', {'format': export_format}, user=self.user)
+        out = io.StringIO()
+        call_command('run_workers', processes=1, burst=True, stdout=out)
+        self.assertIn('Ran 2 jobs.', out.getvalue())
+        self.assertEqual(list(Job.objects.values_list('status', flat=True)), [Job.DONE, Job.DONE])
+
+    @override_settings(DIMENSION_CACHE={'BACKEND': 'local'})
+    def test_26_9_should_refuse_several_workers_without_shared_dimension_cache(self):
+        with self.assertRaisesMessage(CommandError, 'DIMENSION_CACHE'):
+            call_command('run_workers', processes=2, burst=True)
@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Vehicle, Brand, Segment
+from .pagination import get_count_store
+from . import stats
+
+VEHICLES_URL = '/api/vehicles/'
+
+
+@override_settings(PAGINATION_COUNT={'EXACT_THRESHOLD': 3, 'BACKEND': 'local', 'TIMEOUT': 300})
+class ListCountApiTests(TestCase):
+
+    def setUp(self):
+        get_count_store().clear()
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.segment = Segment.objects.create(segment_name='Sedan')
+        self.tesla = Brand.objects.create(brand_name='Tesla')
+        self.audi = Brand.objects.create(brand_name='Audi')
+        for index in range(5):
+            self.create_vehicle(self.tesla, 2016 + index, 100 * (index + 1))
+        self.create_vehicle(self.audi, 2020, 900)
+
+    def create_vehicle(self, brand, year, price):
+        return Vehicle.objects.create(user=self.user, vehicle_name='CAR', release_year=year, price=price,
+                                      segment=self.segment, brand=brand)
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(VEHICLES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, [query['sql'] for query in queries]
+
+    def test_27_1_should_count_small_lists_exactly_with_bounded_query(self):
+        # Loads the segment and brand names.
+        self.get()
+        res, queries = self.get(brand=self.audi.id)
+        self.assertEqual((res.data['count'], res.data['count_approximate']), (1, False))
+        self.assertEqual(list(res.data)[:2], ['count', 'count_approximate'])
+        self.assertIn('LIMIT 4', queries[0])
+        self.assertEqual(len(queries), 2)
+
+    def test_27_2_should_count_large_lists_from_stats(self):
+        for params, expected in (({}, 6), ({'brand': self.tesla.id}, 5),
+                                 ({'release_year_min': 2018, 'release_year_max': 2020}, 4)):
+            res, queries = self.get(page_size=2, **params)
+            self.assertEqual((res.data['count'], res.data['count_approximate']), (expected, False))
+            self.assertEqual(len(res.data['results']), 2)
+            self.assertTrue(any('"api_vehiclestat"' in sql for sql in queries))
+        res = self.client.get(res.data['next'])
+        self.assertEqual((res.data['count'], len(res.data['results'])), (4, 2))
+
+    def test_27_3_should_cache_approximate_counts_of_other_filters(self):
+        params = {'brand': self.tesla.id, 'price_max': 450}
+        res, _ = self.get(**params)
+        self.assertEqual((res.data['count'], res.data['count_approximate']), (4, True))
+        res, queries = self.get(**params)
+        self.assertEqual(res.data['count'], 4)
+        self.assertFalse(any(sql.startswith('SELECT COUNT(*) AS "__count" FROM "api_vehicle"') for sql in queries))
+        self.assertFalse(any('MAX(' in sql for sql in queries))
+        # Writes bump the vehicle list version the cached counts are keyed on.
+        self.create_vehicle(self.tesla, 2021, 150)
+        res, _ = self.get(**params)
+        self.assertEqual((res.data['count'], len(res.data['results'])), (5, 5))
+        self.client.delete('/api/vehicles/bulk/', {'ids': [Vehicle.objects.latest('id').id]}, format='json')
+        self.assertEqual(self.get(**params)[0].data['count'], 4)
+
+    def test_27_4_should_keep_list_validators(self):
+        params = {'brand': self.tesla.id, 'price_max': 450}
+        res, _ = self.get(**params)
+        etag = res['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(VEHICLES_URL, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 0)
+        self.client.patch('%s%d/' % (VEHICLES_URL, Vehicle.objects.first().id), {'price': 120})
+        res = self.client.get(VEHICLES_URL, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # A deletion plus an insert leaves the count and MAX(updated_at) as they were.
+        etag = res['ETag']
+        Vehicle.objects.filter(price=400).delete()
+        self.create_vehicle(self.tesla, 2020, 400)
+        res = self.client.get(VEHICLES_URL, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_27_5_should_count_on_fast_path(self):
+        params = {'brand': self.tesla.id, 'ordering': 'price', 'page_size': 2}
+        expected = self.client.get(VEHICLES_URL, params)
+        with override_settings(FAST_READS=True):
+            res = self.client.get(VEHICLES_URL, params)
+        self.assertEqual(res.content, expected.content)
+        self.assertEqual(res.data['count'], 5)
+
+    def test_27_6_should_count_single_dimension_lookups_only(self):
+        self.assertEqual(stats.count({}), 6)
+        self.assertEqual(stats.count({'brand_id__in': [self.tesla.id, self.audi.id]}), 6)
+        self.assertEqual(stats.count({'release_year__gte': 2019}), 3)
+        self.assertIsNone(stats.count({'brand_id': self.tesla.id, 'release_year__gte': 2019}))
+        self.assertIsNone(stats.count({'price__lte': 500}))
+
+    def test_27_7_should_count_without_annotations(self):
+        Vehicle.objects.filter(brand=self.audi).update(vehicle_name='ROADSTER')
+        res, queries = self.get(search='car')
+        self.assertEqual(res.data['count'], 5)
+        counts = [sql for sql in queries if sql.startswith('SELECT COUNT(')]
+        self.assertEqual(len(counts), 2)
+        for sql in counts:
+            self.assertNotIn('bm25', sql)
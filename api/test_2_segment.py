@@ -31,7 +31,7 @@ class AuthorizedSegmentApiTests(TestCase):
         segments = Segment.objects.all().order_by('id')
         serializer = SegmentSerializer(segments, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_2_2_should_get_single_segment(self):
         segment = create_segment(segment_name="SUV")
@@ -31,7 +31,7 @@ class AuthorizedBrandApiTests(TestCase):
         brands = Brand.objects.all().order_by('id')
         serializer = BrandSerializer(brands, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_3_2_should_get_single_brand(self):
         brand = create_brand(brand_name="Toyota")
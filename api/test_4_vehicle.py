@@ -5,6 +5,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 from .models import Vehicle, Brand, Segment
 from .serializers import VehicleSerializer
+from .querybudget import query_budget, QueryBudgetExceeded
 from decimal import Decimal
 
 SEGMENTS_URL = '/api/segments/'
@@ -60,7 +61,7 @@ class AuthorizedVehicleApiTests(TestCase):
         vehicles = Vehicle.objects.all().order_by('id')
         serializer = VehicleSerializer(vehicles, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_4_2_should_get_single_vehicle(self):
         segment = create_segment(segment_name='Sedan')
@@ -156,6 +157,39 @@ class AuthorizedVehicleApiTests(TestCase):
         self.client.delete(url)
         self.assertEqual(0, Vehicle.objects.count())
 
+    def test_4__11_should_get_vehicles_with_constant_queries(self):
+        segment = create_segment(segment_name='Sedan')
+        brand = create_brand(brand_name='Tesla')
+        for _ in range(2):
+            create_vehicle(user=self.user, segment=segment, brand=brand)
+        # The first read after a segment or brand write reloads their names.
+        self.client.get(VEHICLES_URL)
+        # validator aggregate + page
+        with query_budget(2):
+            self.client.get(VEHICLES_URL)
+        for _ in range(20):
+            create_vehicle(user=self.user, segment=create_segment('SUV'), brand=create_brand('Audi'))
+        self.client.get(VEHICLES_URL)
+        with query_budget(2):
+            res = self.client.get(VEHICLES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 22)
+
+    def test_4__12_should_get_single_vehicle_with_one_query(self):
+        segment = create_segment(segment_name='Sedan')
+        brand = create_brand(brand_name='Tesla')
+        vehicle = create_vehicle(user=self.user, segment=segment, brand=brand)
+        self.client.get(detail_vehicle_url(vehicle.id))
+        with query_budget(1):
+            res = self.client.get(detail_vehicle_url(vehicle.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_4__13_should_fail_when_query_budget_exceeded(self):
+        segment = create_segment(segment_name='Sedan')
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(0):
+                Segment.objects.get(id=segment.id)
+
 
 class UnauthorizedVehicleApiTests(TestCase):
 
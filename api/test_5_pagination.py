@@ -0,0 +1,91 @@
+import json
+from base64 import urlsafe_b64encode
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Vehicle, Brand, Segment
+from .querybudget import query_budget
+
+VEHICLES_URL = '/api/vehicles/'
+
+
+def create_vehicles(user, prices):
+    segment = Segment.objects.create(segment_name='Sedan')
+    brand = Brand.objects.create(brand_name='Tesla')
+    return [
+        Vehicle.objects.create(user=user, vehicle_name='MODEL %d' % i, release_year=2000 + i % 3,
+                               price=price, segment=segment, brand=brand)
+        for i, price in enumerate(prices)
+    ]
+
+
+class VehiclePaginationApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url):
+        ids = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(row['id'] for row in res.data['results'])
+            url = res.data['next']
+        return ids
+
+    def test_5_1_should_paginate_by_id(self):
+        vehicles = create_vehicles(self.user, [100] * 7)
+        res = self.client.get(VEHICLES_URL, {'page_size': 3})
+        self.assertEqual([row['id'] for row in res.data['results']], [v.id for v in vehicles[:3]])
+        self.assertIsNone(res.data['previous'])
+        self.assertEqual(self.walk(VEHICLES_URL + '?page_size=3'), [v.id for v in vehicles])
+
+    def test_5_2_should_paginate_by_release_year_with_ties(self):
+        vehicles = create_vehicles(self.user, [100] * 8)
+        expected = [v.id for v in sorted(vehicles, key=lambda v: (v.release_year, v.id))]
+        self.assertEqual(self.walk(VEHICLES_URL + '?ordering=release_year&page_size=3'), expected)
+
+    def test_5_3_should_paginate_by_descending_price(self):
+        vehicles = create_vehicles(self.user, [300, 100.5, 200, 100.5, 300, 50])
+        expected = [v.id for v in sorted(vehicles, key=lambda v: (-v.price, -v.id))]
+        self.assertEqual(self.walk(VEHICLES_URL + '?ordering=-price&page_size=2'), expected)
+
+    def test_5_4_should_follow_previous_link(self):
+        vehicles = create_vehicles(self.user, [100] * 5)
+        first = self.client.get(VEHICLES_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertEqual([row['id'] for row in second.data['results']], [v.id for v in vehicles[2:4]])
+
+    def test_5_5_should_reject_unknown_ordering(self):
+        res = self.client.get(VEHICLES_URL, {'ordering': 'vehicle_name'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_5_6_should_reject_invalid_cursor(self):
+        res = self.client.get(VEHICLES_URL, {'cursor': 'garbage'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_5_7_should_get_deep_page_with_constant_queries(self):
+        create_vehicles(self.user, [100] * 12)
+        res = self.client.get(VEHICLES_URL, {'page_size': 5, 'ordering': 'price'})
+        res = self.client.get(res.data['next'])
+        # validator aggregate + page
+        with query_budget(2):
+            res = self.client.get(res.data['next'])
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNone(res.data['next'])
+
+    def test_5_8_should_reject_tampered_cursor_values(self):
+        create_vehicles(self.user, [100, 200])
+        for ordering, position in (('id', [[]]), ('id', [2 ** 70]), ('price', ['NaN', 1]),
+                                   ('price', ['1e999', 1]), ('release_year', [None, 1]), ('id', [{}])):
+            data = json.dumps({'o': ordering, 'r': 0, 'p': position})
+            cursor = urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+            res = self.client.get(VEHICLES_URL, {'cursor': cursor, 'ordering': ordering})
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND, position)
+        res = self.client.get(VEHICLES_URL, {'cursor': 'eyJvIjoiaWQiLCJyIjowLCJwIjpbW11dfQ=='})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
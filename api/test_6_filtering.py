@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Vehicle, Brand, Segment
+
+VEHICLES_URL = '/api/vehicles/'
+
+
+class VehicleFilteringApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.other = get_user_model().objects.create_user(username='other', password='other_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.sedan = Segment.objects.create(segment_name='Sedan')
+        self.suv = Segment.objects.create(segment_name='SUV')
+        self.tesla = Brand.objects.create(brand_name='Tesla')
+        self.audi = Brand.objects.create(brand_name='Audi')
+        self.toyota = Brand.objects.create(brand_name='Toyota')
+        rows = [
+            (self.user, 2017, 300, self.sedan, self.tesla),
+            (self.user, 2018, 450.5, self.suv, self.audi),
+            (self.other, 2019, 500, self.sedan, self.toyota),
+            (self.other, 2020, 900, self.suv, self.tesla),
+        ]
+        self.vehicles = [
+            Vehicle.objects.create(user=user, vehicle_name='CAR', release_year=year,
+                                   price=price, segment=segment, brand=brand)
+            for user, year, price, segment, brand in rows
+        ]
+
+    def get_ids(self, params):
+        res = self.client.get(VEHICLES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in res.data['results']]
+
+    def ids(self, *indexes):
+        return [self.vehicles[i].id for i in indexes]
+
+    def test_6_1_should_filter_by_release_year_range(self):
+        self.assertEqual(self.get_ids({'release_year_min': 2018, 'release_year_max': 2019}), self.ids(1, 2))
+
+    def test_6_2_should_filter_by_price_range(self):
+        self.assertEqual(self.get_ids({'price_min': '450.50'}), self.ids(1, 2, 3))
+        self.assertEqual(self.get_ids({'price_max': '450.49'}), self.ids(0))
+
+    def test_6_3_should_filter_by_brand_and_segment(self):
+        self.assertEqual(self.get_ids({'brand': self.tesla.id}), self.ids(0, 3))
+        self.assertEqual(self.get_ids({'brand': '%d,%d' % (self.audi.id, self.toyota.id)}), self.ids(1, 2))
+        self.assertEqual(self.get_ids({'segment': self.suv.id, 'brand': self.tesla.id}), self.ids(3))
+
+    def test_6_4_should_filter_by_user(self):
+        self.assertEqual(self.get_ids({'user': self.other.id}), self.ids(2, 3))
+
+    def test_6_5_should_combine_filters_with_ordering(self):
+        params = {'segment': '%d,%d' % (self.sedan.id, self.suv.id), 'price_min': 400, 'ordering': '-price'}
+        self.assertEqual(self.get_ids(params), self.ids(3, 2, 1))
+
+    def test_6_6_should_reject_invalid_filters(self):
+        res = self.client.get(VEHICLES_URL, {'price_min': 'cheap', 'brand': '1,x'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price_min', res.data)
+        self.assertIn('brand', res.data)
+
+    def test_6_7_should_use_index_for_filters(self):
+        queryset = Vehicle.objects.all()
+        for lookups, ordering in [({'release_year__gte': 2018, 'release_year__lte': 2019}, 'id'),
+                                  ({'price__gte': 100}, 'price'),
+                                  ({'brand_id': self.tesla.id, 'price__gte': 100}, 'price'),
+                                  ({'segment_id__in': [self.sedan.id, self.suv.id]}, 'id')]:
+            plan = queryset.filter(**lookups).order_by(ordering, 'id').explain()
+            self.assertNotIn('SCAN api_vehicle', plan, lookups)
+
+    def test_6_8_should_reject_out_of_range_integers(self):
+        huge = '99999999999999999999'
+        res = self.client.get(VEHICLES_URL, {'release_year_min': huge, 'brand': '1,-' + huge})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'release_year_min', 'brand'})
+        self.assertEqual(self.get_ids({'release_year_max': str(2 ** 63 - 1)}), self.ids(0, 1, 2, 3))
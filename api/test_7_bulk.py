@@ -0,0 +1,111 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Vehicle, Brand, Segment
+from .querybudget import query_budget
+
+BULK_URL = '/api/vehicles/bulk/'
+
+
+class VehicleBulkApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.segment = Segment.objects.create(segment_name='Sedan')
+        self.brand = Brand.objects.create(brand_name='Tesla')
+
+    def item(self, **params):
+        defaults = {
+            'vehicle_name': 'MODEL S',
+            'release_year': 2019,
+            'price': '500.00',
+            'segment': self.segment.id,
+            'brand': self.brand.id,
+        }
+        defaults.update(params)
+        return defaults
+
+    def create_vehicle(self, **params):
+        return Vehicle.objects.create(user=self.user, vehicle_name='MODEL S', release_year=2019,
+                                      price=500, segment=self.segment, brand=self.brand, **params)
+
+    def test_7_1_should_bulk_create_vehicles_with_constant_queries(self):
+        payload = [self.item(vehicle_name='CAR %d' % i) for i in range(50)]
+        # reference check, savepoint + insert + release, then an UPDATE and a
+        # savepoint + INSERT + release for each of the 3 new stats groups
+        with query_budget(16):
+            res = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data, {'created': 50, 'errors': []})
+        self.assertEqual(Vehicle.objects.filter(user=self.user).count(), 50)
+
+    def test_7_2_should_report_per_item_errors_on_bulk_create(self):
+        payload = [
+            self.item(),
+            self.item(price='not a price'),
+            self.item(segment=self.segment.id + 100),
+            'not an object',
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual([error['index'] for error in res.data['errors']], [1, 2, 3])
+        self.assertIn('price', res.data['errors'][0]['errors'])
+        self.assertIn('segment', res.data['errors'][1]['errors'])
+
+    def test_7_3_should_reject_bulk_create_when_all_items_invalid(self):
+        res = self.client.post(BULK_URL, [self.item(brand='')], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Vehicle.objects.count(), 0)
+
+    def test_7_4_should_reject_non_list_payload(self):
+        res = self.client.post(BULK_URL, self.item(), format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_7_5_should_bulk_partial_update_vehicles(self):
+        first = self.create_vehicle()
+        second = self.create_vehicle()
+        payload = [
+            {'id': first.id, 'price': '610.50'},
+            {'id': second.id, 'vehicle_name': 'MODEL X', 'release_year': 2020},
+            {'id': second.id + 100, 'price': '1.00'},
+            {'price': '1.00'},
+        ]
+        res = self.client.patch(BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], 2)
+        self.assertEqual([error['index'] for error in res.data['errors']], [2, 3])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.price, Decimal('610.50'))
+        self.assertEqual(first.vehicle_name, 'MODEL S')
+        self.assertEqual((second.vehicle_name, second.release_year), ('MODEL X', 2020))
+
+    def test_7_6_should_bulk_delete_vehicles(self):
+        vehicles = [self.create_vehicle() for _ in range(3)]
+        payload = {'ids': [vehicles[0].id, vehicles[2].id, vehicles[2].id + 100]}
+        res = self.client.delete(BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 2)
+        self.assertEqual([error['index'] for error in res.data['errors']], [2])
+        self.assertEqual(list(Vehicle.objects.values_list('id', flat=True)), [vehicles[1].id])
+
+    def test_7_7_should_report_out_of_range_integers_per_item(self):
+        vehicle = self.create_vehicle()
+        huge = 2 ** 63
+        res = self.client.post(BULK_URL, [self.item(), self.item(segment=huge), self.item(brand=huge),
+                                          self.item(release_year=-huge - 1)], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([(error['index'], list(error['errors'])) for error in res.data['errors']],
+                         [(1, ['segment']), (2, ['brand']), (3, ['release_year'])])
+        res = self.client.patch(BULK_URL, [{'id': huge, 'price': '1.00'},
+                                           {'id': vehicle.id, 'release_year': huge}], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([list(error['errors']) for error in res.data['errors']], [['id'], ['release_year']])
+        res = self.client.delete(BULK_URL, {'ids': [vehicle.id, huge]}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['errors'], [{'index': 1, 'errors': {'id': ['Not found.']}}])
@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Vehicle, Brand, Segment
+from .querybudget import query_budget
+
+EXPORT_CSV_URL = '/api/vehicles/export/csv/'
+EXPORT_NDJSON_URL = '/api/vehicles/export/ndjson/'
+
+
+class VehicleExportApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        segment = Segment.objects.create(segment_name='Sedan')
+        brand = Brand.objects.create(brand_name='Tesla, Inc.')
+        self.vehicles = [
+            Vehicle.objects.create(user=self.user, vehicle_name='MODEL %d' % i, release_year=2018 + i,
+                                   price=500 + i, segment=segment, brand=brand)
+            for i in range(3)
+        ]
+
+    def read(self, res):
+        self.assertTrue(res.streaming)
+        return b''.join(res.streaming_content).decode('utf-8')
+
+    def test_8_1_should_export_csv(self):
+        # Loads the segment and brand names.
+        self.read(self.client.get(EXPORT_CSV_URL))
+        with query_budget(1):
+            res = self.client.get(EXPORT_CSV_URL)
+            body = self.read(res)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], ['id', 'vehicle_name', 'release_year', 'price', 'segment', 'brand',
+                                   'segment_name', 'brand_name'])
+        vehicle = self.vehicles[0]
+        self.assertEqual(rows[1], [str(vehicle.id), 'MODEL 0', '2018', '500.00', str(vehicle.segment_id),
+                                   str(vehicle.brand_id), 'Sedan', 'Tesla, Inc.'])
+        self.assertEqual(len(rows), 4)
+
+    def test_8_2_should_export_ndjson_matching_api_output(self):
+        body = self.read(self.client.get(EXPORT_NDJSON_URL))
+        rows = [json.loads(line) for line in body.splitlines()]
+        listed = self.client.get('/api/vehicles/').data['results']
+        self.assertEqual(rows, json.loads(json.dumps(listed)))
+
+    def test_8_3_should_apply_filters_to_export(self):
+        body = self.read(self.client.get(EXPORT_NDJSON_URL, {'release_year_min': 2019}))
+        ids = [json.loads(line)['id'] for line in body.splitlines()]
+        self.assertEqual(ids, [v.id for v in self.vehicles[1:]])
+
+    def test_8_4_should_not_export_when_unauthorized(self):
+        res = APIClient().get(EXPORT_CSV_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from .models import Vehicle, Brand, Segment
+
+CSV_DATA = '''vehicle_name,release_year,price,segment_name,brand_name
+MODEL S,2019,500.00,Sedan,Tesla
+MODEL X,2020,800.50,SUV,Tesla
+RAV4,2018,300,SUV,Toyota
+'''
+
+NDJSON_DATA = '''{"vehicle_name": "MODEL S", "release_year": 2019, "price": "500.00", "segment_name": "Sedan", "brand_name": "Tesla"}
+not json
+{"vehicle_name": "MODEL 3", "release_year": 2021, "price": "9999999", "segment_name": "Sedan", "brand_name": "Tesla"}
+
+{"vehicle_name": "Q5", "release_year": 2017, "price": 450.25, "segment_name": "SUV", "brand_name": "Audi"}
+'''
+
+
+class ImportVehiclesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dummy', password='dummy_pw')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_vehicles', path, '--user', 'dummy', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_9_1_should_import_csv_and_create_missing_dimensions(self):
+        Segment.objects.create(segment_name='Sedan')
+        out, _ = self.run_import(self.write('fleet.csv', CSV_DATA), '--batch-size', '2')
+        self.assertIn('Imported 3 vehicles', out)
+        self.assertEqual(sorted(Segment.objects.values_list('segment_name', flat=True)), ['SUV', 'Sedan'])
+        self.assertEqual(sorted(Brand.objects.values_list('brand_name', flat=True)), ['Tesla', 'Toyota'])
+        rav4 = Vehicle.objects.get(vehicle_name='RAV4')
+        self.assertEqual((rav4.user, rav4.price, rav4.segment.segment_name, rav4.brand.brand_name),
+                         (self.user, Decimal('300.00'), 'SUV', 'Toyota'))
+
+    def test_9_2_should_skip_invalid_ndjson_records(self):
+        out, err = self.run_import(self.write('fleet.ndjson', NDJSON_DATA))
+        self.assertIn('Imported 2 vehicles', out)
+        self.assertIn('Record 2 skipped', err)
+        self.assertIn('Record 3 skipped', err)
+        self.assertEqual(sorted(Vehicle.objects.values_list('vehicle_name', flat=True)), ['MODEL S', 'Q5'])
+
+    def test_9_3_should_resume_from_checkpoint(self):
+        path = self.write('fleet.csv', CSV_DATA)
+        self.write('fleet.csv.checkpoint', '2')
+        out, _ = self.run_import(path, '--resume')
+        self.assertIn('Imported 1 vehicles', out)
+        self.assertEqual(list(Vehicle.objects.values_list('vehicle_name', flat=True)), ['RAV4'])
+        out, _ = self.run_import(path, '--resume')
+        self.assertIn('Imported 0 vehicles', out)
+        self.assertEqual(Vehicle.objects.count(), 1)
+
+    def test_9_4_should_checkpoint_each_chunk(self):
+        path = self.write('fleet.csv', CSV_DATA)
+        self.run_import(path, '--chunk-size', '2')
+        with open(path + '.checkpoint') as stream:
+            self.assertEqual(stream.read(), '3')
+
+    def test_9_5_should_fail_for_unknown_user(self):
+        with self.assertRaises(CommandError):
+            call_command('import_vehicles', self.write('fleet.csv', CSV_DATA), '--user', 'nobody')
+
+    def test_9_6_should_skip_rows_with_missing_columns(self):
+        data = CSV_DATA + 'CIVIC,2020\n' + 'ACCORD,2021,400,Sedan,Honda\n'
+        out, err = self.run_import(self.write('fleet.csv', data))
+        self.assertIn('Imported 4 vehicles', out)
+        self.assertIn('Record 4 skipped: missing price, segment_name, brand_name', err)
+        self.assertFalse(Segment.objects.filter(segment_name='None').exists())
+        self.assertFalse(Vehicle.objects.filter(vehicle_name='CIVIC').exists())
+
+    def test_9_7_should_skip_rows_with_out_of_range_or_fractional_years(self):
+        out, err = self.run_import(self.write('fleet.csv', CSV_DATA + 'CIVIC,99999999999999999999,400,Sedan,Honda\n'))
+        self.assertIn('Imported 3 vehicles', out)
+        self.assertIn('Record 4 skipped: invalid release_year', err)
+        data = ('{"vehicle_name": "Q5", "release_year": 2020.9, "price": "1", "segment_name": "SUV", '
+                '"brand_name": "Audi"}\n'
+                '{"vehicle_name": "Q7", "release_year": 2020.0, "price": "1", "segment_name": "SUV", '
+                '"brand_name": "Audi"}\n')
+        out, err = self.run_import(self.write('fleet.ndjson', data))
+        self.assertIn('Record 1 skipped: invalid release_year', err)
+        self.assertEqual(Vehicle.objects.get(vehicle_name='Q7').release_year, 2020)
+        self.assertFalse(Vehicle.objects.filter(vehicle_name='Q5').exists())
@@ -0,0 +1,110 @@
+import math
+import time
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .cache import build_cache, lazy_cache
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class LocalBuckets:
+    """
+    Per-process bucket state without a lock. Each key holds one float that
+    is replaced by a single dict assignment, so two threads racing on the
+    same bucket can at worst both spend its last token.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._data = {}
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def set(self, key, value, timeout=None):
+        self._data[key] = value
+        if len(self._data) > self.max_entries:
+            self.prune()
+
+    def prune(self):
+        # Full buckets carry no state; dropping them is the same as keeping them.
+        now = time.time()
+        self._data = {key: full_at for key, full_at in self._data.copy().items() if full_at > now}
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data = {}
+
+
+def _build_bucket_store(config, prefix):
+    if config.get('BACKEND', 'local') == 'django':
+        return build_cache(config, prefix)
+    return LocalBuckets(config.get('MAX_ENTRIES', 100000))
+
+
+get_bucket_store = lazy_cache('THROTTLE_STORE', 'api:throttle:', _build_bucket_store, reset_on=('REST_FRAMEWORK',))
+
+
+def parse_rate(rate):
+    """'20/min' -> (20, 60): a bucket of 20 tokens refilled over 60 seconds."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    A token bucket per scope and client, holding as many tokens as the
+    scope's DEFAULT_THROTTLE_RATES entry allows per period. Authenticated
+    clients are keyed by user, others by IP address as DRF's NUM_PROXIES
+    setting determines it.
+    """
+    scope = None
+    methods = None
+
+    def allow_request(self, request, view):
+        if self.methods is not None and request.method not in self.methods:
+            return True
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            return True
+        capacity, period = parse_rate(rate)
+        store = get_bucket_store()
+        key = '%s:%s' % (self.scope, self.get_client(request))
+        now = time.time()
+        # The bucket is stored as the time it will be full again: every
+        # request pushes that one token's worth later, and a request that
+        # would push it more than a whole period ahead finds it empty.
+        full_at = max(store.get(key, now), now) + period / capacity
+        if full_at - now > period:
+            self.retry_after = full_at - now - period
+            return False
+        store.set(key, full_at, timeout=math.ceil(full_at - now))
+        return True
+
+    def get_client(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return 'user:%s' % user.pk
+        return 'ip:%s' % self.get_ident(request)
+
+    def wait(self):
+        return getattr(self, 'retry_after', None)
+
+
+class AuthRateThrottle(TokenBucketThrottle):
+    scope = 'auth'
+
+
+class ReadRateThrottle(TokenBucketThrottle):
+    scope = 'read'
+    methods = SAFE_METHODS
+
+
+class WriteRateThrottle(TokenBucketThrottle):
+    scope = 'write'
+    methods = ('POST', 'PUT', 'PATCH', 'DELETE')
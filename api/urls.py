@@ -1,18 +1,27 @@
 from django.urls import path, include
-from rest_framework.authtoken.views import obtain_auth_token
-from . import views
+from . import views, async_views
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
 router.register('segments', views.SegmentViewSet)
 router.register('brands', views.BrandViewSet)
 router.register('vehicles', views.VehicleViewSet)
+router.register('deletions', views.DeletionTaskViewSet, basename='deletiontask')
+router.register('jobs', views.JobViewSet, basename='job')
 
 app_name = 'api'
 
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('profile/', views.ProfileUserView.as_view(), name='profile'),
-    path('auth/', obtain_auth_token, name='auth'),
+    path('auth/', views.AuthTokenView.as_view(), name='auth'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+    path('stats/<str:dimension>/', views.VehicleStatsView.as_view(), name='stats'),
+    path('async/segments/', async_views.segment_list, name='async-segment-list'),
+    path('async/segments/<int:pk>/', async_views.segment_detail, name='async-segment-detail'),
+    path('async/brands/', async_views.brand_list, name='async-brand-list'),
+    path('async/brands/<int:pk>/', async_views.brand_detail, name='async-brand-detail'),
+    path('async/vehicles/', async_views.vehicle_list, name='async-vehicle-list'),
+    path('async/vehicles/<int:pk>/', async_views.vehicle_detail, name='async-vehicle-detail'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
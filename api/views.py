@@ -1,12 +1,36 @@
-from rest_framework import generics, permissions, viewsets, status
-from .serializers import UserSerializer, SegmentSerializer, BrandSerializer, VehicleSerializer
-from .models import Segment, Brand, Vehicle
+import os
+
+from django.http import FileResponse
+from django.urls import reverse
+from rest_framework import generics, mixins, permissions, viewsets, status
+from rest_framework.views import APIView
+from rest_framework.authtoken.views import ObtainAuthToken
+from .serializers import (UserSerializer, SegmentSerializer, BrandSerializer, VehicleSerializer, VehicleStatSerializer,
+                          DeletionTaskSerializer, JobSerializer)
+from .models import Segment, Brand, Vehicle, VehicleStat, DeletionTask, Job
+from .filters import VehicleFilterBackend
+from .pagination import CountingKeysetPagination
 from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from . import bulk, jobs, metrics, stats
+from .export import CONTENT_TYPES, streaming_export
+from .response_cache import CachedResponseMixin
+from .conditional import ConditionalMixin
+from .fastpath import FastListMixin, VehicleRowSerializer
+from .throttling import AuthRateThrottle
+from .fieldsets import SparseFieldsMixin
+from .cascade import CascadeDestroyMixin
 
 
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (AuthRateThrottle,)
+
+
+class AuthTokenView(ObtainAuthToken):
+    throttle_classes = (AuthRateThrottle,)
 
 
 class ProfileUserView(generics.RetrieveUpdateAPIView):
@@ -24,20 +48,127 @@ class ProfileUserView(generics.RetrieveUpdateAPIView):
         return Response(response, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
-class SegmentViewSet(viewsets.ModelViewSet):
+class SegmentViewSet(CachedResponseMixin, CascadeDestroyMixin, viewsets.ModelViewSet):
     queryset = Segment.objects.all()
     serializer_class = SegmentSerializer
+    cache_namespace = 'segment'
+    cascade_target = DeletionTask.SEGMENT
 
 
-class BrandViewSet(viewsets.ModelViewSet):
+class BrandViewSet(CachedResponseMixin, CascadeDestroyMixin, viewsets.ModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
+    cache_namespace = 'brand'
+    cascade_target = DeletionTask.BRAND
 
 
-class VehicleViewSet(viewsets.ModelViewSet):
+class VehicleViewSet(ConditionalMixin, FastListMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
+    row_serializer_class = VehicleRowSerializer
+    filter_backends = [VehicleFilterBackend]
+    pagination_class = CountingKeysetPagination
+    etag_dimensions = ('segment', 'brand')
+    list_version = 'vehicle'
+    keyset_orderings = ('id', '-id', 'release_year', '-release_year', 'price', '-price')
+
+    def get_keyset_orderings(self):
+        # Searches are ordered by relevance unless asked otherwise.
+        if self.request.query_params.get('search'):
+            return ('rank',) + self.keyset_orderings
+        return self.keyset_orderings
+
+    def get_summary_count(self):
+        lookups, text = VehicleFilterBackend().get_lookups(self.request.query_params)
+        return None if text else stats.count(lookups)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        if request.method == 'POST':
+            result = bulk.bulk_create(request.user, request.data)
+            done, success = result['created'], status.HTTP_201_CREATED
+        elif request.method == 'PATCH':
+            result = bulk.bulk_update(request.data)
+            done, success = result['updated'], status.HTTP_200_OK
+        else:
+            result = bulk.bulk_delete(request.data)
+            done, success = result['deleted'], status.HTTP_200_OK
+        if result['errors'] and not done:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=success)
+
+    @action(detail=False, methods=['get'], url_path=r'export/(?P<export_format>csv|ndjson)')
+    def export(self, request, export_format):
+        return streaming_export(self.filter_queryset(self.get_queryset()), export_format)
+
+
+class DeletionTaskViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = DeletionTaskSerializer
+
+    def get_queryset(self):
+        return DeletionTask.objects.filter(user=self.request.user)
+
+
+class JobViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Background jobs of the user. POST {"kind": ..., "payload": {...}}
+    queues one for the run_workers processes and answers 202 with the job,
+    which can be polled at its Location.
+    """
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save()
+        location = request.build_absolute_uri(reverse('api:job-detail', args=[job.pk]))
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED, headers={'Location': location})
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        name = (job.result or {}).get('file') if job.status == Job.DONE else None
+        path = os.path.join(jobs.get_output_dir(), name) if name else None
+        if path is None or not os.path.exists(path):
+            raise NotFound()
+        export_format = os.path.splitext(name)[1].lstrip('.')
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename='vehicles.%s' % export_format,
+                            content_type=CONTENT_TYPES[export_format])
+
+
+class VehicleStatsView(generics.ListAPIView):
+    serializer_class = VehicleStatSerializer
+    pagination_class = None
+    name_fields = {
+        VehicleStat.SEGMENT: (Segment, 'segment_name'),
+        VehicleStat.BRAND: (Brand, 'brand_name'),
+    }
+
+    def get_queryset(self):
+        dimension = self.kwargs['dimension']
+        if dimension not in dict(VehicleStat.DIMENSION_CHOICES):
+            raise NotFound()
+        return VehicleStat.objects.filter(dimension=dimension).order_by('key')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.kwargs['dimension'] in self.name_fields:
+            model, field = self.name_fields[self.kwargs['dimension']]
+            context['names'] = dict(model.objects.values_list('id', field))
+        return context
+
+
+class MetricsView(APIView):
+    authentication_classes = ()
+    permission_classes = (metrics.MetricsAllowList,)
+    renderer_classes = (metrics.PrometheusRenderer,)
+    content_negotiation_class = metrics.FirstRendererNegotiation
+
+    def get(self, request):
+        return Response(metrics.exposition(*metrics.collect()))
@@ -0,0 +1,134 @@
+"""
+Concurrent vehicle list reads through the WSGI and ASGI entry points.
+
+Run from the repository root:
+
+    python -m benchmarks.asgi_vs_wsgi --requests 400 --concurrency 16 --db-latency 5
+
+Three scenarios are measured against the same throwaway SQLite database:
+
+    wsgi        /api/vehicles/ through rest_api.wsgi, one thread per
+                concurrent client (what a threaded WSGI server does)
+    asgi-sync   /api/vehicles/ through rest_api.asgi; Django runs the sync
+                view on its single thread_sensitive thread
+    asgi-async  /api/async/vehicles/ through rest_api.asgi; the view hops
+                to the ASYNC_READ_WORKERS executor once per request and
+                runs in parallel
+
+Both applications are driven in-process, so the numbers measure the
+Django stack and not a server or the network. ``--db-latency`` sleeps for
+that many milliseconds on every query to stand in for the round trip to a
+database server; at 0 the runs are CPU bound and the GIL evens them out.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import environment, fleet
+from benchmarks.environment import HOST
+
+
+def create_fixtures(vehicles):
+    from rest_framework.authtoken.models import Token
+    return Token.objects.create(user=fleet.generate(vehicles)).key
+
+
+def _split(url):
+    path, _, query = url.partition('?')
+    return path, query
+
+
+def run_wsgi(url, token, requests, concurrency):
+    from rest_api.wsgi import application
+    path, query = _split(url)
+
+    def call(_):
+        environ = environment.wsgi_environ(path, query, headers={'Authorization': 'Token ' + token})
+        started = time.perf_counter()
+        status, _ = environment.call_wsgi(application, environ)
+        return time.perf_counter() - started, status == 200
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        started = time.perf_counter()
+        results = list(executor.map(call, range(requests)))
+    return time.perf_counter() - started, results
+
+
+def run_asgi(url, token, requests, concurrency):
+    from rest_api.asgi import application
+    path, query = _split(url)
+
+    async def call(limit):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode('ascii'), 'root_path': '',
+            'query_string': query.encode('ascii'), 'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+            'headers': [(b'host', HOST.encode('ascii')), (b'authorization', ('Token ' + token).encode('ascii'))],
+        }
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        disconnected = asyncio.get_running_loop().create_future()
+        status = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            return await disconnected
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        async with limit:
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            return time.perf_counter() - started, status[0] == 200
+
+    async def main():
+        limit = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call(limit) for _ in range(requests)))
+        return time.perf_counter() - started, results
+
+    return asyncio.run(main())
+
+
+def report(name, elapsed, results):
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print('%-11s %8.1f req/s  mean %7.1f ms  p95 %7.1f ms  errors %d' % (
+        name, len(results) / elapsed, statistics.mean(latencies) * 1000, p95 * 1000, errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--vehicles', type=int, default=1000)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--db-latency', type=float, default=5.0, help='milliseconds added to every query')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='vehicles-benchmark-')
+    try:
+        environment.setup(os.path.join(directory, 'benchmark.sqlite3'))
+        if args.db_latency:
+            environment.add_query_latency(args.db_latency)
+        token = create_fixtures(args.vehicles)
+        query = '?page_size=%d' % args.page_size
+        print('%d requests, concurrency %d, %d vehicles, %.1f ms per query' % (
+            args.requests, args.concurrency, args.vehicles, args.db_latency))
+        report('wsgi', *run_wsgi('/api/vehicles/' + query, token, args.requests, args.concurrency))
+        report('asgi-sync', *run_asgi('/api/vehicles/' + query, token, args.requests, args.concurrency))
+        report('asgi-async', *run_asgi('/api/async/vehicles/' + query, token, args.requests, args.concurrency))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
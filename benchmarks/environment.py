@@ -0,0 +1,64 @@
+"""Django set-up shared by the benchmarks: a private database, DEBUG off."""
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rest_api.settings')
+
+HOST = 'localhost'
+
+
+def setup(database_path):
+    """Point the default database at ``database_path``, set Django up and migrate."""
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = database_path
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = [HOST]
+    # One client sends every request; throttling would only measure 429s.
+    settings.REST_FRAMEWORK = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={})
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def add_query_latency(milliseconds):
+    """Sleep before every query on every connection, standing in for a database server."""
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(milliseconds / 1000.0)
+        return execute(sql, params, many, context)
+
+    def add_delay(sender, connection, **kwargs):
+        # Fired again on every reconnect of the same wrapper object.
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+    connection_created.connect(add_delay, weak=False)
+
+
+def wsgi_environ(path, query='', method='GET', headers=None, body=b'', content_type=''):
+    from io import BytesIO
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': HOST,
+        'CONTENT_LENGTH': str(len(body)), 'CONTENT_TYPE': content_type,
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(body),
+        'wsgi.errors': BytesIO(), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in (headers or {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    return environ
+
+
+def call_wsgi(application, environ):
+    """Run one request through a WSGI application; returns (status code, body)."""
+    status = []
+    body = application(environ, lambda line, headers, exc_info=None: status.append(line))
+    try:
+        content = b''.join(body)
+    finally:
+        body.close()
+    return int(status[0].split(' ', 1)[0]), content
@@ -0,0 +1,109 @@
+"""
+Synthetic vehicle fleets for the benchmarks.
+
+    python -m benchmarks.fleet --vehicles 100k --database /tmp/fleet-100k.sqlite3
+
+Segments and brands follow the cardinalities of a real catalogue: a
+dozen segments and ~80 brands, with brand popularity Zipf-distributed so
+filters hit both huge and tiny groups. Rows are written with executemany
+in large transactions instead of model instances, which keeps a million
+vehicles to well under a minute; the summary table is rebuilt once at
+the end. The same seed always produces the same fleet.
+"""
+import argparse
+import itertools
+import random
+from decimal import Decimal
+
+SIZES = {'10k': 10000, '100k': 100000, '1m': 1000000}
+
+SEGMENTS = (
+    ('Sedan', 3000), ('Hatchback', 1800), ('SUV', 4500), ('Crossover', 3500), ('Coupe', 5000),
+    ('Convertible', 6000), ('Wagon', 2800), ('Minivan', 3200), ('Pickup', 4000), ('Van', 2600),
+    ('Roadster', 7500), ('Microcar', 900),
+)
+BRANDS = 80
+YEARS = (1990, 2024)
+FLEET_USER = 'fleet'
+
+
+def parse_size(value):
+    value = value.lower()
+    if value in SIZES:
+        return SIZES[value]
+    if value.endswith('k'):
+        return int(value[:-1]) * 1000
+    return int(value)
+
+
+def _rows(vehicles, user_id, segment_ids, brand_ids, updated_at, rng):
+    brand_weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(brand_ids) + 1)))
+    cent = Decimal('0.01')
+    for number in range(vehicles):
+        segment = rng.randrange(len(SEGMENTS))
+        brand_id = rng.choices(brand_ids, cum_weights=brand_weights)[0]
+        base = SEGMENTS[segment][1]
+        price = min(Decimal(base * rng.uniform(0.6, 1.6)).quantize(cent), Decimal('9999.99'))
+        yield ('MODEL %d' % number, rng.randint(*YEARS), str(price), user_id,
+               segment_ids[segment], brand_id, updated_at)
+
+
+def generate(vehicles, batch_size=20000, seed=0, stdout=None):
+    """
+    Add ``vehicles`` rows owned by the fleet user, creating the user,
+    segments and brands on first use. Returns the fleet user.
+    """
+    from django.contrib.auth import get_user_model
+    from django.db import connection, transaction
+    from django.utils import timezone
+    from api import stats
+    from api.models import Segment, Brand, Vehicle
+
+    user, created = get_user_model().objects.get_or_create(username=FLEET_USER)
+    if created:
+        user.set_password(FLEET_USER)
+        user.save()
+    segment_ids = [Segment.objects.get_or_create(segment_name=name)[0].id for name, _ in SEGMENTS]
+    brand_ids = [Brand.objects.get_or_create(brand_name='Brand %02d' % i)[0].id for i in range(BRANDS)]
+
+    fields = ['vehicle_name', 'release_year', 'price', 'user', 'segment', 'brand', 'updated_at']
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote(Vehicle._meta.db_table),
+        ', '.join(quote(Vehicle._meta.get_field(name).column) for name in fields),
+        ', '.join(['%s'] * len(fields)))
+    updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    rows = _rows(vehicles, user.id, segment_ids, brand_ids, updated_at, random.Random(seed))
+
+    written = 0
+    while written < vehicles:
+        batch = list(itertools.islice(rows, batch_size))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+        written += len(batch)
+        if stdout is not None:
+            stdout.write('\r%d / %d vehicles' % (written, vehicles))
+            stdout.flush()
+    if stdout is not None:
+        stdout.write('\n')
+    stats.rebuild()
+    return user
+
+
+def main():
+    import os
+    import sys
+    from benchmarks import environment
+
+    parser = argparse.ArgumentParser(description='Seed a database with a synthetic vehicle fleet.')
+    parser.add_argument('--vehicles', default='10k', help='10k, 100k, 1m or a number')
+    parser.add_argument('--database', required=True, help='SQLite file to create or extend')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    environment.setup(os.path.abspath(args.database))
+    generate(parse_size(args.vehicles), seed=args.seed, stdout=sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Bytes and CPU per vehicle list response, by renderer and encoding.
+
+    python -m benchmarks.rendering --vehicles 10k --page-sizes 100,1000
+
+Each page is serialized once with VehicleSerializer. Then it is rendered
+by DRF's JSONRenderer ("before") and by api.renderers.FastJSONRenderer,
+and the rendered body is compressed with every encoding that
+api.compression offers. CPU is process time per response, averaged over
+``--repeat`` runs.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+
+from benchmarks import environment, fleet
+
+
+def cpu_per_call(function, repeat):
+    function()
+    started = time.process_time()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.process_time() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure rendering and compression cost of vehicle lists.')
+    parser.add_argument('--vehicles', default='10k', help='fleet size: 10k, 100k, 1m or a number')
+    parser.add_argument('--page-sizes', default='100,1000')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='vehicles-benchmark-')
+    try:
+        environment.setup(os.path.join(directory, 'fleet.sqlite3'))
+        from rest_framework.renderers import JSONRenderer
+        from api import compression
+        from api.models import Vehicle
+        from api.renderers import FastJSONRenderer, orjson
+        from api.serializers import VehicleSerializer
+
+        fleet.generate(fleet.parse_size(args.vehicles))
+        renderers = [('json', JSONRenderer()), ('fast', FastJSONRenderer())]
+        print('FastJSONRenderer backend: %s' % ('orjson' if orjson is not None else 'json (orjson missing)'))
+        print('%6s %-6s %-9s %10s %12s %12s %12s' % (
+            'page', 'render', 'encoding', 'bytes', 'render us', 'encode us', 'total us'))
+        for page_size in [int(size) for size in args.page_sizes.split(',') if size]:
+            vehicles = Vehicle.objects.order_by('id')[:page_size]
+            data = OrderedDict([('next', 'http://localhost/api/vehicles/?cursor=x'), ('previous', None),
+                                ('results', VehicleSerializer(vehicles, many=True).data)])
+            for name, renderer in renderers:
+                body, render_cpu = cpu_per_call(lambda: renderer.render(data, 'application/json'), args.repeat)
+                encodings = [('identity', None)] + compression.ENCODERS
+                for coding, encode in encodings:
+                    if encode is None:
+                        size, encode_cpu = len(body), 0.0
+                    else:
+                        compressed, encode_cpu = cpu_per_call(lambda: encode(body), args.repeat)
+                        size = len(compressed)
+                    print('%6d %-6s %-9s %10d %12.1f %12.1f %12.1f' % (
+                        page_size, name, coding, size, render_cpu * 1e6, encode_cpu * 1e6,
+                        (render_cpu + encode_cpu) * 1e6))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
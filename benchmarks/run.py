@@ -0,0 +1,252 @@
+"""
+Latency, query count and throughput of the main API routes.
+
+    python -m benchmarks.run --vehicles 100k --output results.json
+    python -m benchmarks.run --database /tmp/fleet-100k.sqlite3 --baseline results.json
+
+Every request goes through rest_api.wsgi in-process, with the real URL
+routes, middleware, authentication and renderers. Scenarios:
+
+    list    GET /api/vehicles/ with a random keyset ordering, and a brand
+            or release year filter on every other request
+    detail  GET /api/vehicles/<id>/ for a random vehicle
+    create  POST /api/vehicles/ (the created rows are removed afterwards)
+    search  GET /api/vehicles/?search=model <n>, ranked; thousands of
+            fleet names match, and every fourth request matches all
+    auth    POST /api/auth/; dominated by password hashing by design
+
+Requests are sent one at a time from a seeded random generator, so two
+runs on the same fleet issue the same requests. The fleet is generated
+with benchmarks.fleet into a temporary database unless ``--database``
+points at one already seeded (it is extended if it has no fleet yet).
+
+Results are written as JSON with ``--output``. ``--baseline`` compares
+against an earlier file and, with ``--max-regression``, exits with
+status 1 when a p95 latency grows by more than that percentage or a
+scenario issues more queries per request.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks import environment, fleet
+
+SCENARIOS = ('list', 'detail', 'search', 'create', 'auth')
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return None
+    rank = max(int(round(percent / 100.0 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class Runner:
+
+    def __init__(self, token, user_id, seed, page_size):
+        from rest_api.wsgi import application
+        from api.models import Vehicle
+        from api.views import VehicleViewSet
+
+        self.application = application
+        self.headers = {'Authorization': 'Token ' + token}
+        self.rng = random.Random(seed)
+        self.page_size = page_size
+        self.orderings = VehicleViewSet.keyset_orderings
+        vehicles = Vehicle.objects.filter(user_id=user_id)
+        self.ids = list(vehicles.order_by().values_list('id', flat=True)[:100000])
+        self.segments = sorted(vehicles.order_by().values_list('segment_id', flat=True).distinct())
+        self.brands = sorted(vehicles.order_by().values_list('brand_id', flat=True).distinct())
+        self.created = []
+
+    def environ(self, scenario, number):
+        rng = self.rng
+        if scenario == 'list':
+            query = 'page_size=%d&ordering=%s' % (self.page_size, rng.choice(self.orderings))
+            if number % 4 == 1:
+                query += '&brand=%d' % rng.choice(self.brands)
+            elif number % 4 == 3:
+                start = rng.randint(*fleet.YEARS)
+                query += '&release_year_min=%d&release_year_max=%d' % (start, start + 2)
+            return environment.wsgi_environ('/api/vehicles/', query, headers=self.headers)
+        if scenario == 'search':
+            text = 'model' if number % 4 == 0 else 'model %d' % rng.randint(1, 99)
+            query = 'page_size=%d&search=%s' % (self.page_size, text.replace(' ', '+'))
+            return environment.wsgi_environ('/api/vehicles/', query, headers=self.headers)
+        if scenario == 'detail':
+            return environment.wsgi_environ('/api/vehicles/%d/' % rng.choice(self.ids), headers=self.headers)
+        if scenario == 'create':
+            body = json.dumps({
+                'vehicle_name': 'BENCHMARK %d' % number,
+                'release_year': rng.randint(*fleet.YEARS),
+                'price': '%.2f' % rng.uniform(500, 9000),
+                'segment': rng.choice(self.segments),
+                'brand': rng.choice(self.brands),
+            }).encode('utf-8')
+            return environment.wsgi_environ('/api/vehicles/', method='POST', headers=self.headers,
+                                            body=body, content_type='application/json')
+        body = ('username=%s&password=%s' % (fleet.FLEET_USER, fleet.FLEET_USER)).encode('ascii')
+        return environment.wsgi_environ('/api/auth/', method='POST', body=body,
+                                        content_type='application/x-www-form-urlencoded')
+
+    def run(self, scenario, requests, warmup):
+        from api.querybudget import QueryCounter
+
+        expected = 201 if scenario == 'create' else 200
+        latencies = []
+        queries = errors = 0
+        for number in range(warmup + requests):
+            environ = self.environ(scenario, number)
+            with QueryCounter() as counter:
+                started = time.perf_counter()
+                status, content = environment.call_wsgi(self.application, environ)
+                elapsed = time.perf_counter() - started
+            if status == 201 and scenario == 'create':
+                self.created.append(json.loads(content)['id'])
+            if number < warmup:
+                continue
+            latencies.append(elapsed * 1000)
+            queries += counter.count
+            errors += status != expected
+        total = sum(latencies) / 1000
+        latencies.sort()
+        return {
+            'requests': requests,
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'queries_per_request': round(queries / float(requests), 2),
+            'throughput_rps': round(requests / total, 1) if total else None,
+        }
+
+    def cleanup(self):
+        from api.models import Vehicle
+        Vehicle.objects.filter(id__in=self.created).delete()
+        self.created = []
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(fleet_size, args):
+    import django
+    import sqlite3
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'fleet_size': fleet_size,
+        'requests': args.requests,
+        'page_size': args.page_size,
+        'seed': args.seed,
+    }
+
+
+def _change(before, after):
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare(results, baseline, max_regression):
+    """Print the change against ``baseline``; returns the regressed scenarios."""
+    regressions = []
+    print('\n%-8s %9s %11s %9s' % ('vs base', 'p95', 'queries/req', 'req/s'))
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        p95 = _change(previous['p95_ms'], current['p95_ms'])
+        print('%-8s %+8.1f%% %+11.2f %+8.1f%%' % (
+            name, p95, current['queries_per_request'] - previous['queries_per_request'],
+            _change(previous['throughput_rps'] or 0, current['throughput_rps'] or 0)))
+        if max_regression is not None and (
+                p95 > max_regression or current['queries_per_request'] > previous['queries_per_request']):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the vehicle API routes in-process.')
+    parser.add_argument('--vehicles', default='10k', help='fleet size: 10k, 100k, 1m or a number')
+    parser.add_argument('--database', help='SQLite file holding (or to hold) the fleet; temporary if omitted')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--max-regression', type=float, help='allowed p95 growth in percent')
+    args = parser.parse_args()
+
+    scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error('unknown scenarios: %s' % ', '.join(sorted(unknown)))
+
+    directory = None
+    if args.database:
+        database = os.path.abspath(args.database)
+    else:
+        directory = tempfile.mkdtemp(prefix='vehicles-benchmark-')
+        database = os.path.join(directory, 'fleet.sqlite3')
+    try:
+        environment.setup(database)
+        from django.contrib.auth import get_user_model
+        from rest_framework.authtoken.models import Token
+        from api.models import Vehicle
+
+        user = get_user_model().objects.filter(username=fleet.FLEET_USER).first()
+        if user is None:
+            print('Generating fleet...')
+            user = fleet.generate(fleet.parse_size(args.vehicles), seed=args.seed, stdout=sys.stdout)
+        token, _ = Token.objects.get_or_create(user=user)
+        fleet_size = Vehicle.objects.count()
+
+        runner = Runner(token.key, user.id, args.seed, args.page_size)
+        results = {'meta': metadata(fleet_size, args), 'scenarios': {}}
+        print('%d vehicles, %d requests per scenario' % (fleet_size, args.requests))
+        print('%-8s %9s %9s %9s %11s %9s %7s' % ('', 'p50 ms', 'p95 ms', 'p99 ms', 'queries/req', 'req/s', 'errors'))
+        try:
+            for name in scenarios:
+                result = results['scenarios'][name] = runner.run(name, args.requests, args.warmup)
+                print('%-8s %9.2f %9.2f %9.2f %11.2f %9.1f %7d' % (
+                    name, result['p50_ms'], result['p95_ms'], result['p99_ms'],
+                    result['queries_per_request'], result['throughput_rps'], result['errors']))
+        finally:
+            runner.cleanup()
+
+        if args.output:
+            with open(args.output, 'w') as output:
+                json.dump(results, output, indent=2)
+        if args.baseline:
+            with open(args.baseline) as baseline:
+                regressions = compare(results, json.load(baseline), args.max_regression)
+            if regressions:
+                print('\nRegressed: %s' % ', '.join(regressions))
+                sys.exit(1)
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Mixed read/write load on SQLite with and without the production profile.
+
+    python -m benchmarks.sqlite_concurrency --threads 16 --seconds 10 --write-ratio 0.2
+
+Each profile runs in its own process on a fresh database file:
+
+    default     what Django does out of the box: rollback journal, a new
+                connection per request, the 5 second sqlite3 timeout and
+                every writer fighting for the lock in the busy handler
+    production  the settings of rest_api.settings after
+                `manage.py enable_wal`: WAL, the SQLITE_PRAGMAS,
+                CONN_MAX_AGE, the 20 second timeout and BEGIN IMMEDIATE
+
+Threads send requests through rest_api.wsgi in-process: GET
+/api/vehicles/ pages, and POST /api/vehicles/ for ``--write-ratio`` of
+them. The report shows throughput, p95 latency and failed requests
+(typically 'database is locked') for reads and writes.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks import environment, fleet
+
+PROFILES = ('default', 'production')
+
+
+def configure(profile, database):
+    from django.conf import settings
+    if profile == 'default':
+        settings.DATABASES['default'].update(CONN_MAX_AGE=0, OPTIONS={})
+        settings.SQLITE_PRAGMAS = {}
+        settings.SQLITE_BEGIN_IMMEDIATE = False
+    settings.PROFILING_SAMPLE_RATE = 0
+    environment.setup(database)
+    if profile == 'production':
+        from django.core.management import call_command
+        call_command('enable_wal', verbosity=0)
+    import logging
+    # Failed requests are counted, not logged.
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+
+def run_profile(args):
+    directory = tempfile.mkdtemp(prefix='vehicles-benchmark-')
+    try:
+        configure(args.profile, os.path.join(directory, 'benchmark.sqlite3'))
+        from rest_framework.authtoken.models import Token
+        from rest_api.wsgi import application
+        from api.models import Segment, Brand
+
+        user = fleet.generate(args.vehicles)
+        token = Token.objects.create(user=user).key
+        segments = list(Segment.objects.values_list('id', flat=True))
+        brands = list(Brand.objects.values_list('id', flat=True))
+        headers = {'Authorization': 'Token ' + token}
+        results = {'read': [], 'write': []}
+        failures = {'read': 0, 'write': 0}
+        deadline = time.monotonic() + args.seconds
+
+        def worker(seed):
+            rng = random.Random(seed)
+            latencies = {'read': [], 'write': []}
+            failed = {'read': 0, 'write': 0}
+            while time.monotonic() < deadline:
+                if rng.random() < args.write_ratio:
+                    kind = 'write'
+                    body = json.dumps({
+                        'vehicle_name': 'LOAD %d' % rng.randrange(10 ** 6),
+                        'release_year': rng.randint(*fleet.YEARS),
+                        'price': '%.2f' % rng.uniform(500, 9000),
+                        'segment': rng.choice(segments),
+                        'brand': rng.choice(brands),
+                    }).encode('utf-8')
+                    environ = environment.wsgi_environ('/api/vehicles/', method='POST', headers=headers,
+                                                       body=body, content_type='application/json')
+                    expected = 201
+                else:
+                    kind = 'read'
+                    query = 'page_size=20&ordering=%s' % rng.choice(('id', '-price', 'release_year'))
+                    environ = environment.wsgi_environ('/api/vehicles/', query, headers=headers)
+                    expected = 200
+                started = time.perf_counter()
+                try:
+                    status, _ = environment.call_wsgi(application, environ)
+                except Exception:
+                    status = None
+                latencies[kind].append(time.perf_counter() - started)
+                failed[kind] += status != expected
+            for kind in results:
+                results[kind].extend(latencies[kind])
+                failures[kind] += failed[kind]
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        report = {}
+        for kind, latencies in results.items():
+            latencies.sort()
+            report[kind] = {
+                'requests': len(latencies),
+                'failed': failures[kind],
+                'per_second': round((len(latencies) - failures[kind]) / elapsed, 1),
+                'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+            }
+        print(json.dumps(report))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare SQLite set-ups under concurrent reads and writes.')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--vehicles', type=int, default=2000)
+    parser.add_argument('--profile', choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        run_profile(args)
+        return
+
+    print('%d threads for %.0fs, %d%% writes' % (args.threads, args.seconds, args.write_ratio * 100))
+    print('%-11s %10s %9s %8s %10s %9s %8s' % ('', 'reads/s', 'p95 ms', 'failed', 'writes/s', 'p95 ms', 'failed'))
+    for profile in PROFILES:
+        output = subprocess.check_output(
+            [sys.executable, '-m', 'benchmarks.sqlite_concurrency', '--profile', profile,
+             '--threads', str(args.threads), '--seconds', str(args.seconds),
+             '--write-ratio', str(args.write_ratio), '--vehicles', str(args.vehicles)])
+        report = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        read, write = report['read'], report['write']
+        print('%-11s %10.1f %9s %8d %10.1f %9s %8d' % (
+            profile, read['per_second'], read['p95_ms'], read['failed'],
+            write['per_second'], write['p95_ms'], write['failed']))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'api.compression.CompressionMiddleware',
+    'api.routers.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -52,8 +57,30 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.querybudget.QueryBudgetMiddleware',
 ]
 
+# Per-request query budget enforced by QueryBudgetMiddleware when DEBUG is on.
+# Set to None to disable. QUERY_BUDGET_MODE is 'warn' or 'raise'.
+QUERY_BUDGET = 10
+QUERY_BUDGET_MODE = 'warn'
+
+# Share of requests profiled by api.profiling.ProfilingMiddleware (0 turns
+# it off). Every profile is logged to api.profiling; profiled responses
+# also carry a Server-Timing header when PROFILING_SERVER_TIMING is on,
+# which exposes timings to clients, so only in development.
+PROFILING_SAMPLE_RATE = 0.1
+PROFILING_SERVER_TIMING = DEBUG
+
+# /api/metrics/ (Prometheus text format) is served to these addresses or
+# networks only. With several worker processes, point
+# METRICS_MULTIPROCESS_DIR at a directory shared by them (emptied on
+# start); each process writes its totals there every METRICS_FLUSH_INTERVAL
+# seconds.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_MULTIPROCESS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+
 CORS_ORIGIN_WHITELIST = [
     "http://localhost:3000"
 ]
@@ -83,8 +110,132 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    # FastJSONRenderer uses orjson when installed, else it is JSONRenderer.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.ReadRateThrottle',
+        'api.throttling.WriteRateThrottle',
+    ],
+    # Token buckets of api.throttling: '20/min' allows a burst of 20
+    # requests, refilled over a minute. 'auth' covers signup and login
+    # (password hashing) per IP address; None disables a scope.
+    'DEFAULT_THROTTLE_RATES': {
+        'auth': '20/min',
+        'write': '300/min',
+        'read': '1200/min',
+    },
+    # Reverse proxies in front of the app that append to X-Forwarded-For.
+    # Throttles key anonymous clients on the address that many hops back;
+    # with 0 only REMOTE_ADDR counts, as the header comes from the client.
+    'NUM_PROXIES': 0,
+}
+
+# Where api.throttling keeps the buckets. 'local' limits each process
+# separately, so N workers allow N times the rates; 'django' shares them
+# through the CACHE_ALIAS cache.
+THROTTLE_STORE = {
+    'BACKEND': 'local',
+    'MAX_ENTRIES': 100000,
+    'CACHE_ALIAS': 'default',
+}
+
+# api.compression.CompressionMiddleware compresses bodies of at least
+# COMPRESSION_MIN_SIZE bytes, with brotli when installed, else gzip.
+# Level 4 costs about half the CPU of level 6 for ~10% more bytes on
+# vehicle lists (python -m benchmarks.rendering).
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 4
+COMPRESSION_BROTLI_QUALITY = 5
+
+# Deleting a segment or brand removes its vehicles in batches of
+# CASCADE_DELETE_BATCH_SIZE, each in its own transaction (api.cascade).
+# Above CASCADE_DELETE_ASYNC_THRESHOLD vehicles this happens in a
+# background job and the API answers 202 with a /api/deletions/<id>/
+# resource.
+CASCADE_DELETE_BATCH_SIZE = 1000
+CASCADE_DELETE_ASYNC_THRESHOLD = 5000
+
+# Background jobs (api.jobs), run by `manage.py run_workers`. A job whose
+# worker has not reported for JOB_VISIBILITY_TIMEOUT seconds is handed to
+# another one. Failed jobs are retried up to JOB_MAX_ATTEMPTS times in
+# all, after JOB_RETRY_DELAY seconds, doubling each time. Idle workers
+# look for jobs every JOB_POLL_INTERVAL seconds. Export files go to
+# JOB_OUTPUT_DIR; workers delete them after JOB_OUTPUT_MAX_AGE seconds.
+JOB_VISIBILITY_TIMEOUT = 300
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 10
+JOB_POLL_INTERVAL = 1
+JOB_OUTPUT_DIR = BASE_DIR / 'job_output'
+JOB_OUTPUT_MAX_AGE = 24 * 60 * 60
+
+# Vehicle list pages carry the list's count (api.pagination.
+# CountingKeysetPagination). Up to EXACT_THRESHOLD rows it is exact and its
+# query stops there. Larger counts come from the api.stats summary table
+# when the filters allow it, else from a COUNT(*) cached until the next
+# vehicle write or for TIMEOUT seconds and flagged with count_approximate.
+PAGINATION_COUNT = {
+    'EXACT_THRESHOLD': 10000,
+    'BACKEND': 'local',
+    'TIMEOUT': 300,
+    'MAX_ENTRIES': 10000,
+    'CACHE_ALIAS': 'default',
+}
+
+# Serve vehicle lists from values_list() rows through
+# api.fastpath.VehicleRowSerializer instead of VehicleSerializer.
+FAST_READS = False
+
+# Threads serving the /api/async/ read views (api.async_views).
+ASYNC_READ_WORKERS = 32
+
+# Valid tokens are cached by api.authentication.CachedTokenAuthentication.
+# BACKEND is 'local' (per-process LRU) or 'django' (the CACHE_ALIAS cache).
+# With 'local', a revoked token may still be accepted by other worker
+# processes for up to TIMEOUT seconds.
+TOKEN_AUTH_CACHE = {
+    'BACKEND': 'local',
+    'TIMEOUT': 60,
+    'MAX_ENTRIES': 10000,
+    'CACHE_ALIAS': 'default',
+}
+
+# Rendered segment and brand responses, see api.response_cache. With
+# 'local', writes only invalidate the process that made them; other
+# processes may serve stale entries for up to TIMEOUT seconds.
+RESPONSE_CACHE = {
+    'BACKEND': 'local',
+    'TIMEOUT': 300,
+    'MAX_ENTRIES': 1000,
+    'CACHE_ALIAS': 'default',
+}
+
+# Versions of the segment and brand name maps each process keeps for
+# vehicle reads (api.dimensions); writes bump them, so they live in the
+# 'shared' cache that every process sees. With 'local', other processes
+# never see a rename, and run_workers refuses to start several.
+DIMENSION_CACHE = {
+    'BACKEND': 'django',
+    'CACHE_ALIAS': 'shared',
+}
+
+# 'default' is Django's per-process local memory cache. 'shared' is seen
+# by every process on this host; point it at memcached or redis when the
+# processes run on several.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'shared_cache',
+    },
 }
 
 # Database
@@ -94,7 +245,57 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests; the pragmas below only
+        # run when one is opened.
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            # Seconds a statement waits for another connection's lock.
+            'timeout': 20,
+        },
+    }
+}
+
+# Applied by api.sqlite to every new SQLite connection. For readers to run
+# alongside the writer, switch the database to WAL once with
+# `manage.py enable_wal` when deploying: the journal mode is stored in the
+# file, so setting it here would rewrite the database on every run of
+# manage.py. synchronous=NORMAL is durable in WAL mode except for the last
+# transactions on power loss.
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+# Open transactions with BEGIN IMMEDIATE (api.sqlite.begin_immediate) so
+# writers queue for the lock in the busy handler, for up to the 'timeout'
+# above, instead of failing when a transaction upgrades from a read.
+SQLITE_BEGIN_IMMEDIATE = True
+
+# Optional read replica for segment, brand and vehicle reads, see
+# api.routers.ReplicaRouter. Set DATABASE_REPLICA to the path of a copy of
+# the database; `manage.py sync_replica` keeps one current locally.
+if os.environ.get('DATABASE_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['DATABASE_REPLICA'],
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {'timeout': 20},
+        'TEST': {'MIRROR': 'default'},
     }
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+# Clients that wrote read from the primary for TIMEOUT seconds afterwards.
+# Use the 'django' BACKEND with a shared cache when running several
+# processes, otherwise a client's next request may land on a process that
+# does not know it wrote.
+REPLICA_PIN_CACHE = {
+    'BACKEND': 'local',
+    'TIMEOUT': 5,
+    'MAX_ENTRIES': 10000,
+    'CACHE_ALIAS': 'default',
 }
 
 